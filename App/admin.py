@@ -1,6 +1,10 @@
-from django.contrib import admin
+from django.conf import settings
+from django.contrib import admin, messages
+from django.db.models.expressions import RawSQL
 from django.utils.html import format_html
-from .models import Recipe, Ingredient, Unit, RecipeIngredient
+from . import search
+from .models import Recipe, Ingredient, Unit, RecipeIngredient, MealPlan, MealPlanRecipe
+from .typeahead import ingredient_prefix_index
 
 class RecipeIngredientInline(admin.TabularInline):
     model = RecipeIngredient
@@ -15,7 +19,7 @@ class RecipeAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at', 'updated_at', 'display_image']
     fieldsets = [
         ('Informations principales', {
-            'fields': ['title', 'description', 'instructions', 'image', 'display_image']
+            'fields': ['title', 'description', 'instructions', 'servings', 'image', 'display_image']
         }),
         ('Métadonnées', {
             'fields': ['created_at', 'updated_at'],
@@ -24,15 +28,22 @@ class RecipeAdmin(admin.ModelAdmin):
     ]
     inlines = [RecipeIngredientInline]
 
+    def get_search_results(self, request, queryset, search_term):
+        # Recherche dans l'index plein texte (titre, description, instructions, toutes les langues)
+        subquery = search.matching_ids_sql(search_term)
+        if subquery is None:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(pk__in=RawSQL(*subquery)), False
+
     def display_image(self, obj):
         if obj.image:
             return format_html('<img src="{}" width="50" height="50" style="object-fit: cover;" />', obj.image.url)
         return "Aucune image"
     display_image.short_description = 'Aperçu'
 
+    @admin.display(description='Nombre d\'ingrédients', ordering='ingredient_count')
     def display_ingredients_count(self, obj):
-        return obj.recipe_ingredients.count()
-    display_ingredients_count.short_description = 'Nombre d\'ingrédients'
+        return obj.ingredient_count
 
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
@@ -40,6 +51,38 @@ class IngredientAdmin(admin.ModelAdmin):
     search_fields = ['name']
     readonly_fields = ['display_image']
     ordering = ['name']
+    search_limit = 500  # Résultats max. de l'index de préfixes, par langue
+    substring_prefix = '*'  # « *ail » : recherche à l'intérieur des noms (icontains)
+
+    def get_search_results(self, request, queryset, search_term):
+        # Index de préfixes en mémoire (toutes les langues) plutôt qu'un icontains sur la table
+        term = search_term.strip()
+        if not term:
+            return super().get_search_results(request, queryset, search_term)
+        if term.startswith(self.substring_prefix):
+            return super().get_search_results(request, queryset, term.lstrip(self.substring_prefix))
+        results = [
+            ingredient_prefix_index.search(term, language, limit=self.search_limit)
+            for language, _name in settings.LANGUAGES
+        ]
+        if any(len(found) >= self.search_limit for found in results):
+            # Liste tronquée par l'index : la recherche complète donne tous les résultats
+            self.notify(request, f"Au moins {self.search_limit} ingrédients commencent par « {term} » : "
+                                 "recherche complète à l'intérieur des noms.")
+            return super().get_search_results(request, queryset, term)
+        ids = {result['id'] for found in results for result in found}
+        if not ids:
+            return super().get_search_results(request, queryset, term)
+        self.notify(request, f"Ingrédients dont un mot commence par « {term} ». "
+                             f"Pour chercher à l'intérieur des noms : « {self.substring_prefix}{term} ».")
+        return queryset.filter(pk__in=ids), False
+
+    @staticmethod
+    def notify(request, message):
+        # La liste seulement : l'autocomplétion (JSON) garderait le message pour la page suivante
+        match = request.resolver_match
+        if match is not None and match.url_name.endswith('_changelist'):
+            messages.info(request, message)
 
     def display_image(self, obj):
         if obj.image:
@@ -47,16 +90,29 @@ class IngredientAdmin(admin.ModelAdmin):
         return "Aucune image"
     display_image.short_description = 'Aperçu'
 
+    @admin.display(description='Utilisé dans # recettes', ordering='usage_count')
     def display_recipes_count(self, obj):
-        return obj.recipeingredient_set.count()
-    display_recipes_count.short_description = 'Utilisé dans # recettes'
+        return obj.usage_count
 
 @admin.register(Unit)
 class UnitAdmin(admin.ModelAdmin):
-    list_display = ['unit', 'display_usage_count']
+    list_display = ['unit', 'dimension', 'factor', 'display_usage_count']
+    list_filter = ['dimension']
     search_fields = ['unit']
     ordering = ['unit']
 
+    @admin.display(description='Utilisations', ordering='usage_count')
     def display_usage_count(self, obj):
-        return obj.recipeingredient_set.count()
-    display_usage_count.short_description = 'Utilisations'
\ No newline at end of file
+        return obj.usage_count
+
+class MealPlanRecipeInline(admin.TabularInline):
+    model = MealPlanRecipe
+    extra = 1
+    autocomplete_fields = ['recipe']
+
+@admin.register(MealPlan)
+class MealPlanAdmin(admin.ModelAdmin):
+    list_display = ['name', 'user', 'updated_at']
+    list_select_related = ['user']
+    search_fields = ['name', 'user__username']
+    inlines = [MealPlanRecipeInline]
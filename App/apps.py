@@ -6,4 +6,5 @@ class AppConfig(AppConfig):
     name = 'App'
 
     def ready(self):
+        import App.checks
         import App.signals
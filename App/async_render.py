@@ -0,0 +1,26 @@
+"""
+Rendu des vues asynchrones (servies par Projet/asgi.py).
+
+Les données d'une page sont chargées avec l'ORM asynchrone dans la vue.
+L'utilisateur doit être résolu avec request.auser() : request.user est
+paresseux et ferait une requête synchrone au premier accès, interdite dans
+la boucle d'événements.
+
+Le moteur de gabarits reste synchrone : arender() l'exécute avec
+sync_to_async, dans le thread de la requête (ThreadSensitiveContext du
+gestionnaire ASGI), qui a sa propre connexion à la base. Une donnée lue
+paresseusement par un gabarit (droits de l'utilisateur, messages) reste
+donc possible sans bloquer la boucle.
+"""
+from asgiref.sync import sync_to_async
+from django.shortcuts import render
+
+
+async def aload_user(request):
+    """Résout request.user sans requête synchrone et le remplace par l'utilisateur chargé."""
+    request.user = await request.auser()
+    return request.user
+
+
+async def arender(request, template_name, context=None):
+    return await sync_to_async(render)(request, template_name, context)
@@ -0,0 +1,470 @@
+"""
+Export et import en masse du catalogue (unités, ingrédients, recettes).
+
+Le format est une suite d'enregistrements plats, un par ligne (JSONL) ou par
+rangée (CSV), distingués par leur colonne `type` :
+
+    unit               unit_fr_CA, unit_en, dimension, factor
+    ingredient         name_fr_CA, name_en, image
+    recipe             key, title_*, description_*, instructions_*, image, author, created_at, servings
+    recipe_ingredient  recipe (clé de la recette), ingredient, unit, quantity
+
+Les ingrédients et unités sont référencés par leur nom dans la langue par
+défaut, rapprochés à l'import par nom normalisé (sans accents ni
+majuscules). Les ingrédients d'une recette suivent immédiatement la recette.
+
+L'export et l'import lisent et écrivent au fil de l'eau : seuls un lot
+d'enregistrements et la table nom -> id des ingrédients et unités restent
+en mémoire.
+"""
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+from modeltranslation.translator import translator
+
+from . import conditional, images, page_cache, search, storage, usage
+from .ingredient_index import ingredient_index
+from .models import Ingredient, Recipe, RecipeIngredient, Unit
+from .quantities import quantize
+from .reference import reference_data
+from .text import normalize
+from .typeahead import ingredient_prefix_index
+from .units import conversions
+
+FORMATS = ('jsonl', 'csv')
+SERVINGS_MAX = 32767  # PositiveSmallIntegerField
+
+
+class CatalogError(Exception):
+    pass
+
+
+def translated_columns(model, field):
+    """Colonnes de `field` dans chaque langue, langue par défaut d'abord (ex: ['name_fr_CA', 'name_en'])."""
+    fields = {f.language: f.name for f in translator.get_options_for_model(model).all_fields[field]}
+    return [fields[code] for code, _name in settings.LANGUAGES if code in fields]
+
+
+def default_column(model, field):
+    return translated_columns(model, field)[0]
+
+
+def _recipe_columns():
+    return [column for field in search.SEARCH_FIELDS for column in translated_columns(Recipe, field)]
+
+
+def csv_header():
+    return [
+        'type', 'key',
+        *translated_columns(Unit, 'unit'), 'dimension', 'factor',
+        *translated_columns(Ingredient, 'name'),
+        *_recipe_columns(),
+        'image', 'author', 'created_at', 'servings',
+        'recipe', 'ingredient', 'unit', 'quantity',
+    ]
+
+
+def format_for(path, requested=None):
+    if requested:
+        return requested
+    if path and path.lower().endswith('.csv'):
+        return 'csv'
+    return 'jsonl'
+
+
+# Export #
+
+def export_records(batch_size=2000):
+    """Génère les enregistrements du catalogue, sans jamais charger une table entière."""
+    unit_columns = translated_columns(Unit, 'unit')
+    for row in Unit.objects.order_by('pk').values(*unit_columns, 'dimension', 'factor').iterator(chunk_size=batch_size):
+        yield {'type': 'unit', **row}
+
+    name_columns = translated_columns(Ingredient, 'name')
+    for row in Ingredient.objects.order_by('pk').values(*name_columns, 'image').iterator(chunk_size=batch_size):
+        yield {'type': 'ingredient', **row}
+
+    # Deux curseurs triés par recette, fusionnés : chaque recette est suivie de ses ingrédients
+    recipes = Recipe.objects.order_by('pk').values(
+        'pk', *_recipe_columns(), 'image', 'user__username', 'created_at', 'servings',
+    ).iterator(chunk_size=batch_size)
+    lines = RecipeIngredient.objects.order_by('recipe_id', 'pk').values_list(
+        'recipe_id',
+        f'ingredient__{default_column(Ingredient, "name")}',
+        f'unit__{default_column(Unit, "unit")}',
+        'quantity',
+    ).iterator(chunk_size=batch_size)
+    line = next(lines, None)
+    for recipe in recipes:
+        pk = recipe.pop('pk')
+        recipe['author'] = recipe.pop('user__username')
+        # isoformat garde les microsecondes, que DjangoJSONEncoder tronque
+        recipe['created_at'] = recipe['created_at'].isoformat()
+        yield {'type': 'recipe', 'key': str(pk), **recipe}
+        while line is not None and line[0] <= pk:
+            if line[0] == pk:
+                yield {'type': 'recipe_ingredient', 'recipe': str(pk), 'ingredient': line[1], 'unit': line[2], 'quantity': line[3]}
+            line = next(lines, None)
+
+
+def write_records(records, output, output_format):
+    """Écrit `records` dans `output` (fichier texte). Retourne le nombre d'enregistrements."""
+    count = 0
+    if output_format == 'csv':
+        writer = csv.DictWriter(output, fieldnames=csv_header(), extrasaction='ignore')
+        writer.writeheader()
+        for record in records:
+            writer.writerow({key: '' if value is None else value for key, value in record.items()})
+            count += 1
+    else:
+        encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+        for record in records:
+            output.write(encoder.encode(record))
+            output.write('\n')
+            count += 1
+    return count
+
+
+# Import #
+
+def read_records(source, input_format):
+    """Lit les enregistrements d'un fichier texte, une ligne à la fois."""
+    if input_format == 'csv':
+        for row in csv.DictReader(source):
+            yield {key: value for key, value in row.items() if value not in ('', None)}
+        return
+    for number, line in enumerate(source, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as error:
+            raise CatalogError(f"Ligne {number} : JSON invalide ({error})")
+
+
+class _ReferenceTable:
+    """Nom normalisé -> id, pour les unités ou les ingrédients (petites tables)."""
+
+    def __init__(self, model, field):
+        self.model = model
+        self.columns = translated_columns(model, field)
+        self.default = self.columns[0]
+        self.ids = {}
+        # Clés des autres langues (index uniques) : colonne -> {clé: propriétaire}
+        self.owners = {column: {} for column in self.columns[1:]}
+        for pk, name, *translations in model.objects.values_list('pk', *self.columns).iterator():
+            if name:
+                self.ids[normalize(name)] = pk
+            for column, value in zip(self.columns[1:], translations):
+                if normalize(value):
+                    self.owners[column][normalize(value)] = pk
+
+    def get(self, name):
+        return self.ids.get(normalize(name))
+
+    def claim(self, column, value, owner, previous=None):
+        """
+        Réserve la clé de `value` dans `column` pour `owner` (un id, ou la clé
+        par défaut d'une ligne à créer). False si une autre ligne l'a déjà.
+        """
+        owners = self.owners[column]
+        key = normalize(value)
+        if not key:
+            return True
+        if owners.get(key, owner) != owner:
+            return False
+        previous_key = normalize(previous)
+        if previous_key != key and owners.get(previous_key) == owner:
+            del owners[previous_key]
+        owners[key] = owner
+        return True
+
+    def rename_owner(self, old, new):
+        for owners in self.owners.values():
+            for key, owner in owners.items():
+                if owner == old:
+                    owners[key] = new
+
+
+class CatalogImporter:
+    """
+    Importe des enregistrements par lots : chaque lot est écrit dans sa propre
+    transaction avec des bulk_create / bulk_update (mises à jour des lignes
+    existantes, création des autres).
+    """
+
+    def __init__(self, batch_size=1000, stdout=None):
+        self.batch_size = batch_size
+        self.stdout = stdout
+        self.stats = {'units': 0, 'ingredients': 0, 'recipes': 0, 'recipe_ingredients': 0, 'skipped': 0, 'conflicts': 0}
+        self.units = _ReferenceTable(Unit, 'unit')
+        self.ingredients = _ReferenceTable(Ingredient, 'name')
+        self.users = {}
+        self._batch = []
+        self._batch_type = None
+
+    # Lecture #
+
+    def run(self, records):
+        for record in records:
+            record_type = record.get('type')
+            if record_type not in ('unit', 'ingredient', 'recipe', 'recipe_ingredient'):
+                self.stats['skipped'] += 1
+                continue
+            # Un lot ne mélange pas les types, et n'est jamais coupé au milieu d'une recette
+            group = 'recipe' if record_type == 'recipe_ingredient' else record_type
+            full = len(self._batch) >= self.batch_size and record_type != 'recipe_ingredient'
+            if self._batch and (group != self._batch_type or full):
+                self.flush()
+            self._batch_type = group
+            self._batch.append(record)
+        self.flush()
+        self._invalidate_caches()
+        return self.stats
+
+    def flush(self):
+        if not self._batch:
+            return
+        with transaction.atomic():
+            if self._batch_type == 'unit':
+                self._import_references(self._batch, self.units, 'unit')
+            elif self._batch_type == 'ingredient':
+                self._import_references(self._batch, self.ingredients, 'ingredient')
+            else:
+                self._import_recipes(self._batch)
+        self._batch = []
+        if self.stdout:
+            self.stdout.write(
+                f"{self.stats['recipes']} recette(s), {self.stats['ingredients']} ingrédient(s), "
+                f"{self.stats['units']} unité(s)…"
+            )
+
+    # Unités et ingrédients #
+
+    def _import_references(self, records, table, record_type):
+        model = table.model
+        existing = {}
+        to_create = {}
+        for record in records:
+            name = (record.get(table.default) or '').strip()
+            if not name:
+                self.stats['skipped'] += 1
+                continue
+            values = {column: (record.get(column) or '').strip() for column in table.columns if record.get(column)}
+            if record_type == 'ingredient' and record.get('image'):
+                values['image'] = record['image']
+            if record_type == 'unit':
+                values.update(self._unit_conversion(record))
+            pk = table.get(name)
+            if pk is not None:
+                existing[pk] = values
+            else:
+                to_create[normalize(name)] = values
+
+        # Une traduction déjà prise par une autre ligne violerait l'index unique
+        # de sa clé : elle est ignorée, la ligne est importée sans elle
+        if existing:
+            objects = model.objects.in_bulk(list(existing))
+            for pk, values in existing.items():
+                self._drop_conflicts(table, values, pk, objects[pk])
+        for key, values in to_create.items():
+            self._drop_conflicts(table, values, ('new', key))
+
+        if existing:
+            fields = set()
+            for pk, values in existing.items():
+                obj = objects[pk]
+                if 'image' in values and values['image'] != (obj.image.name or ''):
+                    self._swap_image(obj.image.name, values['image'])
+                for field, value in values.items():
+                    setattr(obj, field, value)
+                fields.update(values)
+                fields.update(obj.update_keys())
+            model.objects.bulk_update(list(objects.values()), sorted(fields), batch_size=self.batch_size)
+
+        # bulk_create n'appelle pas save() : les clés normalisées sont calculées ici
+        new_objects = [model(**values) for values in to_create.values()]
+        for obj in new_objects:
+            obj.update_keys()
+        created = model.objects.bulk_create(new_objects, batch_size=self.batch_size)
+        for key, obj in zip(to_create, created):
+            table.ids[key] = obj.pk
+            table.rename_owner(('new', key), obj.pk)
+            if 'image' in to_create[key]:
+                storage.acquire(to_create[key]['image'])
+        self.stats[f'{record_type}s'] += len(existing) + len(created)
+
+    def _drop_conflicts(self, table, values, owner, obj=None):
+        for column in table.columns[1:]:
+            if column in values and not table.claim(column, values[column], owner, getattr(obj, column, None)):
+                del values[column]
+                self.stats['conflicts'] += 1
+
+    @staticmethod
+    def _unit_conversion(record):
+        """Dimension et facteur de l'enregistrement, s'ils sont valides (absents des anciens fichiers)."""
+        values = {}
+        if record.get('dimension') in dict(Unit.DIMENSIONS):
+            values['dimension'] = record['dimension']
+        try:
+            factor = Decimal(str(record['factor'])) if record.get('factor') not in (None, '') else None
+        except InvalidOperation:
+            factor = None
+        if factor is not None and factor.is_finite() and factor > 0:
+            values['factor'] = factor
+        return values
+
+    @staticmethod
+    def _swap_image(old_name, new_name):
+        storage.acquire(new_name)
+        if old_name and storage.release(old_name):
+            images.delete_on_commit(Recipe._meta.get_field('image').storage, old_name)
+
+    # Recettes #
+
+    def _user_id(self, username):
+        if not username:
+            return None
+        if username not in self.users:
+            self.users[username] = User.objects.filter(username=username).values_list('pk', flat=True).first()
+        return self.users[username]
+
+    def _import_recipes(self, records):
+        title_column = default_column(Recipe, 'title')
+        columns = _recipe_columns()
+        recipes = {}  # clé du fichier -> valeurs
+        lines = {}  # clé du fichier -> {ingredient_id: (quantité, unit_id)}
+        for record in records:
+            if record['type'] == 'recipe':
+                # Sans clé, la recette ne peut pas recevoir d'ingrédients
+                key = record.get('key') or f'#{len(recipes)}'
+                if not (record.get(title_column) or '').strip():
+                    self.stats['skipped'] += 1
+                    continue
+                values = {column: record[column] for column in columns if record.get(column)}
+                values['user_id'] = self._user_id(record.get('author'))
+                if record.get('image'):
+                    values['image'] = record['image']
+                servings = str(record.get('servings') or '')
+                if servings.isdigit() and 0 < int(servings) <= SERVINGS_MAX:
+                    values['servings'] = int(servings)
+                created_at = record.get('created_at')
+                if created_at:
+                    values['created_at'] = parse_datetime(created_at) if isinstance(created_at, str) else created_at
+                recipes[key] = values
+                lines[key] = {}
+                continue
+            key = str(record.get('recipe'))
+            ingredient_id = self.ingredients.get(record.get('ingredient') or '')
+            unit_id = self.units.get(record.get('unit') or '')
+            try:
+                quantity = quantize(record.get('quantity'))
+            except (ArithmeticError, ValueError):
+                quantity = None
+            if key not in lines or ingredient_id is None or unit_id is None or quantity is None:
+                self.stats['skipped'] += 1
+                continue
+            lines[key][ingredient_id] = (quantity, unit_id)
+        if not recipes:
+            return
+
+        # Une recette existe déjà si elle a le même titre (normalisé) et le même auteur
+        wanted = {(normalize(values[title_column]), values['user_id']): key for key, values in recipes.items()}
+        titles = {values[title_column] for values in recipes.values()}
+        existing = {}
+        for obj in Recipe.objects.filter(**{f'{title_column}__in': titles}):
+            key = wanted.get((normalize(getattr(obj, title_column)), obj.user_id))
+            if key is not None:
+                existing[key] = obj
+
+        to_update = []
+        update_fields = set()
+        for key, obj in existing.items():
+            values = recipes[key]
+            values.pop('created_at', None)
+            if 'image' in values and values['image'] != (obj.image.name or ''):
+                self._swap_image(obj.image.name, values['image'])
+            for field, value in values.items():
+                setattr(obj, field, value)
+            update_fields.update(values)
+            update_fields.update(obj.render_instructions())
+            to_update.append(obj)
+        if to_update:
+            # Un INSERT ... ON CONFLICT(id) DO UPDATE par paquet : bien plus léger
+            # que les CASE WHEN de bulk_update, et auto_now met à jour updated_at
+            update_fields.add('updated_at')
+            Recipe.objects.bulk_create(
+                to_update,
+                batch_size=self.batch_size,
+                update_conflicts=True,
+                unique_fields=['id'],
+                update_fields=sorted(update_fields),
+            )
+
+        new_keys = [key for key in recipes if key not in existing]
+        new_recipes = [Recipe(**recipes[key]) for key in new_keys]
+        for obj in new_recipes:
+            obj.render_instructions()  # bulk_create n'appelle pas save()
+        created = Recipe.objects.bulk_create(new_recipes, batch_size=self.batch_size)
+        dated = []
+        for key, obj in zip(new_keys, created):
+            existing[key] = obj
+            if obj.image:
+                storage.acquire(obj.image.name)
+            # auto_now_add écrase la date à la création : on remet celle du fichier
+            if recipes[key].get('created_at'):
+                obj.created_at = recipes[key]['created_at']
+                dated.append(obj)
+        if dated:
+            Recipe.objects.bulk_update(dated, ['created_at'], batch_size=self.batch_size)
+
+        # Les ingrédients des recettes du lot deviennent ceux du fichier : upsert
+        # sur (recette, ingrédient) puis suppression des lignes absentes du fichier
+        wanted_lines = [
+            RecipeIngredient(recipe_id=existing[key].pk, ingredient_id=ingredient_id, quantity=quantity, unit_id=unit_id)
+            for key, rows in lines.items() if key in existing
+            for ingredient_id, (quantity, unit_id) in rows.items()
+        ]
+        if to_update:
+            kept = {(line.recipe_id, line.ingredient_id) for line in wanted_lines}
+            stale = [
+                pk for pk, recipe_id, ingredient_id in RecipeIngredient.objects.filter(
+                    recipe_id__in=[obj.pk for obj in to_update],
+                ).values_list('pk', 'recipe_id', 'ingredient_id')
+                if (recipe_id, ingredient_id) not in kept
+            ]
+            if stale:
+                RecipeIngredient.objects.filter(pk__in=stale).delete()
+        created_lines = RecipeIngredient.objects.bulk_create(
+            wanted_lines,
+            batch_size=self.batch_size,
+            update_conflicts=True,
+            unique_fields=['recipe', 'ingredient'],
+            update_fields=['quantity', 'unit'],
+        )
+
+        # bulk_create / bulk_update n'envoient pas de signaux
+        search.index_recipes(list(existing.values()))
+        # Un upsert peut changer l'unité d'une ligne existante : on recompte
+        # les recettes et ingrédients du lot, et les unités (table minuscule)
+        usage.recount(
+            recipe_ids=[obj.pk for obj in existing.values()],
+            ingredient_ids={line.ingredient_id for line in wanted_lines},
+        )
+        self.stats['recipes'] += len(existing)
+        self.stats['recipe_ingredients'] += len(created_lines)
+
+    def _invalidate_caches(self):
+        ingredient_index.invalidate()
+        ingredient_prefix_index.invalidate()
+        reference_data.invalidate()
+        conversions.invalidate()
+        conditional.invalidate_pages()
+        page_cache.purge(page_cache.ALL_PAGES)
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+from django.utils.module_loading import import_string
+
+
+@register(Tags.async_support)
+def check_async_middleware(app_configs, **kwargs):
+    """
+    Sous ASGI, un seul middleware qui n'est pas async_capable force Django à
+    faire passer toute la requête, vues asynchrones comprises, par un thread.
+    """
+    if not getattr(settings, 'ASYNC_VIEWS', False):
+        return []
+    warnings = []
+    for path in settings.MIDDLEWARE:
+        if not getattr(import_string(path), 'async_capable', False):
+            warnings.append(Warning(
+                f"Le middleware {path} n'est pas async_capable : les vues asynchrones seront exécutées en synchrone.",
+                hint="Déclarer async_capable (MiddlewareMixin ou sync_and_async_middleware) ou le retirer.",
+                id='App.W001',
+            ))
+    return warnings
@@ -0,0 +1,133 @@
+"""
+Requêtes conditionnelles (ETag / Last-Modified) pour les pages de recettes.
+
+Une page de recette ne change que si la recette change (updated_at), si la
+langue ou les droits de l'utilisateur diffèrent, ou si une donnée affichée
+à côté change (nom d'un ingrédient, d'une unité, dérivés d'une image). Ce
+dernier cas est couvert par l'heure de la dernière invalidation, gardée dans
+le cache et mise à jour par les signaux.
+
+Les validateurs sont calculés avant le rendu : si le client a déjà la bonne
+version, on répond 304 sans charger les ingrédients ni rendre le gabarit.
+"""
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.utils import translation
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .permissions import get_recipe_permissions
+
+_MODIFIED_KEY = 'recipe-pages:modified'
+
+
+def pages_modified():
+    """
+    Moment de la dernière invalidation globale (sert de génération dans les
+    ETags et de borne inférieure pour Last-Modified).
+    """
+    modified = cache.get(_MODIFIED_KEY)
+    if modified is None:
+        cache.add(_MODIFIED_KEY, time.time(), None)
+        modified = cache.get(_MODIFIED_KEY)
+    return modified
+
+
+def invalidate_pages(**kwargs):
+    """Invalide les validateurs de toutes les pages de recettes."""
+    cache.set(_MODIFIED_KEY, time.time(), None)
+
+
+def _permission_state(user):
+    """Ce qui, chez l'utilisateur, change l'affichage (nom, boutons, liens)."""
+    if not user.is_authenticated:
+        return 'anonymous'
+    perms = get_recipe_permissions(user)
+    flags = ''.join(
+        '1' if perms.has_perm(perm) else '0'
+        for perm in ('App.add_recipe', 'App.change_recipe', 'App.delete_recipe')
+    )
+    return f'{user.pk}:{user.username}:{",".join(sorted(perms.group_names))}:{flags}'
+
+
+def _etag(*parts):
+    language = translation.get_language() or ''
+    digest = hashlib.sha1(repr((language, pages_modified()) + parts).encode()).hexdigest()
+    return quote_etag(digest)
+
+
+def recipe_etag(request, recipe):
+    return _etag(
+        'recipe',
+        recipe.pk,
+        recipe.updated_at.isoformat(),
+        recipe.user.username if recipe.user_id else None,
+        _permission_state(request.user),
+    )
+
+
+def recipe_page_etag(request, page):
+    """ETag d'une page de liste : recettes affichées, la plus récente modification et la navigation."""
+    recipes = list(page)
+    newest = max((recipe.updated_at for recipe in recipes), default=None)
+    return _etag(
+        'recipe-list',
+        newest.isoformat() if newest else None,
+        tuple((recipe.pk, recipe.user.username if recipe.user_id else None) for recipe in recipes),
+        page.has_next(),
+        page.has_previous(),
+        page.paginator.count,
+        _permission_state(request.user),
+    )
+
+
+def _has_messages(request):
+    # Des messages en attente ne sont affichés qu'au rendu : pas de 304
+    return bool(len(get_messages(request)))
+
+
+def _last_modified(last_modified):
+    return max(last_modified.timestamp(), pages_modified()) if last_modified else None
+
+
+def _add_validators(response, etag, last_modified):
+    if response.status_code in (200, 304):
+        response.headers.setdefault('ETag', etag)
+        if last_modified:
+            response.headers.setdefault('Last-Modified', http_date(last_modified))
+    return response
+
+
+def conditional_response(request, etag, last_modified, render):
+    """
+    Retourne un 304 si le client a déjà cette version de la page, sinon
+    appelle `render()` et ajoute les validateurs à la réponse.
+    """
+    if _has_messages(request):
+        return render()
+    last_modified = _last_modified(last_modified)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = render()
+    return _add_validators(response, etag, last_modified)
+
+
+def _messages_and_last_modified(request, last_modified):
+    has_messages = _has_messages(request)
+    return has_messages, None if has_messages else _last_modified(last_modified)
+
+
+async def aconditional_response(request, etag, last_modified, render):
+    """Version asynchrone de conditional_response() : `render` est une fonction coroutine."""
+    # Messages et cache (SQLite) sont lus dans un thread, en un seul aller-retour
+    has_messages, last_modified = await sync_to_async(_messages_and_last_modified)(request, last_modified)
+    if has_messages:
+        return await render()
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = await render()
+    return _add_validators(response, etag, last_modified)
@@ -1,5 +1,9 @@
+from decimal import Decimal, InvalidOperation
+
 from django import forms
 from .models import Recipe, Ingredient, Unit, RecipeIngredient
+from .quantities import MAX_QUANTITY, quantize
+from .reference import reference_data
 
 
 class IngredientForm(forms.ModelForm):
@@ -28,8 +32,8 @@ class IngredientForm(forms.ModelForm):
         if not name:
             raise forms.ValidationError("Le nom de l'ingrédient ne peut pas être vide.")
         
-        # Vérifier l'unicité (exclure l'instance courante en cas de modification)
-        queryset = Ingredient.objects.filter(name__iexact=name)
+        # Vérifier l'unicité (sans casse ni accents, par l'index de la clé normalisée)
+        queryset = Ingredient.with_key(name)
         if self.instance.pk:
             queryset = queryset.exclude(pk=self.instance.pk)
         
@@ -44,7 +48,7 @@ class UnitForm(forms.ModelForm):
     
     class Meta:
         model = Unit
-        fields = ['unit']
+        fields = ['unit', 'dimension', 'factor']
         
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -54,6 +58,15 @@ class UnitForm(forms.ModelForm):
             'placeholder': 'Ex: g, ml, tasse, cuillère à soupe...',
             'id': 'unit'
         })
+        self.fields['dimension'].widget.attrs.update({
+            'class': 'form-select form-select-lg',
+            'id': 'dimension'
+        })
+        self.fields['factor'].widget.attrs.update({
+            'class': 'form-control form-control-lg',
+            'placeholder': 'Ex: 1000 pour kg, 250 pour une tasse...',
+            'id': 'factor'
+        })
         
     def clean_unit(self):
         """Validation personnalisée pour l'unité"""
@@ -61,8 +74,8 @@ class UnitForm(forms.ModelForm):
         if not unit:
             raise forms.ValidationError("L'unité ne peut pas être vide.")
         
-        # Vérifier l'unicité (exclure l'instance courante en cas de modification)
-        queryset = Unit.objects.filter(unit__iexact=unit)
+        # Vérifier l'unicité (sans casse ni accents, par l'index de la clé normalisée)
+        queryset = Unit.with_key(unit)
         if self.instance.pk:
             queryset = queryset.exclude(pk=self.instance.pk)
         
@@ -71,11 +84,88 @@ class UnitForm(forms.ModelForm):
         
         return unit
 
+    def clean(self):
+        """La dimension et le facteur de conversion vont ensemble"""
+        cleaned_data = super().clean()
+        dimension = cleaned_data.get('dimension')
+        factor = cleaned_data.get('factor')
+        if factor is not None and factor <= 0:
+            self.add_error('factor', "Le facteur de conversion doit être positif.")
+        elif dimension and factor is None:
+            self.add_error('factor', "Indiquez le facteur de conversion de cette dimension.")
+        elif factor is not None and not dimension:
+            self.add_error('dimension', "Choisissez la dimension de cette unité.")
+        return cleaned_data
+
+
+class RecipeIngredientRows:
+    """
+    Validation des lignes d'ingrédients d'un formulaire de recette
+    (champs ingredient_ids, quantity_<id> et unit_<id>).
+
+    Les ingrédients et les unités soumis sont résolus dans l'instantané des
+    données de référence (App.reference), sans requête, les quantités sont lues en Decimal et toutes les erreurs sont
+    rapportées en une seule passe.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.errors = []
+        self.cleaned_rows = []  # (ingredient_id, Decimal, unit_id)
+        self.rows = []  # lignes à réafficher dans le sélecteur
 
+    @staticmethod
+    def _parse_id(value):
+        value = (value or '').strip()
+        return int(value) if value.isdigit() else None
 
+    @staticmethod
+    def _parse_quantity(value):
+        try:
+            quantity = Decimal((value or '').strip().replace(',', '.'))
+            # Valeur telle qu'enregistrée (centièmes) : 0,004 deviendrait 0
+            quantity = quantize(quantity) if quantity.is_finite() else None
+        except InvalidOperation:
+            return None
+        if quantity is None or quantity <= 0 or quantity > MAX_QUANTITY:
+            return None
+        return quantity
 
+    def is_valid(self):
+        submitted = []
+        seen = set()
+        for raw_id in self.data.getlist('ingredient_ids'):
+            ingredient_id = self._parse_id(raw_id)
+            if ingredient_id is None or ingredient_id in seen:
+                continue
+            seen.add(ingredient_id)
+            submitted.append((
+                ingredient_id,
+                self.data.get(f'quantity_{raw_id}', ''),
+                self._parse_id(self.data.get(f'unit_{raw_id}')),
+            ))
 
+        if not submitted:
+            self.errors.append("Veuillez sélectionner au moins un ingrédient.")
+            return False
 
+        reference = reference_data.get()
 
+        for ingredient_id, raw_quantity, unit_id in submitted:
+            name = reference.ingredient_names.get(ingredient_id)
+            if name is None:
+                self.errors.append(f"L'ingrédient #{ingredient_id} n'existe pas.")
+                continue
+            self.rows.append({'id': ingredient_id, 'name': name, 'quantity': raw_quantity, 'unit_id': unit_id})
 
+            quantity = self._parse_quantity(raw_quantity)
+            if quantity is None:
+                self.errors.append(f"Une quantité valide est requise pour l'ingrédient {name}.")
+            if unit_id is None:
+                self.errors.append(f"Une unité est requise pour l'ingrédient {name}.")
+            elif unit_id not in reference.unit_names:
+                self.errors.append(f"L'unité choisie pour l'ingrédient {name} n'existe pas.")
+            elif quantity is not None:
+                self.cleaned_rows.append((ingredient_id, quantity, unit_id))
 
+        return not self.errors
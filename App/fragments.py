@@ -0,0 +1,53 @@
+"""
+Cache des fragments de gabarits : le corps des cartes de recettes.
+
+Une carte (image, auteur, titre, description) ne dépend que de la recette
+et de la langue ; sa clé contient donc l'id, updated_at, l'auteur et la
+langue. Une recette modifiée change de clé, l'ancienne entrée expire
+d'elle-même. Les boutons qui dépendent des droits de l'utilisateur sont
+rendus hors du fragment : une même carte sert à tous les visiteurs.
+
+Les cartes d'une grille sont lues en un seul get_many, et seules les
+cartes absentes sont rendues puis écrites en un seul set_many.
+"""
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils import translation
+
+from . import images
+
+CARD_TEMPLATE = 'App/includes/recipe_card_body.html'
+CARD_TIMEOUT = 24 * 3600
+
+
+def card_key(recipe):
+    return 'recipe-card:{}:{}:{}:{}'.format(
+        recipe.pk,
+        recipe.updated_at.timestamp(),
+        recipe.user.username if recipe.user_id else '',
+        translation.get_language() or '',
+    )
+
+
+def _is_final(recipe):
+    # Tant que ses dérivés ne sont pas générés, la carte sert l'image
+    # originale : elle n'est pas mise en cache pour ne pas figer ce rendu
+    return not recipe.image or images.has_derivatives(recipe.image.name)
+
+
+def recipe_cards(recipes):
+    """{recipe.pk: HTML du corps de la carte} pour toutes les recettes."""
+    keys = {card_key(recipe): recipe for recipe in recipes}
+    cached = cache.get_many(keys)
+    cards = {keys[key].pk: html for key, html in cached.items()}
+    rendered = {}
+    for key, recipe in keys.items():
+        if key in cached:
+            continue
+        html = render_to_string(CARD_TEMPLATE, {'recipe': recipe})
+        cards[recipe.pk] = html
+        if _is_final(recipe):
+            rendered[key] = html
+    if rendered:
+        cache.set_many(rendered, CARD_TIMEOUT)
+    return cards
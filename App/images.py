@@ -0,0 +1,191 @@
+"""
+Dérivés redimensionnés des images de recettes et d'ingrédients.
+
+Pour chaque image téléversée, on produit une version par taille (miniature,
+carte, plein écran) en WebP et en JPEG, à côté de l'original :
+
+    recipes/IMG_1905.jpg -> recipes/derivatives/IMG_1905.jpg_card.webp, ...
+
+La génération se fait avec Pillow dans un pool de threads local, après le
+commit de la transaction, pour ne pas ralentir la requête qui téléverse.
+"""
+import io
+import logging
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from . import page_cache
+from .conditional import invalidate_pages
+
+logger = logging.getLogger(__name__)
+
+# Largeur maximale (px) de chaque dérivé
+SIZES = {
+    'thumb': 160,
+    'card': 480,
+    'full': 1600,
+}
+
+# Format -> (extension, options de Image.save)
+FORMATS = {
+    'webp': ('webp', {'format': 'WEBP', 'quality': 80, 'method': 4}),
+    'jpeg': ('jpg', {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+_executor = None
+_in_progress = set()  # Images dont les dérivés sont en cours de génération
+_in_progress_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        workers = getattr(settings, 'IMAGE_DERIVATIVES_WORKERS', 2)
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-derivatives')
+    return _executor
+
+
+def derivative_name(name, size, image_format):
+    directory, filename = posixpath.split(name)
+    extension = FORMATS[image_format][0]
+    # Le nom complet (extension comprise) évite que photo.jpg et photo.png partagent leurs dérivés
+    return posixpath.join(directory, 'derivatives', f'{filename}_{size}.{extension}')
+
+
+def derivative_names(name):
+    return [derivative_name(name, size, image_format) for size in SIZES for image_format in FORMATS]
+
+
+def generate_derivatives(name, storage=default_storage):
+    """Crée les dérivés manquants de l'image `name`. Retourne le nombre de fichiers créés."""
+    missing = [
+        (size, image_format)
+        for size in SIZES
+        for image_format in FORMATS
+        if not storage.exists(derivative_name(name, size, image_format))
+    ]
+    if not missing:
+        return 0
+
+    with storage.open(name, 'rb') as source:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        has_alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    created = 0
+    # Du plus grand au plus petit : chaque taille est réduite à partir de la précédente
+    for size in sorted(SIZES, key=SIZES.get, reverse=True):
+        width = SIZES[size]
+        if image.width > width:
+            image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+        for image_format in FORMATS:
+            if (size, image_format) not in missing:
+                continue
+            extension, options = FORMATS[image_format]
+            converted = image
+            if options['format'] == 'JPEG' and image.mode == 'RGBA':
+                converted = _flatten(image)
+            buffer = io.BytesIO()
+            converted.save(buffer, **options)
+            storage.save(derivative_name(name, size, image_format), ContentFile(buffer.getvalue()))
+            created += 1
+    return created
+
+
+def _flatten(image):
+    """Remplace la transparence par un fond blanc (le JPEG n'a pas de canal alpha)."""
+    background = Image.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def _generate_safely(name):
+    # Deux téléversements identiques partagent le même nom : une seule génération à la fois
+    with _in_progress_lock:
+        if name in _in_progress:
+            return
+        _in_progress.add(name)
+    try:
+        if generate_derivatives(name):
+            # Les pages qui affichent l'image changent (srcset) sans que la ligne change
+            invalidate_pages()
+            page_cache.purge(f'image:{name}')
+    except FileNotFoundError:
+        pass  # Image supprimée entre-temps
+    except Exception:
+        logger.exception("Impossible de générer les dérivés de l'image %s", name)
+    finally:
+        with _in_progress_lock:
+            _in_progress.discard(name)
+
+
+def schedule_derivatives(name):
+    """Génère les dérivés en arrière-plan, une fois la transaction validée."""
+    if not name:
+        return
+    transaction.on_commit(lambda: _get_executor().submit(_generate_safely, name))
+
+
+class _DeletionBatch:
+    """Fichiers à supprimer au commit d'une transaction (un seul callback par transaction)."""
+
+    def __init__(self, savepoint_ids):
+        self.savepoint_ids = savepoint_ids
+        self.files = []
+
+    def __call__(self):
+        for storage, name in self.files:
+            is_referenced = getattr(storage, 'is_referenced', None)
+            if is_referenced is not None and is_referenced(name):
+                continue  # Réutilisé entre-temps par un autre téléversement identique
+            try:
+                delete_derivatives(name, storage)
+                storage.delete(name)
+            except OSError:
+                logger.exception("Impossible de supprimer l'image %s", name)
+
+
+def delete_on_commit(storage, name, using=None):
+    """
+    Supprime l'image `name` et ses dérivés une fois la transaction validée.
+    Les suppressions d'une même transaction sont regroupées dans un seul
+    callback ; si elle est annulée, aucun fichier n'est touché.
+    """
+    if not name:
+        return
+    connection = transaction.get_connection(using)
+    # atomic(savepoint=False) empile None : seuls les vrais savepoints comptent
+    savepoint_ids = [sid for sid in connection.savepoint_ids if sid is not None]
+    batch = getattr(connection, '_pending_image_deletions', None)
+    # Le lot n'est réutilisable que s'il est toujours en attente pour le même savepoint
+    pending = batch is not None and batch.savepoint_ids == savepoint_ids and any(
+        callback is batch for _sids, callback, _robust in connection.run_on_commit
+    )
+    if pending:
+        batch.files.append((storage, name))
+        return
+    batch = _DeletionBatch(savepoint_ids)
+    batch.files.append((storage, name))
+    connection._pending_image_deletions = batch
+    transaction.on_commit(batch, using)
+
+
+def delete_derivatives(name, storage=default_storage):
+    if not name:
+        return
+    for derivative in derivative_names(name):
+        storage.delete(derivative)
+
+
+def has_derivatives(name, storage=default_storage):
+    return bool(name) and storage.exists(derivative_name(name, 'card', 'jpeg'))
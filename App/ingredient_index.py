@@ -0,0 +1,232 @@
+"""
+Index inversé ingrédient → recettes pour « Qu'est-ce que je peux cuisiner ? ».
+
+L'index est gardé en mémoire dans chaque processus :
+- postings : id d'ingrédient → array trié des ids de recettes qui l'utilisent
+- recipes : id de recette → array trié des ids de ses ingrédients
+
+Il est chargé au premier usage (une seule requête sur RecipeIngredient),
+puis mis à jour recette par recette. Chaque modification incrémente un
+compteur de génération dans le cache et y publie le delta de la recette
+(ses ingrédients après le commit) sous le numéro de génération : les autres
+workers rattrapent leur copie en appliquant les deltas manquants. Une
+génération sans delta (import en masse, delta expiré) force le rechargement
+complet.
+
+Les modifications d'une transaction sont regroupées : une seule
+publication par recette, après le commit.
+"""
+import threading
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import transaction
+
+from Projet.cache import bump_generation, current_generation
+
+from .models import RecipeIngredient
+
+_GENERATION_KEY = 'ingredient-index:generation'
+_DELTA_KEY = 'ingredient-index:delta:{}'
+DELTA_TIMEOUT = 3600
+MAX_DELTAS = 500  # Au-delà, recharger l'index coûte moins cher que rattraper
+
+
+class IngredientIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = None
+        self._recipes = None
+        self._generation = None
+
+    # Chargement #
+
+    def _load(self):
+        postings = {}
+        recipes = {}
+        rows = RecipeIngredient.objects.order_by('recipe_id', 'ingredient_id').values_list('recipe_id', 'ingredient_id')
+        for recipe_id, ingredient_id in rows.iterator(chunk_size=10000):
+            recipes.setdefault(recipe_id, array('q')).append(ingredient_id)
+            postings.setdefault(ingredient_id, array('q')).append(recipe_id)
+        # Les recettes arrivent triées par id : chaque posting l'est aussi
+        self._postings = postings
+        self._recipes = recipes
+
+    def _ensure_loaded(self):
+        generation = current_generation(_GENERATION_KEY)
+        if self._recipes is None or generation != self._generation:
+            with self._lock:
+                if self._recipes is not None and self._catch_up(generation):
+                    return
+                if self._recipes is None or generation != self._generation:
+                    self._load()
+                    self._generation = generation
+
+    def _catch_up(self, generation):
+        """Applique les deltas publiés depuis notre chargement ; False s'il faut recharger."""
+        if self._generation is None or not 0 <= generation - self._generation <= MAX_DELTAS:
+            return False
+        generations = range(self._generation + 1, generation + 1)
+        deltas = cache.get_many([_DELTA_KEY.format(g) for g in generations])
+        if len(deltas) != len(generations):
+            return False
+        for g in generations:
+            recipe_id, ingredient_ids = deltas[_DELTA_KEY.format(g)]
+            self._replace(recipe_id, ingredient_ids)
+        self._generation = generation
+        return True
+
+    def reset(self):
+        with self._lock:
+            self._postings = None
+            self._recipes = None
+            self._generation = None
+
+    def invalidate(self):
+        """Force le rechargement de l'index dans tous les processus (ex: après un import en masse)."""
+        with self._lock:
+            self._recipes = None
+            self._postings = None
+            bump_generation(_GENERATION_KEY)
+
+    # Mises à jour incrémentales #
+
+    def publish(self, recipe_ids):
+        """
+        Publie l'état actuel des recettes (après le commit) : les autres
+        workers appliqueront ces deltas, ce processus les applique tout de suite.
+        """
+        recipe_ids = sorted(set(recipe_ids))
+        if not recipe_ids:
+            return
+        # Le compteur est incrémenté avant de lire la base : le delta de la
+        # génération la plus haute voit toujours le dernier commit. Un compteur
+        # perdu repart de l'horloge : tous les workers rechargeront.
+        last = bump_generation(_GENERATION_KEY, len(recipe_ids))
+        first = last - len(recipe_ids) + 1
+        ingredients = {recipe_id: [] for recipe_id in recipe_ids}
+        rows = RecipeIngredient.objects.filter(recipe_id__in=recipe_ids).values_list('recipe_id', 'ingredient_id')
+        for recipe_id, ingredient_id in rows:
+            ingredients[recipe_id].append(ingredient_id)
+        deltas = {
+            generation: (recipe_id, tuple(sorted(set(ingredients[recipe_id]))))
+            for generation, recipe_id in enumerate(recipe_ids, first)
+        }
+        cache.set_many({_DELTA_KEY.format(g): delta for g, delta in deltas.items()}, DELTA_TIMEOUT)
+        with self._lock:
+            if self._recipes is not None and self._generation == first - 1:
+                for g in range(first, last + 1):
+                    self._replace(*deltas[g])
+                self._generation = last
+            # Sinon, le prochain usage rattrape les deltas (ou recharge)
+
+    def refresh_on_commit(self, recipe_id, using=None):
+        """
+        Publie la recette après le commit. Les recettes d'une même transaction
+        sont regroupées dans un seul callback, donc une publication par recette.
+        """
+        connection = transaction.get_connection(using)
+        # Même logique que images.delete_on_commit
+        savepoint_ids = [sid for sid in connection.savepoint_ids if sid is not None]
+        batch = getattr(connection, '_pending_index_refresh', None)
+        pending = batch is not None and batch.savepoint_ids == savepoint_ids and any(
+            callback is batch for _sids, callback, _robust in connection.run_on_commit
+        )
+        if pending:
+            batch.recipe_ids.add(recipe_id)
+            return
+        batch = _RefreshBatch(self, savepoint_ids)
+        batch.recipe_ids.add(recipe_id)
+        connection._pending_index_refresh = batch
+        transaction.on_commit(batch, using)
+
+    def _replace(self, recipe_id, ingredient_ids):
+        self._remove(recipe_id)
+        if ingredient_ids:
+            self._recipes[recipe_id] = array('q', ingredient_ids)
+            for ingredient_id in ingredient_ids:
+                insort(self._postings.setdefault(ingredient_id, array('q')), recipe_id)
+
+    def _remove(self, recipe_id):
+        for ingredient_id in self._recipes.pop(recipe_id, ()):
+            posting = self._postings.get(ingredient_id)
+            if posting is None:
+                continue
+            position = bisect_left(posting, recipe_id)
+            if position < len(posting) and posting[position] == recipe_id:
+                del posting[position]
+            if not posting:
+                del self._postings[ingredient_id]
+
+    # Requêtes #
+
+    @property
+    def is_loaded(self):
+        return self._recipes is not None
+
+    def ingredient_ids(self, recipe_id):
+        with self._lock:
+            self._ensure_loaded()
+            return list(self._recipes.get(recipe_id, ()))
+
+    def match(self, ingredient_ids, max_missing=2, limit=None):
+        """
+        Recettes utilisant au moins un des ingrédients donnés et à qui il
+        manque au plus `max_missing` ingrédients.
+
+        Retourne une liste de tuples (recipe_id, manquants, trouvés, total)
+        triée par nombre d'ingrédients manquants puis par couverture.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            hits = Counter()
+            for ingredient_id in set(ingredient_ids):
+                hits.update(self._postings.get(ingredient_id, ()))
+            results = []
+            for recipe_id, found in hits.items():
+                total = len(self._recipes[recipe_id])
+                missing = total - found
+                if missing <= max_missing:
+                    results.append((recipe_id, missing, found, total))
+        results.sort(key=lambda r: (r[1], -r[2], r[0]))
+        return results[:limit] if limit else results
+
+
+class _RefreshBatch:
+    """Recettes à publier au commit d'une transaction (un seul callback par transaction)."""
+
+    def __init__(self, index, savepoint_ids):
+        self.index = index
+        self.savepoint_ids = savepoint_ids
+        self.recipe_ids = set()
+
+    def __call__(self):
+        self.index.publish(self.recipe_ids)
+
+
+ingredient_index = IngredientIndex()
+
+
+def cookable_recipes(queryset, ingredient_ids, max_missing=2, limit=50):
+    """
+    Recettes de `queryset` réalisables avec `ingredient_ids`, sous forme de
+    dicts {recipe, missing, found, total, missing_ids}, les plus complètes d'abord.
+    """
+    matches = ingredient_index.match(ingredient_ids, max_missing=max_missing, limit=limit)
+    recipes = queryset.in_bulk([recipe_id for recipe_id, *_ in matches])
+    available = set(ingredient_ids)
+    results = []
+    for recipe_id, missing, found, total in matches:
+        if recipe_id not in recipes:
+            continue
+        missing_ids = [i for i in ingredient_index.ingredient_ids(recipe_id) if i not in available] if missing else []
+        results.append({
+            'recipe': recipes[recipe_id],
+            'missing': missing,
+            'found': found,
+            'total': total,
+            'missing_ids': missing_ids,
+        })
+    return results
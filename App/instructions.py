@@ -0,0 +1,41 @@
+"""
+Rendu HTML des instructions de recette.
+
+Les instructions sont découpées en étapes (« 1. Étape un 2. Étape deux »)
+et rendues une seule fois, à la sauvegarde, pour chaque langue : la page de
+détail affiche le HTML stocké sans refaire le découpage. Le texte saisi par
+l'utilisateur est toujours échappé.
+"""
+import re
+
+from django.utils.html import format_html, format_html_join
+
+STEP_NUMBER = re.compile(r'(\d+\.\s*)')
+
+
+def parse_steps(text):
+    """
+    Liste des étapes numérotées de `text`, ou None s'il n'y a pas de
+    numérotation (le texte est alors un seul paragraphe).
+    """
+    # Les retours à la ligne ne séparent pas les étapes
+    text = (text or '').replace('\n', ' ').replace('\r', ' ')
+    parts = STEP_NUMBER.split(text)
+    if len(parts) == 1:
+        return None
+    # Les indices impairs contiennent les numéros, les pairs le texte
+    return [part.strip() for part in parts[2::2] if part.strip()]
+
+
+def render_html(text):
+    """HTML échappé des instructions : liste numérotée ou paragraphe."""
+    if not text:
+        return ''
+    steps = parse_steps(text)
+    if steps is None:
+        paragraph = text.replace('\n', ' ').replace('\r', ' ')
+        return format_html('<p class="instruction-text">{}</p>', paragraph)
+    return format_html(
+        '<ol class="instruction-list">{}</ol>',
+        format_html_join('', '<li class="instruction-item">{}</li>', ((step,) for step in steps)),
+    )
@@ -0,0 +1,88 @@
+import multiprocessing
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+def _read_worker(duration, seed, results):
+    # Processus séparé : comme un worker WSGI, avec ses propres connexions
+    import django
+    django.setup()
+    from App.models import Recipe, RecipeIngredient
+
+    connections.close_all()
+    rng = random.Random(seed)
+    pks = list(Recipe.objects.order_by().values_list('pk', flat=True)[:5000])
+    reads = errors = 0
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        try:
+            # Une page de liste puis une page de détail
+            list(Recipe.objects.select_related('user').order_by('-created_at', '-pk')[:9])
+            if pks:
+                recipe_id = rng.choice(pks)
+                Recipe.objects.select_related('user').get(pk=recipe_id)
+                list(RecipeIngredient.objects.filter(recipe_id=recipe_id).select_related('ingredient', 'unit'))
+            reads += 1
+        except Exception:
+            errors += 1
+    connections.close_all()
+    results.put(('read', reads, errors))
+
+
+def _write_worker(duration, results):
+    import django
+    django.setup()
+    from django.utils import timezone
+    from App.models import Recipe
+
+    connections.close_all()
+    pk = Recipe.objects.order_by().values_list('pk', flat=True).first()
+    writes = errors = 0
+    end = time.monotonic() + duration
+    while pk is not None and time.monotonic() < end:
+        try:
+            Recipe.objects.filter(pk=pk).update(updated_at=timezone.now())
+            writes += 1
+        except Exception:
+            errors += 1
+    connections.close_all()
+    results.put(('write', writes, errors))
+
+
+class Command(BaseCommand):
+    help = "Mesure le débit de lecture (pages de recettes) selon le nombre de processus lecteurs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', default='1,2,4', help="Nombres de lecteurs à essayer (ex: 1,2,4,8)")
+        parser.add_argument('--duration', type=float, default=5.0, help="Durée de chaque mesure (secondes)")
+        parser.add_argument('--writer', action='store_true', help="Ajoute un processus qui écrit en continu")
+
+    def handle(self, *args, **options):
+        counts = [int(value) for value in options['workers'].split(',') if value.strip()]
+        duration = options['duration']
+        self.stdout.write(f"{'lecteurs':>8} {'lectures/s':>12} {'par lecteur':>12} {'écritures/s':>12} {'erreurs':>8}")
+        for count in counts:
+            connections.close_all()
+            results = multiprocessing.Queue()
+            processes = [
+                multiprocessing.Process(target=_read_worker, args=(duration, seed, results))
+                for seed in range(count)
+            ]
+            if options['writer']:
+                processes.append(multiprocessing.Process(target=_write_worker, args=(duration, results)))
+            for process in processes:
+                process.start()
+            totals = {'read': 0, 'write': 0}
+            errors = 0
+            for _process in processes:
+                kind, done, failed = results.get()
+                totals[kind] += done
+                errors += failed
+            for process in processes:
+                process.join()
+            reads = totals['read'] / duration
+            writes = f"{totals['write'] / duration:.0f}" if options['writer'] else '-'
+            self.stdout.write(f"{count:>8} {reads:>12.0f} {reads / count:>12.0f} {writes:>12} {errors:>8}")
@@ -0,0 +1,198 @@
+import asyncio
+import io
+import multiprocessing
+import os
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+HOST = 'localhost'
+
+
+def _setup(async_views):
+    # Processus neuf (spawn) : chaque mode est un worker distinct, comme en production
+    os.environ['DJANGO_ASYNC_VIEWS'] = '1' if async_views else '0'
+    if async_views:
+        os.environ.setdefault('DJANGO_CONN_MAX_AGE', '0')  # Comme Projet/asgi.py
+    import django
+    django.setup()
+
+
+def _default_paths():
+    from App.models import Recipe
+    paths = ['/fr-ca/recipes/', '/fr-ca/ingredients/', '/fr-ca/units/']
+    pk = Recipe.objects.order_by('-created_at').values_list('pk', flat=True).first()
+    if pk is not None:
+        paths.append(f'/fr-ca/recipes/{pk}/')
+    return paths
+
+
+def _wsgi_worker(paths, cookie, concurrency, duration, results):
+    """Un worker WSGI à `concurrency` threads (comme gunicorn --threads)."""
+    _setup(async_views=False)
+    from Projet.wsgi import application
+
+    paths = paths or _default_paths()
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    end = time.monotonic() + duration
+
+    def client(offset):
+        done, failed = [], 0
+        n = offset
+        while time.monotonic() < end:
+            path = paths[n % len(paths)]
+            n += 1
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+                'SERVER_NAME': HOST, 'SERVER_PORT': '80', 'HTTP_HOST': HOST, 'SERVER_PROTOCOL': 'HTTP/1.1',
+                'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(), 'wsgi.errors': io.StringIO(),
+                'wsgi.multithread': True, 'wsgi.multiprocess': True, 'wsgi.run_once': False,
+            }
+            if cookie:
+                environ['HTTP_COOKIE'] = cookie
+            status = []
+            start = time.perf_counter()
+            body = application(environ, lambda code, headers, exc_info=None: status.append(code))
+            for _chunk in body:
+                pass
+            body.close()
+            done.append(time.perf_counter() - start)
+            if not status[0].startswith('200'):
+                failed += 1
+        with lock:
+            latencies.extend(done)
+            errors.append(failed)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put(('wsgi', latencies, sum(errors)))
+
+
+def _asgi_worker(paths, cookie, concurrency, duration, results):
+    """Un worker ASGI : `concurrency` requêtes en vol sur une boucle d'événements."""
+    _setup(async_views=True)
+    from asgiref.sync import sync_to_async
+    from Projet.asgi import application
+
+    async def get(path):
+        status = []
+        disconnect = asyncio.Event()
+        sent = False
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await disconnect.wait()  # Le client reste connecté
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+
+        headers = [(b'host', HOST.encode())]
+        if cookie:
+            headers.append((b'cookie', cookie.encode()))
+        await application({
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+            'root_path': '', 'headers': headers, 'client': ('127.0.0.1', 0), 'server': (HOST, 80),
+        }, receive, send)
+        disconnect.set()
+        return status[0]
+
+    async def main():
+        nonlocal paths
+        paths = paths or await sync_to_async(_default_paths)()
+        latencies = []
+        failed = 0
+        end = time.monotonic() + duration
+
+        async def client(offset):
+            nonlocal failed
+            n = offset
+            while time.monotonic() < end:
+                path = paths[n % len(paths)]
+                n += 1
+                start = time.perf_counter()
+                status = await get(path)
+                latencies.append(time.perf_counter() - start)
+                if status != 200:
+                    failed += 1
+
+        await asyncio.gather(*(client(i) for i in range(concurrency)))
+        return latencies, failed
+
+    latencies, failed = asyncio.run(main())
+    results.put(('asgi', latencies, failed))
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare le débit par processus des pages de lecture servies en WSGI "
+        "(vues synchrones, threads) et en ASGI (vues asynchrones)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', default='1,8,32', help="Requêtes simultanées à essayer (ex: 1,8,32)")
+        parser.add_argument('--duration', type=float, default=5.0, help="Durée de chaque mesure (secondes)")
+        parser.add_argument('--mode', choices=('both', 'wsgi', 'asgi'), default='both')
+        parser.add_argument('--path', action='append', dest='paths', help="Page à demander (répétable) ; par défaut listes et une recette")
+        parser.add_argument(
+            '--user',
+            help="Nom d'un utilisateur à connecter : les pages sont alors rendues à chaque requête (pas de cache des pages anonymes)",
+        )
+
+    def _session_cookie(self, username):
+        from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+        from django.contrib.sessions.backends.db import SessionStore
+        from django.conf import settings
+
+        try:
+            user = get_user_model().objects.get(username=username)
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"Utilisateur inconnu : {username}")
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        return session, f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+
+    def handle(self, *args, **options):
+        levels = [int(value) for value in options['concurrency'].split(',') if value.strip()]
+        modes = ('wsgi', 'asgi') if options['mode'] == 'both' else (options['mode'],)
+        workers = {'wsgi': _wsgi_worker, 'asgi': _asgi_worker}
+        session, cookie = self._session_cookie(options['user']) if options['user'] else (None, '')
+        context = multiprocessing.get_context('spawn')
+        self.stdout.write(f"{'mode':>5} {'simultanées':>11} {'requêtes/s':>11} {'p50 (ms)':>9} {'p95 (ms)':>9} {'erreurs':>8}")
+        try:
+            for concurrency in levels:
+                for mode in modes:
+                    results = context.Queue()
+                    process = context.Process(
+                        target=workers[mode],
+                        args=(options['paths'], cookie, concurrency, options['duration'], results),
+                    )
+                    process.start()
+                    _mode, latencies, errors = results.get()
+                    process.join()
+                    if not latencies:
+                        self.stdout.write(f"{mode:>5} {concurrency:>11} {'-':>11} {'-':>9} {'-':>9} {errors:>8}")
+                        continue
+                    latencies.sort()
+                    p50 = statistics.median(latencies) * 1000
+                    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+                    rate = len(latencies) / options['duration']
+                    self.stdout.write(f"{mode:>5} {concurrency:>11} {rate:>11.0f} {p50:>9.1f} {p95:>9.1f} {errors:>8}")
+        finally:
+            if session is not None:
+                session.delete()
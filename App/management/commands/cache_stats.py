@@ -0,0 +1,24 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Affiche les succès et échecs du cache (tous les workers) et la taille des deux niveaux."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Remet les compteurs à zéro.")
+
+    def handle(self, *args, **options):
+        if not hasattr(cache, 'stats'):
+            raise CommandError("Le backend de cache configuré ne tient pas de statistiques.")
+        if options['reset']:
+            cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS("Compteurs remis à zéro."))
+            return
+        stats = cache.stats()
+        self.stdout.write(f"Succès en mémoire : {stats['local_hits']}")
+        self.stdout.write(f"Succès dans le fichier partagé : {stats['shared_hits']}")
+        self.stdout.write(f"Échecs : {stats['misses']}")
+        if stats['hit_rate'] is not None:
+            self.stdout.write(f"Taux de succès : {stats['hit_rate']:.1%}")
+        self.stdout.write(f"Entrées : {stats['shared_entries']} dans le fichier, {stats['local_entries']} en mémoire (ce processus)")
@@ -0,0 +1,24 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from App import catalog
+
+
+class Command(BaseCommand):
+    help = "Exporte les unités, ingrédients et recettes (toutes les langues) en JSONL ou CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', nargs='?', help="Fichier de sortie (sortie standard par défaut)")
+        parser.add_argument('--format', choices=catalog.FORMATS, help="jsonl par défaut, csv si le fichier finit par .csv")
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        output_format = catalog.format_for(options['output'], options['format'])
+        records = catalog.export_records(batch_size=options['batch_size'])
+        if not options['output']:
+            catalog.write_records(records, sys.stdout, output_format)
+            return
+        with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+            count = catalog.write_records(records, output, output_format)
+        self.stdout.write(self.style.SUCCESS(f"{count} enregistrement(s) exporté(s) dans {options['output']}."))
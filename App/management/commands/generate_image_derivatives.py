@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from App import images
+from App.models import Ingredient, Recipe
+
+
+class Command(BaseCommand):
+    help = "Génère les dérivés (miniature, carte, plein écran) manquants des images existantes."
+
+    def handle(self, *args, **options):
+        created = 0
+        for model in (Recipe, Ingredient):
+            names = model.objects.exclude(image='').exclude(image__isnull=True).values_list('image', flat=True)
+            for name in names.iterator():
+                try:
+                    created += images.generate_derivatives(name)
+                except (OSError, ValueError) as error:
+                    self.stderr.write(f"{name} : {error}")
+        self.stdout.write(self.style.SUCCESS(f"{created} dérivé(s) créé(s)."))
@@ -0,0 +1,38 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from App import catalog
+
+
+class Command(BaseCommand):
+    help = (
+        "Importe un fichier produit par export_recipes : crée ou met à jour les unités, "
+        "ingrédients (rapprochés par nom normalisé) et recettes, par lots transactionnels."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help="Fichier à importer (- pour l'entrée standard)")
+        parser.add_argument('--format', choices=catalog.FORMATS, help="jsonl par défaut, csv si le fichier finit par .csv")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        input_format = catalog.format_for(options['input'], options['format'])
+        importer = catalog.CatalogImporter(
+            batch_size=options['batch_size'],
+            stdout=self.stdout if options['verbosity'] > 1 else None,
+        )
+        try:
+            if options['input'] == '-':
+                stats = importer.run(catalog.read_records(sys.stdin, input_format))
+            else:
+                with open(options['input'], encoding='utf-8', newline='') as source:
+                    stats = importer.run(catalog.read_records(source, input_format))
+        except (OSError, catalog.CatalogError) as error:
+            raise CommandError(str(error))
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['recipes']} recette(s), {stats['recipe_ingredients']} ligne(s) d'ingrédients, "
+            f"{stats['ingredients']} ingrédient(s) et {stats['units']} unité(s) importés "
+            f"({stats['skipped']} enregistrement(s) ignoré(s), "
+            f"{stats['conflicts']} traduction(s) en conflit ignorée(s))."
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from App import search
+from App.models import Recipe
+
+
+class Command(BaseCommand):
+    help = "Reconstruit les index de recherche plein texte (FTS5) des recettes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            self.stderr.write("La recherche plein texte nécessite SQLite (FTS5).")
+            return
+        recipes = Recipe.objects.order_by().iterator(chunk_size=options['batch_size'])
+        with transaction.atomic():
+            count = search.rebuild_index(recipes, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{count} recette(s) indexée(s)."))
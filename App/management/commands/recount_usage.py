@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from App import usage
+
+
+class Command(BaseCommand):
+    help = "Recalcule les compteurs d'utilisation (recettes, ingrédients, unités) et signale les écarts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Signale les écarts sans rien corriger.")
+
+    def handle(self, *args, **options):
+        mismatched = usage.drift()
+        for model, pk, stored, actual in mismatched[:20]:
+            self.stdout.write(f"{model._meta.verbose_name} #{pk} : {stored} au lieu de {actual}")
+        if len(mismatched) > 20:
+            self.stdout.write(f"... et {len(mismatched) - 20} autre(s).")
+        if options['check']:
+            if mismatched:
+                self.stderr.write(self.style.ERROR(f"{len(mismatched)} compteur(s) incorrect(s)."))
+                raise SystemExit(1)
+            self.stdout.write(self.style.SUCCESS("Tous les compteurs sont à jour."))
+            return
+        with transaction.atomic():
+            usage.recount()
+        self.stdout.write(self.style.SUCCESS(f"Compteurs recalculés ({len(mismatched)} écart(s) corrigé(s))."))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from App import conditional, page_cache
+from App.models import Recipe
+
+
+class Command(BaseCommand):
+    help = "Recalcule le rendu HTML des instructions de toutes les recettes (chaque langue)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        count = 0
+        batch = []
+        fields = None
+        # bulk_update ne touche pas updated_at : les recettes ne paraissent pas modifiées
+        for recipe in Recipe.objects.order_by('pk').iterator(chunk_size=batch_size):
+            fields = recipe.render_instructions()
+            batch.append(recipe)
+            if len(batch) >= batch_size:
+                count += self._write(batch, fields)
+                batch = []
+        if batch:
+            count += self._write(batch, fields)
+        # Le HTML affiché a changé sans updated_at : les ETags des pages doivent changer
+        conditional.invalidate_pages()
+        page_cache.purge(page_cache.ALL_PAGES)
+        self.stdout.write(self.style.SUCCESS(f"{count} recette(s) rendue(s)."))
+
+    @staticmethod
+    def _write(batch, fields):
+        with transaction.atomic():
+            Recipe.objects.bulk_update(batch, fields)
+        return len(batch)
@@ -0,0 +1,48 @@
+from django.db import migrations
+
+# Copie figée du schéma de App.search à cette date : la migration ne doit
+# pas changer si le module (ou settings.LANGUAGES) évolue.
+LANGUAGES = ('fr_ca', 'en')
+DEFAULT_LANGUAGE = 'fr_ca'
+SEARCH_FIELDS = ('title', 'description', 'instructions')
+
+
+def fts_table(language):
+    return f'App_recipe_fts_{language}'
+
+
+def create_fts_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for language in LANGUAGES:
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS "{fts_table(language)}" USING fts5('
+            f"{', '.join(SEARCH_FIELDS)}, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        # Valeur traduite, sinon celle de la langue par défaut (fallback)
+        columns = ', '.join(
+            f"COALESCE(NULLIF({field}_{language}, ''), NULLIF({field}_{DEFAULT_LANGUAGE}, ''), {field}, '')"
+            for field in SEARCH_FIELDS
+        )
+        schema_editor.execute(
+            f'INSERT INTO "{fts_table(language)}" (rowid, {", ".join(SEARCH_FIELDS)}) '
+            f'SELECT id, {columns} FROM "App_recipe"'
+        )
+
+
+def drop_fts_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for language in LANGUAGES:
+        schema_editor.execute(f'DROP TABLE IF EXISTS "{fts_table(language)}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0009_ingredient_name_en_ingredient_name_fr_ca_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_tables, drop_fts_tables),
+    ]
@@ -0,0 +1,47 @@
+from collections import Counter
+
+import App.storage
+from django.db import migrations, models
+
+
+def count_references(apps, schema_editor):
+    # Les images existantes gardent leur nom : on compte simplement leurs utilisations
+    MediaFile = apps.get_model('App', 'MediaFile')
+    counts = Counter()
+    for model_name in ('Recipe', 'Ingredient'):
+        model = apps.get_model('App', model_name)
+        counts.update(model.objects.exclude(image='').exclude(image__isnull=True).values_list('image', flat=True))
+    MediaFile.objects.bulk_create([MediaFile(name=name, ref_count=count) for name, count in counts.items()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0010_recipe_search_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Fichier')),
+                ('ref_count', models.PositiveIntegerField(default=0, verbose_name='Références')),
+            ],
+            options={
+                'verbose_name': 'fichier média',
+                'verbose_name_plural': 'fichiers média',
+            },
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(blank=True, default='', null=True, storage=App.storage.get_image_storage, upload_to='recipes/', verbose_name='Image'),
+        ),
+        migrations.AlterField(
+            model_name='ingredient',
+            name='image',
+            field=models.ImageField(blank=True, default='', null=True, storage=App.storage.get_image_storage, upload_to='ingredients/', verbose_name='Image'),
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+import unicodedata
+from decimal import Decimal
+
+from django.db import migrations, models
+
+# Unités courantes : nom normalisé -> (dimension, facteur vers g / ml / pièce)
+KNOWN_UNITS = {
+    'mg': ('mass', '0.001'),
+    'g': ('mass', '1'),
+    'kg': ('mass', '1000'),
+    'oz': ('mass', '28.349523'),
+    'lb': ('mass', '453.59237'),
+    'ml': ('volume', '1'),
+    'cl': ('volume', '10'),
+    'dl': ('volume', '100'),
+    'l': ('volume', '1000'),
+    'c. a cafe': ('volume', '5'),
+    'c. a the': ('volume', '5'),
+    'tsp': ('volume', '5'),
+    'c. a soupe': ('volume', '15'),
+    'tbsp': ('volume', '15'),
+    'tasse': ('volume', '250'),
+    'cup': ('volume', '250'),
+    'piece': ('count', '1'),
+    # Pas de « pincée » : ce n'est pas une pièce, elle ne se convertit ni ne s'additionne
+}
+
+
+def _normalize(text):
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold().strip()
+
+
+def set_known_units(apps, schema_editor):
+    Unit = apps.get_model('App', 'Unit')
+    units = list(Unit.objects.all())
+    for unit in units:
+        known = KNOWN_UNITS.get(_normalize(unit.unit))
+        if known:
+            unit.dimension, factor = known
+            unit.factor = Decimal(factor)
+    Unit.objects.bulk_update(units, ['dimension', 'factor'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0011_mediafile_alter_image_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='unit',
+            name='dimension',
+            field=models.CharField(blank=True, choices=[('mass', 'Masse'), ('volume', 'Volume'), ('count', 'Nombre')], max_length=10, verbose_name='Dimension'),
+        ),
+        migrations.AddField(
+            model_name='unit',
+            name='factor',
+            field=models.DecimalField(blank=True, decimal_places=6, help_text="Valeur d'une unité en g, ml ou pièce selon la dimension (ex: 1000 pour kg).", max_digits=16, null=True, verbose_name='Facteur de conversion'),
+        ),
+        migrations.RunPython(set_known_units, migrations.RunPython.noop),
+    ]
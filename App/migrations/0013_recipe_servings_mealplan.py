@@ -0,0 +1,53 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0012_unit_dimension_factor'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='servings',
+            field=models.PositiveSmallIntegerField(default=4, verbose_name='Portions'),
+        ),
+        migrations.CreateModel(
+            name='MealPlan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Nom')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Crée le')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Mis à jour le')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='meal_plans', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'menu',
+                'verbose_name_plural': 'menus',
+                'ordering': ('-updated_at',),
+            },
+        ),
+        migrations.CreateModel(
+            name='MealPlanRecipe',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('servings', models.PositiveSmallIntegerField(default=4, verbose_name='Portions')),
+                ('meal_plan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='App.mealplan', verbose_name='Menu')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='App.recipe', verbose_name='Recette')),
+            ],
+            options={
+                'verbose_name': 'recette du menu',
+                'verbose_name_plural': 'recettes du menu',
+                'ordering': ('pk',),
+            },
+        ),
+        migrations.AddField(
+            model_name='mealplan',
+            name='recipes',
+            field=models.ManyToManyField(related_name='meal_plans', through='App.MealPlanRecipe', to='App.recipe', verbose_name='Recettes'),
+        ),
+    ]
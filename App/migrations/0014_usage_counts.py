@@ -0,0 +1,43 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_usage(apps, schema_editor):
+    RecipeIngredient = apps.get_model('App', 'RecipeIngredient')
+    for model_name, field, column in (
+        ('Recipe', 'ingredient_count', 'recipe_id'),
+        ('Ingredient', 'usage_count', 'ingredient_id'),
+        ('Unit', 'usage_count', 'unit_id'),
+    ):
+        counts = (
+            RecipeIngredient.objects.filter(**{column: OuterRef('pk')})
+            .order_by().values(column).annotate(n=Count('pk')).values('n')
+        )
+        apps.get_model('App', model_name).objects.update(**{field: Coalesce(Subquery(counts), Value(0))})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0013_recipe_servings_mealplan'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name="Nombre d'ingrédients"),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='usage_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='Utilisé dans # recettes'),
+        ),
+        migrations.AddField(
+            model_name='unit',
+            name='usage_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='Utilisations'),
+        ),
+        migrations.RunPython(count_usage, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,138 @@
+import unicodedata
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def normalize(text):
+    # Copie de App.text.normalize, figée pour la migration
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold().strip()
+
+
+def unique_name(value, seen, max_length):
+    """« Sel » déjà pris devient « Sel (2) », puis « Sel (3) »... tronqué à max_length."""
+    number = 2
+    while True:
+        suffix = f' ({number})'
+        candidate = value[:max_length - len(suffix)].rstrip() + suffix
+        if normalize(candidate) not in seen:
+            return candidate
+        number += 1
+
+
+def fill_keys(apps, schema_editor):
+    # La colonne de base contient la valeur de la langue par défaut (fr-CA).
+    # Un doublon après normalisation est renommé (« Sel (2) ») : chaque
+    # ligne garde une clé, et une sauvegarde ultérieure ne viole pas l'index.
+    for model_name, field in (('Ingredient', 'name'), ('Unit', 'unit')):
+        model = apps.get_model('App', model_name)
+        max_length = model._meta.get_field(field).max_length
+        seen = {'fr_ca': set(), 'en': set()}
+        objects = list(model.objects.order_by('pk'))
+        for obj in objects:
+            for language, sources in (('fr_ca', (field, f'{field}_fr_ca')), ('en', (f'{field}_en',))):
+                value = getattr(obj, sources[0])
+                key = normalize(value) or None
+                if key in seen[language]:
+                    value = unique_name(value.strip(), seen[language], max_length)
+                    for source in sources:
+                        setattr(obj, source, value)
+                    key = normalize(value)
+                if key:
+                    seen[language].add(key)
+                setattr(obj, f'{field}_key_{language}', key)
+        model.objects.bulk_update(
+            objects,
+            [field, f'{field}_fr_ca', f'{field}_en', f'{field}_key_fr_ca', f'{field}_key_en'],
+            batch_size=500,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0014_usage_counts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='name_key_fr_ca',
+            field=models.CharField(editable=False, max_length=50, null=True, verbose_name='Clé du nom (fr-CA)'),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='name_key_en',
+            field=models.CharField(editable=False, max_length=50, null=True, verbose_name='Clé du nom (en)'),
+        ),
+        migrations.AddField(
+            model_name='unit',
+            name='unit_key_fr_ca',
+            field=models.CharField(editable=False, max_length=20, null=True, verbose_name="Clé de l'unité (fr-CA)"),
+        ),
+        migrations.AddField(
+            model_name='unit',
+            name='unit_key_en',
+            field=models.CharField(editable=False, max_length=20, null=True, verbose_name="Clé de l'unité (en)"),
+        ),
+        migrations.RunPython(fill_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='ingredient',
+            name='name_key_fr_ca',
+            field=models.CharField(editable=False, max_length=50, null=True, unique=True, verbose_name='Clé du nom (fr-CA)'),
+        ),
+        migrations.AlterField(
+            model_name='ingredient',
+            name='name_key_en',
+            field=models.CharField(editable=False, max_length=50, null=True, unique=True, verbose_name='Clé du nom (en)'),
+        ),
+        migrations.AlterField(
+            model_name='unit',
+            name='unit_key_fr_ca',
+            field=models.CharField(editable=False, max_length=20, null=True, unique=True, verbose_name="Clé de l'unité (fr-CA)"),
+        ),
+        migrations.AlterField(
+            model_name='unit',
+            name='unit_key_en',
+            field=models.CharField(editable=False, max_length=20, null=True, unique=True, verbose_name="Clé de l'unité (en)"),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='user',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Créateur'),
+        ),
+        migrations.AlterField(
+            model_name='recipeingredient',
+            name='recipe',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='recipe_ingredients', to='App.recipe', verbose_name='Recette'),
+        ),
+        migrations.AlterField(
+            model_name='recipeingredient',
+            name='ingredient',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='App.ingredient', verbose_name='Ingrédient'),
+        ),
+        migrations.AlterField(
+            model_name='mealplan',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='meal_plans', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['created_at', 'id'], name='recipe_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='recipe_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipeingredient',
+            index=models.Index(fields=['ingredient', 'recipe'], name='recipeingredient_ingr_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mealplan',
+            index=models.Index(fields=['user', 'updated_at'], name='mealplan_user_updated_idx'),
+        ),
+    ]
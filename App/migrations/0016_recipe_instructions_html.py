@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0015_normalized_keys_and_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='instructions_html',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Instructions (HTML)'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='instructions_html_fr_CA',
+            field=models.TextField(blank=True, default='', editable=False, null=True, verbose_name='Instructions (HTML)'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='instructions_html_en',
+            field=models.TextField(blank=True, default='', editable=False, null=True, verbose_name='Instructions (HTML)'),
+        ),
+    ]
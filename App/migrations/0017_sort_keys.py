@@ -0,0 +1,68 @@
+import unicodedata
+
+from django.db import migrations, models
+
+
+def normalize(text):
+    # Copie de App.text.normalize, figée pour la migration
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold().strip()
+
+
+def fill_sort_keys(apps, schema_editor):
+    # Valeur affichée dans chaque langue : l'anglais se replie sur le français
+    for model_name, field in (('Ingredient', 'name'), ('Unit', 'unit')):
+        model = apps.get_model('App', model_name)
+        objects = list(model.objects.order_by('pk'))
+        for obj in objects:
+            french = normalize(getattr(obj, field))
+            setattr(obj, f'{field}_sort_fr_ca', french)
+            setattr(obj, f'{field}_sort_en', normalize(getattr(obj, f'{field}_en')) or french)
+        model.objects.bulk_update(objects, [f'{field}_sort_fr_ca', f'{field}_sort_en'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0016_recipe_instructions_html'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='name_sort_fr_ca',
+            field=models.CharField(default='', editable=False, max_length=50, verbose_name='Clé de tri du nom (fr-CA)'),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='name_sort_en',
+            field=models.CharField(default='', editable=False, max_length=50, verbose_name='Clé de tri du nom (en)'),
+        ),
+        migrations.AddField(
+            model_name='unit',
+            name='unit_sort_fr_ca',
+            field=models.CharField(default='', editable=False, max_length=20, verbose_name="Clé de tri de l'unité (fr-CA)"),
+        ),
+        migrations.AddField(
+            model_name='unit',
+            name='unit_sort_en',
+            field=models.CharField(default='', editable=False, max_length=20, verbose_name="Clé de tri de l'unité (en)"),
+        ),
+        migrations.RunPython(fill_sort_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['name_sort_fr_ca', 'id'], name='ingredient_sort_fr_ca_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['name_sort_en', 'id'], name='ingredient_sort_en_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='unit',
+            index=models.Index(fields=['unit_sort_fr_ca', 'id'], name='unit_sort_fr_ca_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='unit',
+            index=models.Index(fields=['unit_sort_en', 'id'], name='unit_sort_en_idx'),
+        ),
+    ]
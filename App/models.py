@@ -1,16 +1,188 @@
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import translation
+from modeltranslation.translator import translator
+from modeltranslation.utils import resolution_order
+
+from .instructions import render_html
+from .storage import get_image_storage
+from .text import normalize
 
 # Create your models here.
 
-class Recipe(models.Model):
+class TrackedImageMixin:
+    """
+    Mémorise le nom de l'image tel que chargé depuis la base, pour savoir
+    sans requête supplémentaire si l'image a changé lors d'une sauvegarde.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.track_loaded_image()
+        return instance
+
+    def track_loaded_image(self):
+        if 'image' not in self.__dict__:
+            return  # champ différé (only/defer) : nom inconnu
+        image = self.__dict__['image']
+        self._loaded_image_name = getattr(image, 'name', image) or ''
+
+    def image_was_loaded(self):
+        return hasattr(self, '_loaded_image_name')
+
+    @property
+    def loaded_image_name(self):
+        return getattr(self, '_loaded_image_name', '')
+
+class CounterFieldsMixin:
+    """
+    Les compteurs dénormalisés (voir App.usage) ne sont jamais réécrits par
+    save() : une instance chargée avant un incrément F() l'écraserait avec
+    une valeur périmée.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            deferred = self.get_deferred_fields()
+            # Compteurs différés (only()/defer()) : Django n'écrit déjà que les champs chargés
+            if any(self._meta.get_field(name).attname not in deferred for name in self.counter_fields):
+                # Champs chargés moins les compteurs ; un champ différé lu ici
+                # déclencherait une requête par champ
+                kwargs['update_fields'] = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key and field.attname not in deferred and field.name not in self.counter_fields
+                ]
+        super().save(*args, **kwargs)
+
+class NormalizedKeyMixin:
+    """
+    Clé normalisée (minuscules, sans accents) d'un champ traduit, dans une
+    colonne à index unique par langue : l'unicité se vérifie par une
+    recherche dans l'index plutôt qu'un iexact qui parcourt la table.
+
+    Une clé de tri par langue, indexée avec l'id, normalise la valeur
+    affichée (avec le repli de modeltranslation) : les listes paginées par
+    curseur (App.pagination) sont parcourues dans l'index, sans tri.
+    """
+    key_source = None  # Champ traduit dont dérivent les clés
+
+    @classmethod
+    def _language_field(cls, kind, language):
+        for code in (language or translation.get_language(), settings.LANGUAGE_CODE):
+            name = f"{cls.key_source}_{kind}_{(code or '').lower().replace('-', '_')}"
+            try:
+                cls._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue  # Langue sans colonne : celle par défaut
+            return name
+        raise FieldDoesNotExist(f"{cls.__name__} n'a pas de colonne {kind} pour {language}")
+
+    @classmethod
+    def key_field(cls, language=None):
+        """Colonne de clé de `language` (langue active par défaut)."""
+        return cls._language_field('key', language)
+
+    @classmethod
+    def sort_field(cls, language=None):
+        """Colonne de tri de `language` (langue active par défaut)."""
+        return cls._language_field('sort', language)
+
+    @classmethod
+    def with_key(cls, value, language=None):
+        """Lignes dont la clé de `language` correspond à `value` (recherche dans l'index unique)."""
+        return cls.objects.filter(**{cls.key_field(language): normalize(value)})
+
+    def update_keys(self):
+        """Recalcule les clés et clés de tri de toutes les langues ; retourne les noms des colonnes."""
+        names = []
+        fields = translator.get_options_for_model(type(self)).all_fields[self.key_source]
+        values = {field.language: normalize(getattr(self, field.name)) for field in fields}
+        for field in fields:
+            name = self.key_field(field.language)
+            setattr(self, name, values[field.language] or None)
+            sort_name = self.sort_field(field.language)
+            displayed = (values.get(code) for code in resolution_order(field.language))
+            setattr(self, sort_name, next((value for value in displayed if value), ''))
+            names += [name, sort_name]
+        return names
+
+    def validate_unique(self, exclude=None):
+        """
+        Vérifie aussi les clés normalisées : elles ne sont pas éditables, donc
+        ignorées par les ModelForm (admin compris), et un doublon finirait en
+        IntegrityError à la sauvegarde.
+        """
+        errors = {}
+        try:
+            super().validate_unique(exclude)
+        except ValidationError as error:
+            errors = error.update_error_dict(errors)
+        exclude = set(exclude or ())
+        for field in translator.get_options_for_model(type(self)).all_fields[self.key_source]:
+            value = getattr(self, field.name)
+            key = normalize(value)
+            if not key:
+                continue
+            queryset = type(self)._default_manager.filter(**{self.key_field(field.language): key})
+            if self.pk is not None:
+                queryset = queryset.exclude(pk=self.pk)
+            # Champ du formulaire qui porte l'erreur. Exclu, il est absent du
+            # formulaire (valeur inchangée) ou déjà en erreur : rien à signaler
+            name = next((n for n in (field.name, self.key_source) if n not in exclude), None)
+            if name is not None and queryset.exists():
+                errors.setdefault(name, []).append(ValidationError(
+                    "« %(value)s » existe déjà (sans tenir compte des majuscules ni des accents).",
+                    code='unique',
+                    params={'value': value},
+                ))
+        if errors:
+            raise ValidationError(errors)
+
+    def save(self, *args, **kwargs):
+        names = self.update_keys()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields).union(names)
+        super().save(*args, **kwargs)
+
+class Recipe(CounterFieldsMixin, TrackedImageMixin, models.Model):
     title = models.CharField(max_length=100, verbose_name="Titre")
     description = models.TextField(verbose_name="Description")
     instructions = models.TextField(verbose_name="Instructions")
+    # Rendu HTML (échappé) des instructions, recalculé à chaque sauvegarde
+    instructions_html = models.TextField(blank=True, default='', editable=False, verbose_name="Instructions (HTML)")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Crée le")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Mis à jour le")
-    image = models.ImageField(default="", upload_to='recipes/', verbose_name="Image", blank=True, null=True)
-    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Créateur", null=True, blank=True)
+    image = models.ImageField(default="", upload_to='recipes/', storage=get_image_storage, verbose_name="Image", blank=True, null=True)
+    # Index composite (user, created_at) dans Meta : il sert aussi aux recherches par user seul
+    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Créateur", null=True, blank=True, db_index=False)
+    servings = models.PositiveSmallIntegerField(default=4, verbose_name="Portions")
+    # Compteur dénormalisé, tenu à jour par App.usage
+    ingredient_count = models.PositiveIntegerField(default=0, editable=False, db_index=True, verbose_name="Nombre d'ingrédients")
+
+    counter_fields = ('ingredient_count',)
+
+    def render_instructions(self):
+        """Recalcule le HTML des instructions de chaque langue ; retourne les noms des colonnes."""
+        options = translator.get_options_for_model(type(self))
+        targets = {field.language: field.name for field in options.all_fields['instructions_html']}
+        names = []
+        for field in options.all_fields['instructions']:
+            name = targets[field.language]
+            setattr(self, name, render_html(getattr(self, field.name)))
+            names.append(name)
+        return names
+
+    def save(self, *args, **kwargs):
+        names = self.render_instructions()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields).union(names)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.title
@@ -19,11 +191,25 @@ class Recipe(models.Model):
         ordering = ('-created_at',)
         verbose_name = "recipe"
         verbose_name_plural = "recipes"
+        indexes = [
+            # Liste des recettes (tri -created_at, -pk, parcouru à l'envers)
+            models.Index(fields=['created_at', 'id'], name='recipe_created_idx'),
+            # Recettes d'un utilisateur, des plus récentes aux plus anciennes
+            models.Index(fields=['user', 'created_at', 'id'], name='recipe_user_created_idx'),
+        ]
 
-class Ingredient(models.Model):
+class Ingredient(NormalizedKeyMixin, CounterFieldsMixin, TrackedImageMixin, models.Model):
     name = models.CharField(max_length=50, verbose_name="Nom")
-    image = models.ImageField(default="", upload_to='ingredients/', verbose_name="Image", blank=True, null=True)
-    
+    name_key_fr_ca = models.CharField(max_length=50, unique=True, null=True, editable=False, verbose_name="Clé du nom (fr-CA)")
+    name_key_en = models.CharField(max_length=50, unique=True, null=True, editable=False, verbose_name="Clé du nom (en)")
+    name_sort_fr_ca = models.CharField(max_length=50, default='', editable=False, verbose_name="Clé de tri du nom (fr-CA)")
+    name_sort_en = models.CharField(max_length=50, default='', editable=False, verbose_name="Clé de tri du nom (en)")
+    image = models.ImageField(default="", upload_to='ingredients/', storage=get_image_storage, verbose_name="Image", blank=True, null=True)
+    usage_count = models.PositiveIntegerField(default=0, editable=False, db_index=True, verbose_name="Utilisé dans # recettes")
+
+    key_source = 'name'
+    counter_fields = ('usage_count',)
+
     def __str__(self):
         return self.name
 
@@ -31,9 +217,38 @@ class Ingredient(models.Model):
         ordering = ('name',)
         verbose_name = "ingredient"
         verbose_name_plural = "ingredients"
+        indexes = [
+            # Liste des ingrédients dans chaque langue (App.pagination)
+            models.Index(fields=['name_sort_fr_ca', 'id'], name='ingredient_sort_fr_ca_idx'),
+            models.Index(fields=['name_sort_en', 'id'], name='ingredient_sort_en_idx'),
+        ]
+
+class Unit(NormalizedKeyMixin, CounterFieldsMixin, models.Model):
+    MASS = 'mass'
+    VOLUME = 'volume'
+    COUNT = 'count'
+    DIMENSIONS = [
+        (MASS, "Masse"),
+        (VOLUME, "Volume"),
+        (COUNT, "Nombre"),
+    ]
+    # Unité de base de chaque dimension : factor exprime une unité dans celle-ci
+    BASE_UNITS = {MASS: 'g', VOLUME: 'ml', COUNT: 'pièce'}
 
-class Unit(models.Model):
     unit = models.CharField(max_length=20, verbose_name="Unité")
+    unit_key_fr_ca = models.CharField(max_length=20, unique=True, null=True, editable=False, verbose_name="Clé de l'unité (fr-CA)")
+    unit_key_en = models.CharField(max_length=20, unique=True, null=True, editable=False, verbose_name="Clé de l'unité (en)")
+    unit_sort_fr_ca = models.CharField(max_length=20, default='', editable=False, verbose_name="Clé de tri de l'unité (fr-CA)")
+    unit_sort_en = models.CharField(max_length=20, default='', editable=False, verbose_name="Clé de tri de l'unité (en)")
+    dimension = models.CharField(max_length=10, choices=DIMENSIONS, blank=True, verbose_name="Dimension")
+    factor = models.DecimalField(
+        max_digits=16, decimal_places=6, null=True, blank=True, verbose_name="Facteur de conversion",
+        help_text="Valeur d'une unité en g, ml ou pièce selon la dimension (ex: 1000 pour kg).",
+    )
+    usage_count = models.PositiveIntegerField(default=0, editable=False, db_index=True, verbose_name="Utilisations")
+
+    key_source = 'unit'
+    counter_fields = ('usage_count',)
 
     def __str__(self):
         return self.unit
@@ -42,20 +257,94 @@ class Unit(models.Model):
         ordering = ('unit',)
         verbose_name = "unité"
         verbose_name_plural = "unités"
+        indexes = [
+            # Liste des unités dans chaque langue (App.pagination)
+            models.Index(fields=['unit_sort_fr_ca', 'id'], name='unit_sort_fr_ca_idx'),
+            models.Index(fields=['unit_sort_en', 'id'], name='unit_sort_en_idx'),
+        ]
 
 class RecipeIngredient(models.Model):
-    recipe = models.ForeignKey(Recipe, related_name='recipe_ingredients', on_delete=models.CASCADE, verbose_name="Recette")
-    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE, verbose_name="Ingrédient")
+    # L'index unique (recipe, ingredient) sert aux recherches par recette
+    recipe = models.ForeignKey(Recipe, related_name='recipe_ingredients', on_delete=models.CASCADE, verbose_name="Recette", db_index=False)
+    # Index composite (ingredient, recipe) dans Meta : ingrédient -> recettes sans lire la table
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE, verbose_name="Ingrédient", db_index=False)
     quantity = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Quantité")
     unit = models.ForeignKey(Unit, on_delete=models.CASCADE, verbose_name="Unité")
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.track_loaded_refs()
+        return instance
+
+    def track_loaded_refs(self):
+        # Références telles qu'en base, pour ajuster les compteurs d'utilisation à la sauvegarde
+        if all(name in self.__dict__ for name in ('recipe_id', 'ingredient_id', 'unit_id')):
+            self._loaded_refs = self.refs
+
+    @property
+    def refs(self):
+        return (self.recipe_id, self.ingredient_id, self.unit_id)
+
+    @property
+    def loaded_refs(self):
+        return getattr(self, '_loaded_refs', None)
+
     def __str__(self):
         return f"{self.quantity} {self.unit} de {self.ingredient.name}"
     class Meta:
         unique_together = ('recipe', 'ingredient')
         verbose_name = "ingrédient de recette"
         verbose_name_plural = "ingrédients de recette"
+        indexes = [
+            models.Index(fields=['ingredient', 'recipe'], name='recipeingredient_ingr_idx'),
+        ]
     @property
     def quantity_str(self):
         # Convertit la quantité en string avec point décimal pour HTML input
         return str(self.quantity).replace(',', '.')
+
+class MealPlan(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='meal_plans', verbose_name="Utilisateur", db_index=False)
+    name = models.CharField(max_length=100, verbose_name="Nom")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Crée le")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Mis à jour le")
+    recipes = models.ManyToManyField(Recipe, through='MealPlanRecipe', related_name='meal_plans', verbose_name="Recettes")
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        ordering = ('-updated_at',)
+        verbose_name = "menu"
+        verbose_name_plural = "menus"
+        indexes = [
+            # Menus d'un utilisateur, du plus récemment modifié au plus ancien
+            models.Index(fields=['user', 'updated_at'], name='mealplan_user_updated_idx'),
+        ]
+
+class MealPlanRecipe(models.Model):
+    # Une même recette peut revenir plusieurs fois dans la semaine
+    meal_plan = models.ForeignKey(MealPlan, related_name='entries', on_delete=models.CASCADE, verbose_name="Menu")
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, verbose_name="Recette")
+    servings = models.PositiveSmallIntegerField(default=4, verbose_name="Portions")
+
+    def __str__(self):
+        return f"{self.recipe} ({self.servings} portions)"
+
+    class Meta:
+        ordering = ('pk',)
+        verbose_name = "recette du menu"
+        verbose_name_plural = "recettes du menu"
+
+class MediaFile(models.Model):
+    """Nombre de lignes qui référencent un fichier image (stockage par contenu)."""
+    name = models.CharField(max_length=255, unique=True, verbose_name="Fichier")
+    ref_count = models.PositiveIntegerField(default=0, verbose_name="Références")
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count})"
+
+    class Meta:
+        verbose_name = "fichier média"
+        verbose_name_plural = "fichiers média"
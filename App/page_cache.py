@@ -0,0 +1,234 @@
+"""
+Cache des pages complètes pour les visiteurs anonymes.
+
+Une page est mise en cache par langue et par URL (chemin et curseur de
+pagination). Pendant le rendu, la vue déclare les étiquettes dont dépend la
+page (« recipe:12 », « ingredient-list », « image:<nom> »...). Purger une
+étiquette enregistre l'heure de la purge : une page rendue avant cette
+heure n'est plus servie, sans toucher aux autres pages.
+
+Protection contre l'effet de meute : quand une page expire, un seul worker
+la régénère (verrou posé avec cache.add) ; les autres servent l'ancienne
+version tant qu'elle n'a pas été purgée, ou attendent brièvement la
+nouvelle.
+
+Les vues asynchrones passent par aserve() : les appels au cache (fichier
+SQLite, qui peut attendre un verrou) sont faits dans un thread avec
+sync_to_async, et l'attente d'une page en cours de régénération devient un
+asyncio.sleep.
+"""
+import asyncio
+import hashlib
+import re
+import time
+
+from asgiref.sync import sync_to_async
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils import translation
+from django.utils.cache import get_conditional_response
+
+_TAG_KEY = 'page-cache:tag:{}'
+_PAGE_KEY = 'page-cache:page:{}'
+
+# Le jeton CSRF (formulaire de langue) est propre à chaque visiteur : il est
+# retiré de la page stockée et remplacé par un jeton frais à chaque envoi
+_CSRF_INPUT = re.compile(rb'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+_CSRF_PLACEHOLDER = rb'\1__csrf_token__\2'
+
+LOCK_TIMEOUT = 30  # Durée max. d'une régénération (secondes)
+WAIT_TIMEOUT = 2.0  # Attente max. d'une page en cours de régénération
+WAIT_INTERVAL = 0.05
+STALE_GRACE = 300  # Durée pendant laquelle une page expirée peut encore être servie
+
+# Étiquette portée par toutes les pages (purgée par l'import en masse)
+ALL_PAGES = 'all'
+
+
+def _tag_key(tag):
+    return _TAG_KEY.format(hashlib.sha1(str(tag).encode()).hexdigest())
+
+
+def purge(*tags):
+    """Invalide les pages qui portent l'une de ces étiquettes."""
+    now = time.time()
+    cache.set_many({_tag_key(tag): now for tag in tags}, None)
+
+
+def purge_on_commit(*tags):
+    transaction.on_commit(lambda: purge(*tags))
+
+
+def add_tags(request, *tags):
+    """Déclare, pendant le rendu, des données dont dépend la page."""
+    if not hasattr(request, '_page_cache_tags'):
+        request._page_cache_tags = set()
+    request._page_cache_tags.update(str(tag) for tag in tags)
+
+
+def _page_key(request):
+    language = translation.get_language() or ''
+    digest = hashlib.sha1(f'{language}:{request.get_full_path()}'.encode()).hexdigest()
+    return _PAGE_KEY.format(digest)
+
+
+def _is_fresh_for_tags(entry):
+    """Aucune étiquette de la page n'a été purgée depuis le début de son rendu."""
+    keys = [_tag_key(tag) for tag in entry['tags']]
+    purged = cache.get_many(keys)
+    # Une étiquette absente (évincée du cache) rend la page invalide par prudence
+    return all(key in purged and purged[key] <= entry['rendered_at'] for key in keys)
+
+
+def _store(key, request, response, rendered_at, timeout):
+    tags = getattr(request, '_page_cache_tags', set()) | {ALL_PAGES}
+    # Étiquettes jamais purgées : elles le sont « au début du rendu »
+    for tag in tags:
+        cache.add(_tag_key(tag), rendered_at, None)
+    cache.set(key, {
+        'content': _CSRF_INPUT.sub(_CSRF_PLACEHOLDER, response.content),
+        'content_type': response['Content-Type'],
+        'etag': response.get('ETag'),
+        'last_modified': response.get('Last-Modified'),
+        'tags': sorted(tags),
+        'rendered_at': rendered_at,
+        'expires': rendered_at + timeout,
+    }, timeout + STALE_GRACE)
+
+
+def _response(request, entry):
+    headers = {name: entry[field] for name, field in (('ETag', 'etag'), ('Last-Modified', 'last_modified')) if entry[field]}
+    if entry['etag']:
+        not_modified = get_conditional_response(request, etag=entry['etag'])
+        if not_modified is not None:
+            for name, value in headers.items():
+                not_modified.headers.setdefault(name, value)
+            return not_modified
+    content = entry['content']
+    if b'__csrf_token__' in content:
+        content = content.replace(b'__csrf_token__', get_token(request).encode())
+    response = HttpResponse(content, content_type=entry['content_type'], headers=headers)
+    response['X-Page-Cache'] = 'hit'
+    return response
+
+
+def _is_plain_get(request, allowed_params):
+    # Paramètres inconnus : pas d'entrée par variante d'URL
+    return request.method in ('GET', 'HEAD') and all(param in allowed_params for param in request.GET)
+
+
+def _has_messages(request):
+    # Des messages en attente ne sont affichés qu'au rendu
+    return bool(len(get_messages(request)))
+
+
+def is_cacheable(request, allowed_params=()):
+    if not _is_plain_get(request, allowed_params) or request.user.is_authenticated:
+        return False
+    return not _has_messages(request)
+
+
+async def ais_cacheable(request, allowed_params=()):
+    if not _is_plain_get(request, allowed_params) or (await request.auser()).is_authenticated:
+        return False
+    # auser() a chargé la session : lire les messages ne fait plus de requête
+    return not _has_messages(request)
+
+
+def _lookup(key):
+    """(entrée, valide) : une entrée valide peut être expirée mais pas purgée."""
+    entry = cache.get(key)
+    return entry, entry is not None and _is_fresh_for_tags(entry)
+
+
+def _cacheable_response(response):
+    return response.status_code == 200 and not response.streaming and not response.cookies
+
+
+def serve(request, render, timeout):
+    """
+    Réponse de la page depuis le cache, ou `render()` mis en cache si la
+    réponse est un 200.
+    """
+    key = _page_key(request)
+    entry, valid = _lookup(key)
+    if valid and entry['expires'] > time.time():
+        return _response(request, entry)
+
+    lock = f'{key}:lock'
+    if not cache.add(lock, 1, LOCK_TIMEOUT):
+        # Un autre worker régénère la page
+        if valid:
+            return _response(request, entry)  # Expirée mais pas purgée
+        deadline = time.monotonic() + WAIT_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(WAIT_INTERVAL)
+            entry, valid = _lookup(key)
+            if valid:
+                return _response(request, entry)
+        return render()  # Trop long : on rend sans mettre en cache
+
+    try:
+        rendered_at = time.time()
+        response = render()
+        if _cacheable_response(response):
+            _store(key, request, response, rendered_at, timeout)
+        return response
+    finally:
+        cache.delete(lock)
+
+
+async def aserve(request, render, timeout):
+    """Version asynchrone de serve() : `render` est une fonction coroutine."""
+    key = _page_key(request)
+    entry, valid = await sync_to_async(_lookup)(key)
+    if valid and entry['expires'] > time.time():
+        return _response(request, entry)
+
+    lock = f'{key}:lock'
+    if not await cache.aadd(lock, 1, LOCK_TIMEOUT):
+        if valid:
+            return _response(request, entry)
+        deadline = time.monotonic() + WAIT_TIMEOUT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(WAIT_INTERVAL)
+            entry, valid = await sync_to_async(_lookup)(key)
+            if valid:
+                return _response(request, entry)
+        return await render()
+
+    try:
+        rendered_at = time.time()
+        response = await render()
+        if _cacheable_response(response):
+            await sync_to_async(_store)(key, request, response, rendered_at, timeout)
+        return response
+    finally:
+        await cache.adelete(lock)
+
+
+class AnonymousPageCacheMixin:
+    """
+    Sert les GET anonymes depuis le cache des pages. La vue déclare ses
+    dépendances avec add_tags(request, ...) pendant le rendu. Fonctionne
+    aussi avec les vues asynchrones (async def get).
+    """
+    page_cache_timeout = 600
+    page_cache_params = ()  # Paramètres de requête qui font partie de la clé
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self._adispatch(request, *args, **kwargs)
+        dispatch = super().dispatch
+        if not is_cacheable(request, self.page_cache_params):
+            return dispatch(request, *args, **kwargs)
+        return serve(request, lambda: dispatch(request, *args, **kwargs), self.page_cache_timeout)
+
+    async def _adispatch(self, request, *args, **kwargs):
+        dispatch = super().dispatch
+        if not await ais_cacheable(request, self.page_cache_params):
+            return await dispatch(request, *args, **kwargs)
+        return await aserve(request, lambda: dispatch(request, *args, **kwargs), self.page_cache_timeout)
@@ -0,0 +1,230 @@
+import base64
+import datetime
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db.models import F, Q
+from modeltranslation.utils import get_language
+
+from .translation import is_translated, localized
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def _json_default(value):
+    # isoformat() complet : DjangoJSONEncoder tronque les microsecondes,
+    # ce qui ferait sauter des lignes créées dans la même milliseconde.
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return str(value)
+
+
+class CursorPaginator:
+    """
+    Pagination par curseur (keyset) : chaque page est obtenue avec un
+    WHERE sur les clés de tri de la dernière ligne affichée plutôt qu'un
+    OFFSET, donc le coût d'une page ne dépend pas de sa profondeur.
+
+    `ordering` doit se terminer par une clé unique (ex: 'pk') pour que
+    l'ordre soit total.
+
+    Un champ traduit (modeltranslation) est trié sur une annotation
+    <champ>_sort_key : la valeur affichée dans la langue active, avec repli.
+    Le tri, le WHERE et le curseur portent ainsi sur la même valeur ;
+    trier sur 'name' tout court utiliserait la colonne name_en sans repli
+    alors que le curseur lirait la valeur de repli. Quand le modèle tient
+    cette valeur dans une colonne indexée (NormalizedKeyMixin.sort_field),
+    l'annotation n'est que cette colonne et la page est lue dans l'index ;
+    sinon elle est calculée, au prix d'un parcours et d'un tri.
+    """
+
+    count_timeout = 300  # Durée de vie du total approximatif (secondes)
+
+    def __init__(self, queryset, per_page, ordering, approximate_count=True):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.approximate_count = approximate_count
+        self._count = None
+        model = queryset.model
+        self._translated = {field.lstrip('-') for field in self.ordering if is_translated(model, field.lstrip('-'))}
+        # Clés de tri réellement utilisées (annotations pour les champs traduits)
+        self.keys = tuple(self._sort_key(field) for field in self.ordering)
+
+    def _sort_key(self, field):
+        name = field.lstrip('-')
+        if name not in self._translated:
+            return field
+        return ('-' if field.startswith('-') else '') + f'{name}_sort_key'
+
+    @staticmethod
+    def _sort_value(model, name, language):
+        if getattr(model, 'key_source', None) == name:
+            return F(model.sort_field(language))
+        return localized(model, name, language)
+
+    def _annotated(self, queryset):
+        language = get_language()
+        return queryset.annotate(**{
+            f'{name}_sort_key': self._sort_value(queryset.model, name, language) for name in self._translated
+        })
+
+    # Encodage des curseurs #
+
+    def encode_cursor(self, obj, direction):
+        values = [self._key_value(obj, field) for field in self.keys]
+        payload = json.dumps({'d': direction, 'k': values}, default=_json_default, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            direction, values = payload['d'], payload['k']
+        except (ValueError, TypeError, KeyError, UnicodeError):
+            raise InvalidCursor(cursor)
+        if direction not in ('next', 'prev') or not isinstance(values, list) or len(values) != len(self.keys):
+            raise InvalidCursor(cursor)
+        return direction, values
+
+    @staticmethod
+    def _key_value(obj, field):
+        # Instances de modèle ou dicts de queryset.values()
+        if isinstance(obj, dict):
+            return obj[field.lstrip('-')]
+        return getattr(obj, field.lstrip('-'))
+
+    # Construction des requêtes #
+
+    def _keyset_filter(self, values, reverse):
+        """Q() sélectionnant les lignes situées après `values` dans l'ordre (ou avant si reverse)."""
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.keys, values):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != reverse
+            condition |= equal & Q(**{f'{name}__{"lt" if descending else "gt"}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def _order(self, reverse):
+        if not reverse:
+            return self.keys
+        return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in self.keys)
+
+    def _page_query(self, cursor):
+        """(queryset d'une ligne de plus que la page, sens inverse ?, clés du curseur)"""
+        direction, values = 'next', None
+        if cursor:
+            try:
+                direction, values = self.decode_cursor(cursor)
+            except InvalidCursor:
+                direction, values = 'next', None
+
+        reverse = direction == 'prev'
+        queryset = self._annotated(self.queryset).order_by(*self._order(reverse))
+        if values is not None:
+            queryset = queryset.filter(self._keyset_filter(values, reverse))
+        # Une ligne de plus pour savoir s'il existe une page suivante
+        return queryset[:self.per_page + 1], reverse, values
+
+    def _make_page(self, rows, reverse, values):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if reverse:
+            rows.reverse()
+            return CursorPage(rows, self, has_next=True, has_previous=has_more)
+        return CursorPage(rows, self, has_next=has_more, has_previous=values is not None)
+
+    def page(self, cursor=None):
+        """Retourne la page désignée par `cursor` (première page si absent ou invalide)."""
+        queryset, reverse, values = self._page_query(cursor)
+        return self._make_page(list(queryset), reverse, values)
+
+    async def apage(self, cursor=None):
+        """Version asynchrone de page() ; le total est lu d'avance pour le gabarit."""
+        queryset, reverse, values = self._page_query(cursor)
+        page = self._make_page([obj async for obj in queryset], reverse, values)
+        await self.acount()
+        return page
+
+    # Total approximatif #
+
+    @property
+    def count(self):
+        """
+        Nombre total d'éléments, mis en cache pour éviter un COUNT(*) à
+        chaque page. Retourne None si le total est désactivé.
+        """
+        if not self.approximate_count:
+            return None
+        if self._count is None:
+            self._count = cache.get_or_set(self._count_key(), self.queryset.count, self.count_timeout)
+        return self._count
+
+    async def acount(self):
+        if not self.approximate_count:
+            return None
+        if self._count is None:
+            # Le cache (SQLite) est appelé hors de la boucle d'événements
+            key = self._count_key()
+            count = await cache.aget(key)
+            if count is None:
+                count = await self.queryset.acount()
+                await cache.aset(key, count, self.count_timeout)
+            self._count = count
+        return self._count
+
+    def _count_key(self):
+        """Une entrée par requête SQL (filtres compris) et par langue."""
+        try:
+            sql, params = self.queryset.query.sql_with_params()
+        except EmptyResultSet:
+            sql, params = '', ()  # queryset.none()
+        digest = hashlib.sha1(f'{get_language()}:{sql}:{params!r}'.encode()).hexdigest()
+        return f'cursor-count:{self.queryset.model._meta.label_lower}:{digest}'
+
+
+class CursorPage:
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next and bool(object_list)
+        self._has_previous = has_previous and bool(object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return self.paginator.encode_cursor(self.object_list[-1], 'next')
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return self.paginator.encode_cursor(self.object_list[0], 'prev')
@@ -0,0 +1,113 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from Projet.cache import bump_generation, current_generation
+
+GESTIONNAIRE = 'Gestionnaire'
+CUISINIER = 'Cuisinier'
+
+_CACHE_PREFIX = 'recipe-perms'
+_VERSION_KEY = f'{_CACHE_PREFIX}:version'
+
+
+class RecipePermissions:
+    """
+    Droits d'un utilisateur sur les recettes, résolus une seule fois.
+
+    Les groupes et les permissions sont chargés à la création ; ensuite
+    can_edit / can_delete ne font plus aucune requête.
+    """
+
+    def __init__(self, user, group_names, perms):
+        self.user = user
+        self.group_names = frozenset(group_names)
+        self.perms = frozenset(perms)
+
+    def has_perm(self, perm):
+        if not self.user.is_active:
+            return False
+        return self.user.is_superuser or perm in self.perms
+
+    def _can_act(self, recipe, perm):
+        # Les gestionnaires peuvent tout faire
+        if GESTIONNAIRE in self.group_names:
+            return True
+        # Les cuisiniers ne peuvent agir que sur leurs propres recettes
+        if CUISINIER in self.group_names:
+            return recipe.user_id is not None and recipe.user_id == self.user.pk
+        # Fallback: vérifier la permission générale
+        return self.has_perm(perm)
+
+    def can_edit(self, recipe):
+        return self._can_act(recipe, 'App.change_recipe')
+
+    def can_delete(self, recipe):
+        return self._can_act(recipe, 'App.delete_recipe')
+
+
+def _cache_timeout():
+    # Cache entre requêtes désactivé par défaut : il n'est cohérent que si
+    # le backend de cache est partagé entre les workers.
+    return getattr(settings, 'RECIPE_PERMISSIONS_CACHE_TIMEOUT', None)
+
+
+def _cache_key(user_pk):
+    version = current_generation(_VERSION_KEY)
+    return f'{_CACHE_PREFIX}:{version}:{user_pk}'
+
+
+def _load(user):
+    """Charge (groupes, permissions) de l'utilisateur : 2 requêtes au plus."""
+    if not user.is_authenticated:
+        return (), ()
+    group_names = list(user.groups.values_list('name', flat=True))
+    perms = user.get_all_permissions()
+    return group_names, perms
+
+
+def get_recipe_permissions(user):
+    """
+    Retourne le RecipePermissions de `user`, mémorisé sur l'instance : comme
+    request.user est le même objet pendant toute la requête, le chargement
+    n'a lieu qu'une fois par requête.
+    """
+    resolved = getattr(user, '_recipe_permissions', None)
+    if resolved is not None:
+        return resolved
+
+    timeout = _cache_timeout()
+    data = None
+    if timeout and user.is_authenticated:
+        key = _cache_key(user.pk)
+        data = cache.get(key)
+        if data is None:
+            data = _load(user)
+            cache.set(key, (list(data[0]), list(data[1])), timeout)
+    else:
+        data = _load(user)
+
+    resolved = RecipePermissions(user, *data)
+    user._recipe_permissions = resolved
+    return resolved
+
+
+def invalidate_user_permissions(*user_pks):
+    """Oublie les droits en cache des utilisateurs donnés."""
+    if _cache_timeout():
+        cache.delete_many([_cache_key(pk) for pk in user_pks])
+
+
+def invalidate_all_permissions():
+    """Invalide les droits de tous les utilisateurs (ex: permissions d'un groupe modifiées)."""
+    if _cache_timeout():
+        bump_generation(_VERSION_KEY)
+
+
+def can_edit_recipe(user, recipe):
+    """Vérifie si l'utilisateur peut modifier cette recette"""
+    return get_recipe_permissions(user).can_edit(recipe)
+
+
+def can_delete_recipe(user, recipe):
+    """Vérifie si l'utilisateur peut supprimer cette recette"""
+    return get_recipe_permissions(user).can_delete(recipe)
@@ -0,0 +1,13 @@
+"""
+Quantités des lignes d'ingrédients, au format de RecipeIngredient.quantity
+(max_digits=10, decimal_places=2).
+"""
+from decimal import Decimal
+
+QUANTITY_STEP = Decimal('0.01')
+MAX_QUANTITY = Decimal('99999999.99')
+
+
+def quantize(value):
+    """Decimal arrondi au centième ; ArithmeticError ou ValueError si `value` n'est pas un nombre."""
+    return Decimal(str(value)).quantize(QUANTITY_STEP)
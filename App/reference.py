@@ -0,0 +1,79 @@
+"""
+Données de référence (ingrédients et unités) gardées en mémoire.
+
+Les formulaires de recette affichent toutes les unités et valident les
+ingrédients et unités soumis à chaque requête, alors que ces tables
+changent rarement. Chaque processus garde donc, par langue, un instantané
+compact : des tuples (id, nom) triés par nom pour les listes déroulantes,
+et des dicts id -> nom pour la validation.
+
+Comme pour la table de conversion des unités, un compteur de génération
+dans le cache, incrémenté par les signaux d'Ingredient et d'Unit, indique
+aux workers de reconstruire leur instantané à la prochaine lecture.
+"""
+import threading
+from collections import namedtuple
+
+from django.conf import settings
+from django.utils import translation
+
+from Projet.cache import bump_generation, current_generation
+
+from .models import Ingredient, Unit
+
+_GENERATION_KEY = 'reference-data:generation'
+
+# Mêmes attributs que les modèles pour les gabarits (ingredient.name, unit.unit)
+IngredientRef = namedtuple('IngredientRef', 'id name')
+UnitRef = namedtuple('UnitRef', 'id unit')
+
+
+class Snapshot:
+    __slots__ = ('ingredients', 'ingredient_names', 'units', 'unit_names')
+
+    def __init__(self, ingredients, units):
+        self.ingredients = tuple(sorted(ingredients, key=lambda ref: (ref.name.casefold(), ref.id)))
+        self.ingredient_names = dict(self.ingredients)
+        self.units = tuple(sorted(units, key=lambda ref: (ref.unit.casefold(), ref.id)))
+        self.unit_names = dict(self.units)
+
+
+class ReferenceData:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshots = {}  # langue -> Snapshot
+        self._generation = None
+
+    @staticmethod
+    def _build(language):
+        # Les instances appliquent le repli de modeltranslation sur la langue par défaut
+        with translation.override(language):
+            ingredients = [IngredientRef(ingredient.pk, ingredient.name or '') for ingredient in Ingredient.objects.order_by()]
+            units = [UnitRef(unit.pk, unit.unit or '') for unit in Unit.objects.order_by()]
+        return Snapshot(ingredients, units)
+
+    def get(self, language=None):
+        """Instantané de la langue demandée (langue active par défaut)."""
+        generation = current_generation(_GENERATION_KEY)
+        language = (language or translation.get_language() or settings.LANGUAGE_CODE).lower()
+        with self._lock:
+            if generation != self._generation:
+                self._snapshots = {}
+                self._generation = generation
+            snapshot = self._snapshots.get(language)
+            if snapshot is None:
+                snapshot = self._snapshots[language] = self._build(language)
+            return snapshot
+
+    def ingredients(self, language=None):
+        return self.get(language).ingredients
+
+    def units(self, language=None):
+        return self.get(language).units
+
+    @staticmethod
+    def invalidate():
+        bump_generation(_GENERATION_KEY)
+
+
+reference_data = ReferenceData()
@@ -0,0 +1,161 @@
+"""
+Recherche plein texte des recettes avec SQLite FTS5.
+
+Une table virtuelle par langue (App_recipe_fts_<langue>) indexe le titre,
+la description et les instructions traduits. Le rowid de chaque ligne est
+l'id de la recette. Le tokenizer unicode61 avec remove_diacritics ignore
+les accents ("creme" trouve "crème"), les index de préfixes accélèrent les
+recherches "tom*" et le tri se fait par BM25.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.utils import translation
+
+SEARCH_FIELDS = ('title', 'description', 'instructions')
+
+# Poids BM25 des colonnes (titre > description > instructions)
+BM25_WEIGHTS = (10.0, 4.0, 1.0)
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def language_codes():
+    return [code for code, _name in settings.LANGUAGES]
+
+
+def fts_table(language):
+    return 'App_recipe_fts_' + language.replace('-', '_').lower()
+
+
+def create_table_sql(language):
+    columns = ', '.join(SEARCH_FIELDS)
+    return (
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS "{fts_table(language)}" USING fts5('
+        f"{columns}, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+
+
+def drop_table_sql(language):
+    return f'DROP TABLE IF EXISTS "{fts_table(language)}"'
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def _translated_values(recipe, language):
+    # La langue active fait jouer les fallbacks de modeltranslation
+    with translation.override(language):
+        return [getattr(recipe, field) or '' for field in SEARCH_FIELDS]
+
+
+def index_recipe(recipe):
+    """Ajoute ou remplace la recette dans l'index de chaque langue."""
+    index_recipes([recipe])
+
+
+def index_recipes(recipes):
+    """Ajoute ou remplace un lot de recettes dans l'index de chaque langue."""
+    if not is_available() or not recipes:
+        return
+    columns = ', '.join(SEARCH_FIELDS)
+    placeholders = ', '.join(['%s'] * (len(SEARCH_FIELDS) + 1))
+    ids = [recipe.pk for recipe in recipes]
+    with connection.cursor() as cursor:
+        for language in language_codes():
+            cursor.execute(
+                f'DELETE FROM "{fts_table(language)}" WHERE rowid IN ({", ".join(["%s"] * len(ids))})',
+                ids,
+            )
+        _insert_batch(cursor, recipes, columns, placeholders)
+
+
+def unindex_recipe(recipe_pk):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        for language in language_codes():
+            cursor.execute(f'DELETE FROM "{fts_table(language)}" WHERE rowid = %s', [recipe_pk])
+
+
+def rebuild_index(recipes, batch_size=1000):
+    """Reconstruit tous les index à partir de `recipes` (itérable de Recipe)."""
+    if not is_available():
+        return 0
+    columns = ', '.join(SEARCH_FIELDS)
+    placeholders = ', '.join(['%s'] * (len(SEARCH_FIELDS) + 1))
+    count = 0
+    with connection.cursor() as cursor:
+        for language in language_codes():
+            cursor.execute(f'DELETE FROM "{fts_table(language)}"')
+        batch = []
+        for recipe in recipes:
+            batch.append(recipe)
+            if len(batch) >= batch_size:
+                count += _insert_batch(cursor, batch, columns, placeholders)
+                batch = []
+        count += _insert_batch(cursor, batch, columns, placeholders)
+        for language in language_codes():
+            table = fts_table(language)
+            cursor.execute(f'INSERT INTO "{table}" ("{table}") VALUES (\'optimize\')')
+    return count
+
+
+def _insert_batch(cursor, recipes, columns, placeholders):
+    for language in language_codes():
+        cursor.executemany(
+            f'INSERT INTO "{fts_table(language)}" (rowid, {columns}) VALUES ({placeholders})',
+            [[recipe.pk, *_translated_values(recipe, language)] for recipe in recipes],
+        )
+    return len(recipes)
+
+
+def build_match_query(text):
+    """
+    Transforme la saisie de l'utilisateur en requête FTS5 : chaque mot est
+    cité (pas d'injection de syntaxe FTS) et recherché par préfixe.
+    """
+    tokens = _TOKEN_RE.findall(text or '')
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def search_recipe_ids(text, language=None, limit=50, offset=0):
+    """Retourne les ids des recettes correspondant à `text`, les plus pertinentes d'abord."""
+    match = build_match_query(text)
+    if not match or not is_available():
+        return []
+    language = language or translation.get_language() or settings.LANGUAGE_CODE
+    if language.lower() not in {code.lower() for code in language_codes()}:
+        language = settings.LANGUAGE_CODE
+    table = fts_table(language)
+    weights = ', '.join(str(w) for w in BM25_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM "{table}" WHERE "{table}" MATCH %s '
+            f'ORDER BY bm25("{table}", {weights}) LIMIT %s OFFSET %s',
+            [match, limit, offset],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def matching_ids_sql(text):
+    """
+    Sous-requête SQL (sql, params) des ids de recettes correspondant à
+    `text` dans l'une ou l'autre langue, ou None si rien n'est à chercher.
+    Utilisable dans un filtre pk__in=RawSQL(...) sans limite de résultats.
+    """
+    match = build_match_query(text)
+    if not match or not is_available():
+        return None
+    tables = [fts_table(language) for language in language_codes()]
+    sql = ' UNION '.join(f'SELECT rowid FROM "{table}" WHERE "{table}" MATCH %s' for table in tables)
+    return sql, [match] * len(tables)
+
+
+def search_recipes(queryset, text, language=None, limit=50, offset=0):
+    """Recettes de `queryset` correspondant à `text`, triées par pertinence."""
+    ids = search_recipe_ids(text, language, limit, offset)
+    recipes = queryset.in_bulk(ids)
+    return [recipes[pk] for pk in ids if pk in recipes]
@@ -0,0 +1,95 @@
+from django.db import transaction
+
+from . import page_cache, usage
+from .ingredient_index import ingredient_index
+from .models import Recipe, RecipeIngredient
+from .quantities import quantize
+
+
+def _normalize_rows(rows):
+    """{ingredient_id: (quantité, unit_id)} ; un ingrédient soumis deux fois n'est gardé qu'une fois."""
+    return {int(ingredient_id): (quantize(quantity), int(unit_id)) for ingredient_id, quantity, unit_id in rows}
+
+
+def set_recipe_ingredients(recipe, rows):
+    """
+    Remplace les ingrédients de `recipe` par `rows` (itérable de tuples
+    (ingredient_id, quantity, unit_id)) en ne touchant que les lignes qui
+    changent : un bulk_create, un bulk_update et un delete au plus, et un
+    UPDATE par compteur quel que soit le nombre de lignes.
+    """
+    wanted = _normalize_rows(rows)
+    existing = {ri.ingredient_id: ri for ri in RecipeIngredient.objects.filter(recipe=recipe)}
+
+    to_create = []
+    to_update = []
+    unit_changes = []  # (ancienne, nouvelle) références pour les compteurs d'utilisation
+    for ingredient_id, (quantity, unit_id) in wanted.items():
+        ri = existing.get(ingredient_id)
+        if ri is None:
+            to_create.append(RecipeIngredient(recipe=recipe, ingredient_id=ingredient_id, quantity=quantity, unit_id=unit_id))
+        elif ri.quantity != quantity or ri.unit_id != unit_id:
+            if ri.unit_id != unit_id:
+                unit_changes.append((ri.refs, (recipe.pk, ingredient_id, unit_id)))
+            ri.quantity = quantity
+            ri.unit_id = unit_id
+            to_update.append(ri)
+    to_delete = [ri for ingredient_id, ri in existing.items() if ingredient_id not in wanted]
+
+    if to_delete:
+        # Sans signaux post_delete (un par ligne) : les compteurs sont ajustés en une fois plus bas.
+        # Rien ne référence RecipeIngredient, il n'y a donc pas de cascade à suivre.
+        queryset = RecipeIngredient.objects.filter(pk__in=[ri.pk for ri in to_delete])
+        queryset._raw_delete(queryset.db)
+    if to_update:
+        RecipeIngredient.objects.bulk_update(to_update, ['quantity', 'unit'])
+    if to_create:
+        RecipeIngredient.objects.bulk_create(to_create)
+    usage.apply_changes(
+        added=[ri.refs for ri in to_create] + [new for _old, new in unit_changes],
+        removed=[ri.refs for ri in to_delete] + [old for old, _new in unit_changes],
+    )
+
+    # Aucune de ces écritures n'envoie de signal : on publie la recette nous-mêmes
+    ingredient_index.refresh_on_commit(recipe.pk)
+    if to_delete or to_update or to_create:
+        page_cache.purge_on_commit(f'recipe:{recipe.pk}')
+
+
+@transaction.atomic
+def create_recipe(user, title, description, instructions, image, rows, servings=None):
+    """Crée la recette et ses ingrédients dans une seule transaction."""
+    recipe = Recipe(
+        title=title,
+        description=description,
+        instructions=instructions,
+        image=image,
+        user=user,
+    )
+    if servings is not None:  # Sinon, la valeur par défaut du modèle
+        recipe.servings = servings
+    recipe.save()
+    wanted = _normalize_rows(rows)
+    created = RecipeIngredient.objects.bulk_create([
+        RecipeIngredient(recipe=recipe, ingredient_id=ingredient_id, quantity=quantity, unit_id=unit_id)
+        for ingredient_id, (quantity, unit_id) in wanted.items()
+    ])
+    usage.apply_changes(added=[ri.refs for ri in created])
+    # bulk_create / bulk_update n'envoient pas de signaux : on publie la recette nous-mêmes
+    ingredient_index.refresh_on_commit(recipe.pk)
+    return recipe
+
+
+@transaction.atomic
+def update_recipe(recipe, title, description, instructions, image, rows, servings=None):
+    """Met à jour la recette et applique le diff de ses ingrédients dans une seule transaction."""
+    recipe.title = title
+    recipe.description = description
+    recipe.instructions = instructions
+    if servings is not None:
+        recipe.servings = servings
+    if image:  # Seulement si une nouvelle image est fournie
+        recipe.image = image
+    recipe.save()
+    set_recipe_ingredients(recipe, rows)
+    return recipe
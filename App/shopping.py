@@ -0,0 +1,95 @@
+"""
+Liste d'épicerie d'un menu : les ingrédients de plusieurs recettes,
+adaptés au nombre de portions et additionnés par ingrédient.
+
+Toutes les lignes RecipeIngredient concernées sont lues en une seule
+requête, ramenées à l'unité de base de leur dimension (g, ml, pièce) en un
+seul lot par la table de conversion, puis fusionnées en un passage. Les
+quantités dont l'unité n'a pas de dimension ne sont additionnées qu'avec
+la même unité.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from .models import Ingredient, RecipeIngredient, Unit
+from .quantities import QUANTITY_STEP
+from .units import conversions
+
+
+def _scales(entries):
+    """{recipe_id: multiplicateur} pour des (recipe_id, portions voulues, portions de la recette)."""
+    servings = defaultdict(int)
+    recipe_servings = {}
+    for recipe_id, wanted, base in entries:
+        servings[recipe_id] += wanted
+        recipe_servings[recipe_id] = base or 1
+    return {recipe_id: Decimal(total) / recipe_servings[recipe_id] for recipe_id, total in servings.items()}
+
+
+def _display_unit(total, unit_ids):
+    """
+    Parmi les unités utilisées, la plus grande dans laquelle le total vaut au
+    moins 1 (1,5 kg plutôt que 1500 g). Retourne (unit_id, quantité).
+    """
+    candidates = [(conversions.from_base(total, unit_id), unit_id) for unit_id in unit_ids]
+    at_least_one = [candidate for candidate in candidates if candidate[0] >= 1]
+    quantity, unit_id = min(at_least_one) if at_least_one else max(candidates)
+    return unit_id, quantity
+
+
+def build_shopping_list(entries):
+    """
+    `entries` : itérable de (recipe_id, portions voulues, portions de la recette).
+
+    Retourne une liste de dicts {ingredient_id, ingredient, quantity, unit_id,
+    unit, recipes} triée par nom d'ingrédient.
+    """
+    scales = _scales(entries)
+    if not scales:
+        return []
+
+    rows = list(
+        RecipeIngredient.objects.filter(recipe_id__in=scales)
+        .order_by()
+        .values_list('recipe_id', 'ingredient_id', 'quantity', 'unit_id')
+    )
+    converted = conversions.to_base_many([(quantity * scales[recipe_id], unit_id) for recipe_id, _i, quantity, unit_id in rows])
+
+    # (ingrédient, dimension ou unité) -> total, unités rencontrées, recettes
+    totals = {}
+    for (recipe_id, ingredient_id, _quantity, unit_id), (dimension, quantity) in zip(rows, converted):
+        key = (ingredient_id, dimension or ('unit', unit_id))
+        line = totals.get(key)
+        if line is None:
+            line = totals[key] = [Decimal(0), [], set()]
+        line[0] += quantity
+        if unit_id not in line[1]:
+            line[1].append(unit_id)
+        line[2].add(recipe_id)
+
+    ingredients = Ingredient.objects.in_bulk({ingredient_id for ingredient_id, _key in totals})
+    units = Unit.objects.in_bulk({unit_id for line in totals.values() for unit_id in line[1]})
+
+    items = []
+    for (ingredient_id, dimension), (total, unit_ids, recipe_ids) in totals.items():
+        if isinstance(dimension, tuple):
+            unit_id, quantity = dimension[1], total
+        else:
+            unit_id, quantity = _display_unit(total, unit_ids)
+        ingredient = ingredients.get(ingredient_id)
+        unit = units.get(unit_id)
+        items.append({
+            'ingredient_id': ingredient_id,
+            'ingredient': ingredient.name if ingredient else '',
+            'quantity': quantity.quantize(QUANTITY_STEP),
+            'unit_id': unit_id,
+            'unit': unit.unit if unit else '',
+            'recipes': len(recipe_ids),
+        })
+    items.sort(key=lambda item: (item['ingredient'].casefold(), item['unit']))
+    return items
+
+
+def meal_plan_shopping_list(meal_plan):
+    entries = meal_plan.entries.values_list('recipe_id', 'servings', 'recipe__servings')
+    return build_shopping_list(entries)
@@ -1,37 +1,195 @@
-from django.db.models.signals import post_delete, pre_save
+from django.contrib.auth.models import Group, User
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch.dispatcher import receiver
 
-from .models import Recipe, Ingredient
+from . import conditional, images, page_cache, permissions, search, storage, usage
+from .ingredient_index import ingredient_index
+from .models import Recipe, Ingredient, RecipeIngredient, Unit
+from .reference import reference_data
+from .typeahead import ingredient_prefix_index
+from .units import conversions
 
 
+# Images et leurs dérivés #
+# Les fichiers ne sont supprimés qu'après le commit : une sauvegarde annulée
+# ne supprime jamais un fichier encore référencé.
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Ingredient)
+def image_post_delete(sender, instance, **kwargs):
+    # Permet de supprimer l'image (et ses dérivés) sur le disque si plus rien ne l'utilise.
+    if instance.image and storage.release(instance.image.name):
+        images.delete_on_commit(instance.image.storage, instance.image.name)
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Ingredient)
+def image_post_save(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    # Si l'image était différée au chargement, elle n'a pas pu changer
+    if created or instance.image_was_loaded():
+        old_name = instance.loaded_image_name
+        new_name = instance.image.name if instance.image else ''
+        if old_name != new_name:
+            if new_name:
+                storage.acquire(new_name)
+                images.schedule_derivatives(new_name)
+            if old_name and storage.release(old_name):
+                # Permet de supprimer l'ancienne image sur le disque si modifiée et plus utilisée.
+                images.delete_on_commit(instance.image.storage, old_name)
+    instance.track_loaded_image()
+
+
+# Index de recherche plein texte #
+
+@receiver(post_save, sender=Recipe)
+def recipe_post_save_search(sender, instance, **kwargs):
+    search.index_recipe(instance)
+
+@receiver(post_delete, sender=Recipe)
+def recipe_post_delete_search(sender, instance, **kwargs):
+    search.unindex_recipe(instance.pk)
+
+
+# Index inversé ingrédient → recettes #
+
+# Publié après le commit seulement, pour ne pas indexer une écriture annulée,
+# même si ce processus n'a pas chargé l'index (les autres workers l'ont peut-être fait)
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    ingredient_index.refresh_on_commit(instance.recipe_id)
+
 @receiver(post_delete, sender=Recipe)
-def recipe_post_delete(sender, instance, **kwargs):
-    # Permet de supprimer l'image de la recette sur le disque.
-    instance.image.delete(False) # Passez False pour ne pas enregistrer le modèle.
-
-@receiver(pre_save, sender=Recipe)
-def recipe_pre_save(sender, instance, **kwargs):
-    if instance.pk:
-        try:
-            old_image = sender.objects.get(pk=instance.pk).image
-            if old_image != instance.image:
-                # Permet de supprimer l'ancienne image de la recette sur le disque si modifiée.
-                old_image.delete(False) # Passez False pour ne pas enregistrer le modèle.
-        except Recipe.DoesNotExist:
-            pass
+def recipe_post_delete_index(sender, instance, **kwargs):
+    ingredient_index.refresh_on_commit(instance.pk)
+
+
+# Compteurs d'utilisation #
+# Les écritures en masse (bulk_create / bulk_update, suppressions de
+# services.set_recipe_ingredients) les ajustent elles-mêmes en un lot ; ces
+# receveurs ne couvrent que les écritures ponctuelles (admin, shell).
+
+@receiver(post_save, sender=RecipeIngredient)
+def recipe_ingredient_saved_usage(sender, instance, created, **kwargs):
+    old = None if created else instance.loaded_refs
+    if created:
+        usage.apply_changes(added=[instance.refs])
+    elif old is not None and old != instance.refs:
+        usage.apply_changes(added=[instance.refs], removed=[old])
+    instance.track_loaded_refs()
+
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_deleted_usage(sender, instance, **kwargs):
+    usage.apply_changes(removed=[instance.loaded_refs or instance.refs])
 
+
+# Index d'autocomplétion des ingrédients #
+
+@receiver(post_save, sender=Ingredient)
 @receiver(post_delete, sender=Ingredient)
-def ingredient_post_delete(sender, instance, **kwargs):
-    # Permet de supprimer l'image de l'ingrédient sur le disque.
-    instance.image.delete(False) # Passez False pour ne pas enregistrer le modèle.
-    
-@receiver(pre_save, sender=Ingredient)
-def ingredient_pre_save(sender, instance, **kwargs):
-    if instance.pk:
-        try:
-            old_image = sender.objects.get(pk=instance.pk).image
-            if old_image != instance.image:
-                # Permet de supprimer l'ancienne image de l'ingrédient sur le disque si modifiée.
-                old_image.delete(False) # Passez False pour ne pas enregistrer le modèle.
-        except Ingredient.DoesNotExist:
-            pass
\ No newline at end of file
+def ingredient_changed_typeahead(sender, **kwargs):
+    transaction.on_commit(ingredient_prefix_index.invalidate)
+
+
+# Table de conversion des unités #
+
+@receiver(post_save, sender=Unit)
+@receiver(post_delete, sender=Unit)
+def unit_changed_conversions(sender, **kwargs):
+    transaction.on_commit(conversions.invalidate)
+
+
+# Données de référence des formulaires (ingrédients et unités) #
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=Unit)
+@receiver(post_delete, sender=Unit)
+def reference_data_changed(sender, **kwargs):
+    transaction.on_commit(reference_data.invalidate)
+
+
+# Validateurs HTTP des pages de recettes #
+# Les noms d'ingrédients et d'unités sont affichés dans les recettes sans
+# changer leur updated_at.
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=Unit)
+@receiver(post_delete, sender=Unit)
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_pages_changed(sender, **kwargs):
+    transaction.on_commit(conditional.invalidate_pages)
+
+
+# Cache des pages anonymes #
+# Seules les pages qui affichent la donnée modifiée sont purgées.
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved_pages(sender, instance, created, **kwargs):
+    if created:
+        # Les pages de la liste se décalent
+        page_cache.purge_on_commit(f'recipe:{instance.pk}', 'recipe-list')
+    else:
+        page_cache.purge_on_commit(f'recipe:{instance.pk}')
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted_pages(sender, instance, **kwargs):
+    # Les compteurs d'utilisation des ingrédients et unités changent aussi
+    page_cache.purge_on_commit(f'recipe:{instance.pk}', 'recipe-list', 'ingredient-list', 'unit-list')
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed_pages(sender, instance, **kwargs):
+    page_cache.purge_on_commit(f'ingredient:{instance.pk}', 'ingredient-list')
+
+@receiver(post_save, sender=Unit)
+@receiver(post_delete, sender=Unit)
+def unit_changed_pages(sender, instance, **kwargs):
+    page_cache.purge_on_commit(f'unit:{instance.pk}', 'unit-list')
+
+# Les listes d'ingrédients et d'unités (compteurs d'utilisation) sont
+# purgées par usage.apply_changes, écritures en masse comprises.
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_changed_pages(sender, instance, **kwargs):
+    page_cache.purge_on_commit(f'recipe:{instance.recipe_id}')
+
+
+# Invalidation du cache des droits sur les recettes #
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear', 'pre_clear'):
+        return
+    if not reverse:
+        # user.groups.add(...) : instance est l'utilisateur
+        permissions.invalidate_user_permissions(instance.pk)
+    elif pk_set:
+        # group.user_set.add(...) : pk_set contient les utilisateurs
+        permissions.invalidate_user_permissions(*pk_set)
+    else:
+        permissions.invalidate_all_permissions()
+
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def user_permissions_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action.startswith('post_') or action == 'pre_clear':
+        if reverse:
+            permissions.invalidate_all_permissions()
+        else:
+            permissions.invalidate_user_permissions(instance.pk)
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def group_permissions_changed(sender, action, **kwargs):
+    if action.startswith('post_') or action == 'pre_clear':
+        permissions.invalidate_all_permissions()
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, **kwargs):
+    permissions.invalidate_all_permissions()
@@ -0,0 +1,105 @@
+"""
+Stockage des images par contenu.
+
+Chaque fichier téléversé est nommé d'après le SHA-256 de son contenu
+(ex: recipes/3f/3fa9...c1.jpg). Deux téléversements identiques donnent le
+même nom et ne sont donc écrits qu'une fois ; comme un nom ne change jamais
+de contenu, les fichiers peuvent être mis en cache comme immuables.
+
+Plusieurs lignes pouvant partager un fichier, le nombre de références est
+tenu dans MediaFile ; un fichier n'est supprimé que lorsqu'il n'est plus
+référencé.
+"""
+import hashlib
+import posixpath
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    hash_chunk_size = 64 * 1024
+
+    def _content_hash(self, content):
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks(self.hash_chunk_size):
+            digest.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        return digest.hexdigest()
+
+    def hashed_name(self, name, content):
+        directory, filename = posixpath.split(name)
+        extension = posixpath.splitext(filename)[1].lower()
+        digest = self._content_hash(content)
+        return posixpath.join(directory, digest[:2], f'{digest}{extension}')
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(self.generate_filename(name), content)
+        if self.exists(name):
+            # Contenu déjà stocké : rien à écrire
+            return name
+        # En cas de course entre deux téléversements identiques, le second
+        # reçoit un nom suffixé : du contenu dupliqué, jamais écrasé.
+        return super().save(name, content, max_length)
+
+    def is_referenced(self, name):
+        from .models import MediaFile
+        return MediaFile.objects.filter(name=name, ref_count__gt=0).exists()
+
+
+content_addressed_storage = ContentAddressedStorage()
+
+# recipes/3f/3fa9...c1.jpg et ses dérivés (recipes/3f/derivatives/3fa9...c1.jpg_card.webp).
+# Les anciens fichiers, nommés par l'utilisateur, peuvent être remplacés sur place.
+HASHED_NAME_RE = re.compile(r'(?:^|/)([0-9a-f]{2})/(?:derivatives/)?\1[0-9a-f]{62}(?:\.[A-Za-z0-9]+)?(?:_[a-z]+\.[a-z0-9]+)?$')
+
+
+def is_hashed_name(name):
+    """Vrai si `name` est un nom dérivé du contenu (donc jamais réécrit)."""
+    return bool(name) and HASHED_NAME_RE.search(name) is not None
+
+
+def get_image_storage():
+    return content_addressed_storage
+
+
+# Compteurs de références #
+
+def acquire(name):
+    """Ajoute une référence au fichier `name`."""
+    from .models import MediaFile
+    if not name:
+        return
+    if MediaFile.objects.filter(name=name).update(ref_count=F('ref_count') + 1):
+        return
+    try:
+        with transaction.atomic():
+            MediaFile.objects.create(name=name, ref_count=1)
+    except IntegrityError:
+        MediaFile.objects.filter(name=name).update(ref_count=F('ref_count') + 1)
+
+
+def release(name):
+    """
+    Retire une référence au fichier `name`. Retourne True si plus rien ne
+    l'utilise (le fichier peut alors être supprimé).
+    """
+    from .models import MediaFile
+    if not name:
+        return False
+    if not MediaFile.objects.filter(name=name).update(ref_count=F('ref_count') - 1):
+        # Fichier non suivi (antérieur au comptage) : il n'était référencé qu'ici
+        return True
+    deleted, _ = MediaFile.objects.filter(name=name, ref_count__lte=0).delete()
+    return bool(deleted)
@@ -1,7 +1,10 @@
 from django import template
-import re
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
 from django.utils.safestring import mark_safe
 
+from .. import fragments, images, instructions, permissions
+
 register = template.Library()
 
 @register.filter
@@ -11,58 +14,62 @@ def get_item(dictionary, key):
 @register.filter
 def format_instructions(text):
     """
-    Formate les instructions de recette en convertissant les numéros en liste HTML
-    Exemple: "1. Étape un 2. Étape deux" devient une liste HTML numérotée
+    Formate les instructions de recette en liste HTML numérotée (contenu échappé).
+    Les recettes sauvegardées ont déjà ce rendu dans instructions_html.
     """
-    if not text:
-        return ""
-    
-    # Remplacer les retours à la ligne par des espaces pour une meilleure détection
-    text = text.replace('\n', ' ').replace('\r', ' ')
-    
-    # Rechercher les patterns comme "1.", "2.", etc. suivi de texte
-    pattern = r'(\d+\.\s*)'
-    
-    # Diviser le texte par les numéros
-    parts = re.split(pattern, text)
-    
-    # Construire la liste HTML
-    if len(parts) > 1:
-        html_parts = ['<ol class="instruction-list">']
-        
-        # Traiter les parties (les indices impairs contiennent les numéros, les pairs le texte)
-        for i in range(1, len(parts), 2):
-            if i + 1 < len(parts):
-                instruction_text = parts[i + 1].strip()
-                if instruction_text:
-                    html_parts.append(f'<li class="instruction-item">{instruction_text}</li>')
-        
-        html_parts.append('</ol>')
-        return mark_safe(''.join(html_parts))
-    
-    # Si pas de numérotation trouvée, retourner le texte dans un paragraphe
-    return mark_safe(f'<p class="instruction-text">{text}</p>')
+    return instructions.render_html(text)
 
 @register.simple_tag
 def can_edit_recipe(user, recipe):
     """Template tag pour vérifier si l'utilisateur peut modifier cette recette"""
-    # Les gestionnaires peuvent tout faire
-    if user.groups.filter(name='Gestionnaire').exists():
-        return True
-    # Les cuisiniers ne peuvent agir que sur leurs propres recettes
-    if user.groups.filter(name='Cuisinier').exists():
-        return recipe.user == user
-    # Fallback: vérifier la permission générale
-    return user.has_perm('App.change_recipe')
+    return permissions.can_edit_recipe(user, recipe)
 
 @register.simple_tag
 def can_delete_recipe(user, recipe):
     """Template tag pour vérifier si l'utilisateur peut supprimer cette recette"""
-    # Les gestionnaires peuvent tout faire
-    if user.groups.filter(name='Gestionnaire').exists():
-        return True
-    # Les cuisiniers ne peuvent agir que sur leurs propres recettes
-    if user.groups.filter(name='Cuisinier').exists():
-        return recipe.user == user
-    # Fallback: vérifier la permission générale
-    return user.has_perm('App.delete_recipe')
\ No newline at end of file
+    return permissions.can_delete_recipe(user, recipe)
+
+
+@register.simple_tag(takes_context=True)
+def prefetch_recipe_cards(context, recipes):
+    """Lit (ou rend) d'un coup les corps des cartes d'une grille de recettes."""
+    context['recipe_card_bodies'] = fragments.recipe_cards(recipes)
+    return ''
+
+@register.simple_tag(takes_context=True)
+def recipe_card_body(context, recipe):
+    """Corps de la carte de recette depuis le cache des fragments."""
+    bodies = context.get('recipe_card_bodies') or {}
+    body = bodies.get(recipe.pk)
+    if body is None:
+        body = fragments.recipe_cards([recipe])[recipe.pk]
+    return mark_safe(body)
+
+
+@register.simple_tag
+def responsive_image(image, alt, css_class='', sizes='100vw', default_size='card'):
+    """
+    Balise <picture> servant les dérivés WebP/JPEG de l'image avec srcset.
+    Tant que les dérivés ne sont pas générés, l'image originale est servie.
+    """
+    if not image:
+        return ''
+    if not images.has_derivatives(image.name):
+        return format_html('<img src="{}" alt="{}" class="{}" loading="lazy">', image.url, alt, css_class)
+
+    def srcset(image_format):
+        return format_html_join(
+            ', ', '{} {}w',
+            ((default_storage.url(images.derivative_name(image.name, size, image_format)), width)
+             for size, width in images.SIZES.items()),
+        )
+
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" loading="lazy">'
+        '</picture>',
+        srcset('webp'), sizes,
+        default_storage.url(images.derivative_name(image.name, default_size, 'jpeg')),
+        srcset('jpeg'), sizes, alt, css_class,
+    )
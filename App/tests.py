@@ -1,3 +1,207 @@
+import io
+import re
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.http import QueryDict
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import translation
+
+from Projet.cache import bump_generation, current_generation
+
+from . import catalog, reference, services
+from .forms import IngredientForm, RecipeIngredientRows, UnitForm
+from .models import Ingredient, MealPlan, Recipe, RecipeIngredient, Unit
+from .pagination import CursorPaginator
+from .reference import reference_data
+
+
+class QueryPlanTests(TestCase):
+    """
+    Plans d'exécution (EXPLAIN QUERY PLAN) des requêtes fréquentes : chacune
+    doit passer par un index, sans parcours complet de table ni tri en
+    mémoire. Un index supprimé ou une requête réécrite fait échouer le test.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('chef')
+        cls.unit = Unit.objects.create(unit='g')
+        cls.ingredient = Ingredient.objects.create(name='Crème')
+        cls.recipe = Recipe.objects.create(title='Soupe', description='d', instructions='i', user=cls.user)
+        RecipeIngredient.objects.create(recipe=cls.recipe, ingredient=cls.ingredient, quantity=1, unit=cls.unit)
+
+    def query_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertUsesIndex(self, queryset, index):
+        plan = self.query_plan(queryset)
+        details = '\n'.join(plan)
+        for step in plan:
+            self.assertIsNone(re.fullmatch(r'SCAN \S+', step), f"Parcours complet de table :\n{details}")
+            self.assertNotIn('TEMP B-TREE', step, f"Tri en mémoire :\n{details}")
+        self.assertIn(index, details, f"Index {index} non utilisé :\n{details}")
+
+    def test_ingredient_name_uniqueness(self):
+        for language, column in (('fr-CA', 'name_key_fr_ca'), ('en', 'name_key_en')):
+            with translation.override(language):
+                self.assertUsesIndex(Ingredient.with_key('CREME').values('pk'), column)
+
+    def test_unit_uniqueness(self):
+        self.assertUsesIndex(Unit.with_key('G').values('pk'), 'unit_key_fr_ca')
+
+    def test_recipes_of_ingredient(self):
+        queryset = RecipeIngredient.objects.filter(ingredient=self.ingredient).values_list('recipe_id', flat=True)
+        self.assertUsesIndex(queryset, 'COVERING INDEX recipeingredient_ingr_idx')
+
+    def test_ingredients_of_recipe(self):
+        self.assertUsesIndex(RecipeIngredient.objects.filter(recipe=self.recipe), 'recipe_id_ingredient_id')
+
+    def test_recipe_list_page(self):
+        self.assertUsesIndex(Recipe.objects.order_by('-created_at', '-pk')[:6], 'recipe_created_idx')
+
+    def test_recipes_of_user(self):
+        queryset = Recipe.objects.filter(user=self.user).order_by('-created_at', '-pk')[:6]
+        self.assertUsesIndex(queryset, 'recipe_user_created_idx')
+
+    def test_meal_plans_of_user(self):
+        self.assertUsesIndex(MealPlan.objects.filter(user=self.user), 'mealplan_user_updated_idx')
+
+    def test_ingredient_and_unit_list_pages(self):
+        for language, suffix in (('fr-CA', 'fr_ca'), ('en', 'en')):
+            with translation.override(language):
+                for model, ordering, index in (
+                    (Ingredient, ('name', 'pk'), f'ingredient_sort_{suffix}_idx'),
+                    (Unit, ('unit', 'pk'), f'unit_sort_{suffix}_idx'),
+                ):
+                    paginator = CursorPaginator(model.objects.all(), 9, ordering=ordering)
+                    queryset, _reverse, _values = paginator._page_query(None)
+                    self.assertUsesIndex(queryset, index)
+                    # Page suivante : le WHERE du curseur passe aussi par l'index
+                    cursor = paginator.encode_cursor(paginator.page()[0], 'next')
+                    queryset, _reverse, _values = paginator._page_query(cursor)
+                    self.assertUsesIndex(queryset, index)
+
+
+class NormalizedKeyTests(TestCase):
+    def test_keys_follow_each_language(self):
+        ingredient = Ingredient.objects.create(name_fr_CA='Crème fraîche', name_en='Sour Cream')
+        self.assertEqual(ingredient.name_key_fr_ca, 'creme fraiche')
+        self.assertEqual(ingredient.name_key_en, 'sour cream')
+        ingredient.name_en = ''
+        ingredient.save(update_fields=['name_en'])
+        ingredient.refresh_from_db()
+        self.assertIsNone(ingredient.name_key_en)
+
+    def test_forms_ignore_case_and_accents(self):
+        Ingredient.objects.create(name='Crème')
+        Unit.objects.create(unit='pièce')
+        self.assertFalse(IngredientForm(data={'name': 'CREME'}).is_valid())
+        self.assertFalse(UnitForm(data={'unit': 'Piece'}).is_valid())
+        self.assertTrue(IngredientForm(data={'name': 'Crémeux'}).is_valid())
+
+    def test_edit_keeps_own_name(self):
+        ingredient = Ingredient.objects.create(name='Sel')
+        self.assertTrue(IngredientForm(data={'name': 'sel'}, instance=ingredient).is_valid())
+
+
+class RecipeIngredientWriteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = Unit.objects.create(unit='g')
+        cls.ingredients = [Ingredient.objects.create(name=f'Ingrédient {i}') for i in range(15)]
+
+    def removal_queries(self, removed):
+        recipe = services.create_recipe(None, 'Soupe', 'd', 'i', None, [
+            (ingredient.pk, 1, self.unit.pk) for ingredient in self.ingredients
+        ])
+        kept = [(ingredient.pk, 1, self.unit.pk) for ingredient in self.ingredients[removed:]]
+        with CaptureQueriesContext(connection) as queries:
+            services.set_recipe_ingredients(recipe, kept)
+        return len(queries)
+
+    def test_removal_queries_do_not_grow_with_rows(self):
+        self.assertEqual(self.removal_queries(1), self.removal_queries(14))
+
+    def test_removal_adjusts_counters(self):
+        self.removal_queries(14)
+        self.assertEqual(Recipe.objects.get().ingredient_count, 1)
+        self.assertEqual(Unit.objects.get().usage_count, 1)
+        self.assertEqual(sum(Ingredient.objects.values_list('usage_count', flat=True)), 1)
+
+
+class CatalogRoundTripTests(TestCase):
+    def snapshot(self):
+        """Toutes les colonnes, les clés étrangères remplacées par des noms (les ids changent)."""
+        ignored = {'id', 'updated_at'}
+        units = sorted(
+            tuple(sorted((k, v) for k, v in row.items() if k not in ignored))
+            for row in Unit.objects.values()
+        )
+        ingredients = sorted(
+            tuple(sorted((k, v) for k, v in row.items() if k not in ignored))
+            for row in Ingredient.objects.values()
+        )
+        recipes = sorted(
+            tuple(sorted((k, v) for k, v in row.items() if k not in ignored))
+            for row in Recipe.objects.values()
+        )
+        lines = sorted(RecipeIngredient.objects.values_list('recipe__title', 'ingredient__name', 'unit__unit', 'quantity'))
+        return units, ingredients, recipes, lines
+
+    def test_export_then_import_into_empty_database(self):
+        user = User.objects.create_user('chef')
+        kg = Unit.objects.create(unit_fr_CA='kg', unit_en='kg', dimension=Unit.MASS, factor=1000)
+        pinch = Unit.objects.create(unit_fr_CA='pincée', unit_en='pinch')
+        flour = Ingredient.objects.create(name_fr_CA='Farine', name_en='Flour', image='ingredients/ab/farine.jpg')
+        salt = Ingredient.objects.create(name_fr_CA='Sel', name_en='Salt')
+        recipe = services.create_recipe(user, 'Pain', 'd', '1. Pétrir', 'recipes/cd/pain.jpg', [
+            (flour.pk, '0.5', kg.pk), (salt.pk, 1, pinch.pk),
+        ], servings=6)
+        Recipe.objects.filter(pk=recipe.pk).update(title_en='Bread', description_en='d', instructions_en='Knead')
+        before = self.snapshot()
+
+        for output_format in catalog.FORMATS:
+            with self.subTest(output_format):
+                output = io.StringIO()
+                catalog.write_records(catalog.export_records(), output, output_format)
+                Recipe.objects.all().delete()
+                Ingredient.objects.all().delete()
+                Unit.objects.all().delete()
+                output.seek(0)
+                catalog.CatalogImporter().run(catalog.read_records(output, output_format))
+                self.assertEqual(self.snapshot(), before)
+
+
+class GenerationCounterTests(TestCase):
+    def test_evicted_counter_never_goes_back(self):
+        Unit.objects.create(unit='g')
+        cache.delete(reference._GENERATION_KEY)
+        self.assertEqual(reference_data.units()[0].unit, 'g')
+        # Compteur évincé puis donnée modifiée sans signal : la copie locale
+        # ne doit pas être prise pour à jour par coïncidence
+        cache.delete(reference._GENERATION_KEY)
+        Unit.objects.update(unit='kg')
+        self.assertEqual(reference_data.units()[0].unit, 'kg')
+
+    def test_bump_after_eviction(self):
+        generation = current_generation('test:generation')
+        cache.delete('test:generation')
+        self.assertGreater(bump_generation('test:generation'), generation)
+
 
-# Create your tests here.
+class RecipeIngredientRowsTests(TestCase):
+    def test_quantity_rounding_to_zero_is_rejected(self):
+        with self.captureOnCommitCallbacks(execute=True):  # Instantané des données de référence
+            unit = Unit.objects.create(unit='g')
+            ingredient = Ingredient.objects.create(name='Sel')
+        for quantity, valid in (('0,004', False), ('0.01', True)):
+            data = QueryDict(mutable=True)
+            data.update({'ingredient_ids': str(ingredient.pk), f'quantity_{ingredient.pk}': quantity, f'unit_{ingredient.pk}': str(unit.pk)})
+            rows = RecipeIngredientRows(data)
+            self.assertEqual(rows.is_valid(), valid, rows.errors)
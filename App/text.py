@@ -0,0 +1,7 @@
+import unicodedata
+
+
+def normalize(text):
+    """Minuscules sans accents : « Crème Fraîche » -> « creme fraiche »."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold().strip()
@@ -1,10 +1,13 @@
-from modeltranslation.translator import register, TranslationOptions
+from django.db.models import CharField, F, Value
+from django.db.models.functions import Coalesce, NullIf
+from modeltranslation.translator import NotRegistered, register, translator, TranslationOptions
+from modeltranslation.utils import resolution_order
 from .models import Recipe, Ingredient, Unit
 
 
 @register(Recipe)
 class RecipeTranslationOptions(TranslationOptions):
-    fields = ('title', 'description', 'instructions')
+    fields = ('title', 'description', 'instructions', 'instructions_html')
 
 
 @register(Ingredient)
@@ -14,4 +17,23 @@ class IngredientTranslationOptions(TranslationOptions):
 
 @register(Unit)
 class UnitTranslationOptions(TranslationOptions):
-    fields = ('unit',)
\ No newline at end of file
+    fields = ('unit',)
+
+def is_translated(model, field):
+    try:
+        return field in translator.get_options_for_model(model).all_fields
+    except NotRegistered:
+        return False
+
+
+def localized(model, field, language, prefix=''):
+    """
+    Valeur traduite de `field` de `model` (atteint par `prefix`, ex:
+    'ingredient__'), avec repli sur les langues suivantes de modeltranslation.
+    """
+    columns = {f.language: f.name for f in translator.get_options_for_model(model).all_fields[field]}
+    return Coalesce(
+        *[NullIf(F(prefix + columns[lang]), Value('')) for lang in resolution_order(language) if lang in columns],
+        Value(''),
+        output_field=CharField(),
+    )
@@ -0,0 +1,78 @@
+"""
+Index de préfixes des noms d'ingrédients pour l'autocomplétion.
+
+Pour chaque langue, on garde une liste triée de clés normalisées (minuscules,
+sans accents) : une par mot du nom, pour que « cerise » trouve aussi
+« Tomate cerise ». Une recherche par préfixe est alors une simple
+recherche dichotomique dans la liste.
+"""
+import threading
+from bisect import bisect_left
+
+from django.conf import settings
+from django.utils import translation
+
+from Projet.cache import bump_generation, current_generation
+
+from .models import Ingredient
+from .text import normalize
+
+_GENERATION_KEY = 'ingredient-typeahead:generation'
+
+
+def _language_key(language):
+    return (language or settings.LANGUAGE_CODE).lower()
+
+
+class IngredientPrefixIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._indexes = {}  # langue -> (clés triées, ids alignés, {id: nom})
+        self._generation = None
+
+    def _build(self, language):
+        keys = []
+        with translation.override(language):
+            ingredients = [(ingredient.pk, ingredient.name or '') for ingredient in Ingredient.objects.all()]
+        names = dict(ingredients)
+        for pk, name in ingredients:
+            words = normalize(name).split()
+            for position in range(len(words)):
+                keys.append((' '.join(words[position:]), position, name.casefold(), pk))
+        keys.sort()
+        return [key[0] for key in keys], [key[3] for key in keys], names
+
+    def _get(self, language):
+        generation = current_generation(_GENERATION_KEY)
+        language = _language_key(language)
+        with self._lock:
+            if generation != self._generation:
+                self._indexes = {}
+                self._generation = generation
+            if language not in self._indexes:
+                self._indexes[language] = self._build(language)
+            return self._indexes[language]
+
+    def search(self, text, language=None, limit=10):
+        """Jusqu'à `limit` ingrédients dont un mot du nom commence par `text`."""
+        prefix = normalize(text)
+        if not prefix:
+            return []
+        keys, ids, names = self._get(language or translation.get_language())
+        results = []
+        seen = set()
+        position = bisect_left(keys, prefix)
+        while position < len(keys) and keys[position].startswith(prefix) and len(results) < limit:
+            pk = ids[position]
+            if pk not in seen:
+                seen.add(pk)
+                results.append({'id': pk, 'name': names[pk]})
+            position += 1
+        return results
+
+    @staticmethod
+    def invalidate():
+        bump_generation(_GENERATION_KEY)
+
+
+ingredient_prefix_index = IngredientPrefixIndex()
@@ -0,0 +1,128 @@
+"""
+Conversion entre unités de mesure.
+
+Chaque unité a une dimension (masse, volume, nombre) et un facteur vers
+l'unité de base de sa dimension (g, ml, pièce). La table de conversion de
+toutes les paires d'unités compatibles est précalculée et gardée en mémoire
+dans chaque processus ; un compteur de génération dans le cache, incrémenté
+par les signaux de Unit, indique aux autres workers de la recalculer.
+
+Une conversion est alors une simple recherche dans un dict, et
+convert_many() convertit un lot de quantités avec une seule prise du verrou.
+"""
+import threading
+from decimal import Decimal
+
+from Projet.cache import bump_generation, current_generation
+
+from .models import Unit
+
+_GENERATION_KEY = 'unit-conversions:generation'
+
+
+class ConversionTable:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = None
+        self._dimensions = {}  # unit_id -> dimension
+        self._factors = {}  # unit_id -> facteur vers l'unité de base
+        self._pairs = {}  # (from_id, to_id) -> facteur multiplicatif
+
+    def _build(self):
+        dimensions = {}
+        factors = {}
+        by_dimension = {}
+        for pk, dimension, factor in Unit.objects.order_by().values_list('pk', 'dimension', 'factor'):
+            if not dimension or not factor:
+                continue
+            dimensions[pk] = dimension
+            factors[pk] = factor
+            by_dimension.setdefault(dimension, []).append(pk)
+        pairs = {}
+        for unit_ids in by_dimension.values():
+            for source in unit_ids:
+                for target in unit_ids:
+                    pairs[(source, target)] = factors[source] / factors[target]
+        self._dimensions = dimensions
+        self._factors = factors
+        self._pairs = pairs
+
+    def _ensure_built(self):
+        # Appelé avec le verrou
+        generation = current_generation(_GENERATION_KEY)
+        if generation != self._generation:
+            self._build()
+            self._generation = generation
+
+    # Requêtes #
+
+    def dimension(self, unit_id):
+        with self._lock:
+            self._ensure_built()
+            return self._dimensions.get(unit_id)
+
+    def factor(self, from_id, to_id):
+        """Facteur pour passer de `from_id` à `to_id`, ou None si les unités sont incompatibles."""
+        if from_id == to_id:
+            return Decimal(1)
+        with self._lock:
+            self._ensure_built()
+            return self._pairs.get((from_id, to_id))
+
+    def can_convert(self, from_id, to_id):
+        return self.factor(from_id, to_id) is not None
+
+    def convert(self, quantity, from_id, to_id):
+        """Quantité exprimée dans `to_id`, ou None si la conversion est impossible."""
+        factor = self.factor(from_id, to_id)
+        return None if factor is None else quantity * factor
+
+    def convert_many(self, rows, to_id):
+        """
+        Convertit un lot de (quantité, unit_id) vers `to_id`. Retourne une
+        liste alignée sur `rows` (None pour les lignes incompatibles).
+        """
+        with self._lock:
+            self._ensure_built()
+            pairs = self._pairs
+        results = []
+        for quantity, unit_id in rows:
+            if unit_id == to_id:
+                results.append(quantity)
+                continue
+            factor = pairs.get((unit_id, to_id))
+            results.append(None if factor is None else quantity * factor)
+        return results
+
+    def to_base_many(self, rows):
+        """
+        Exprime un lot de (quantité, unit_id) dans l'unité de base de leur
+        dimension. Retourne des tuples (dimension, quantité) ; une unité sans
+        dimension donne (None, quantité d'origine).
+        """
+        with self._lock:
+            self._ensure_built()
+            dimensions = self._dimensions
+            factors = self._factors
+        results = []
+        for quantity, unit_id in rows:
+            dimension = dimensions.get(unit_id)
+            if dimension is None:
+                results.append((None, quantity))
+            else:
+                results.append((dimension, quantity * factors[unit_id]))
+        return results
+
+    def from_base(self, quantity, unit_id):
+        """Inverse de to_base_many pour une quantité (None si l'unité n'a pas de dimension)."""
+        with self._lock:
+            self._ensure_built()
+            factor = self._factors.get(unit_id)
+        return None if factor is None else quantity / factor
+
+    @staticmethod
+    def invalidate():
+        bump_generation(_GENERATION_KEY)
+
+
+conversions = ConversionTable()
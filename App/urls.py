@@ -1,17 +1,35 @@
+from django.conf import settings
 from django.urls import path
 from .views.default_views import *
 from .views.recipe_views import *
 from .views.ingredient_views import *
 from .views.unit_views import *
+from .views.api_views import *
+from .views.meal_plan_views import *
+
+
+def read_view(view, async_view):
+    """Vue asynchrone sous ASGI (settings.ASYNC_VIEWS), synchrone sinon."""
+    return (async_view if settings.ASYNC_VIEWS else view).as_view()
 
 urlpatterns = [
     path('', HomeView.as_view(), name="index"),
-    path('recipes/', RecipeListView.as_view(), name="recipes"),
-    path('recipes/<int:pk>/', RecipeDetailView.as_view(), name="recipe_detail"),
-    path('ingredients/', IngredientListView.as_view(), name="ingredients"),
+    path('recipes/', read_view(RecipeListView, AsyncRecipeListView), name="recipes"),
+    path('recipes/search/', RecipeSearchView.as_view(), name="recipe_search"),
+    path('recipes/what-can-i-cook/', WhatCanICookView.as_view(), name="what_can_i_cook"),
+    path('api/recipes/what-can-i-cook/', WhatCanICookApiView.as_view(), name="api_what_can_i_cook"),
+    path('api/recipes/typeahead/', RecipeTypeaheadApiView.as_view(), name="api_recipe_typeahead"),
+    path('api/ingredients/typeahead/', IngredientTypeaheadApiView.as_view(), name="api_ingredient_typeahead"),
+    path('api/meal-plans/<int:pk>/shopping-list/', MealPlanShoppingListApiView.as_view(), name="api_meal_plan_shopping_list"),
+    path('api/v1/recipes/', RecipeListApiView.as_view(), name="api_v1_recipes"),
+    path('api/v1/recipes/<int:pk>/', RecipeDetailApiView.as_view(), name="api_v1_recipe_detail"),
+    path('api/v1/ingredients/', IngredientListApiView.as_view(), name="api_v1_ingredients"),
+    path('api/v1/units/', UnitListApiView.as_view(), name="api_v1_units"),
+    path('recipes/<int:pk>/', read_view(RecipeDetailView, AsyncRecipeDetailView), name="recipe_detail"),
+    path('ingredients/', read_view(IngredientListView, AsyncIngredientListView), name="ingredients"),
     path('ingredients/add/', AddIngredientView.as_view(), name="add_ingredient"),
     path('recipes/add/', AddRecipeView.as_view(), name="add_recipe"),
-    path('units/', UnitListView.as_view(), name="units"),
+    path('units/', read_view(UnitListView, AsyncUnitListView), name="units"),
     path('units/add/', AddUnitView.as_view(), name="add_unit"),
     path('recipes/<int:pk>/edit/', EditRecipeView.as_view(), name="edit_recipe"),
     path('recipes/<int:pk>/delete/', DeleteRecipeView.as_view(), name="delete_recipe"),
@@ -19,5 +37,9 @@ urlpatterns = [
     path('ingredients/<int:pk>/delete/', DeleteIngredientView.as_view(), name="delete_ingredient"),
     path('units/<int:pk>/edit/', EditUnitView.as_view(), name="edit_unit"),
     path('units/<int:pk>/delete/', DeleteUnitView.as_view(), name="delete_unit"),
+    path('meal-plans/', MealPlanListView.as_view(), name="meal_plans"),
+    path('meal-plans/<int:pk>/', MealPlanDetailView.as_view(), name="meal_plan_detail"),
+    path('meal-plans/<int:pk>/delete/', DeleteMealPlanView.as_view(), name="delete_meal_plan"),
+    path('meal-plans/<int:pk>/entries/<int:entry_pk>/delete/', DeleteMealPlanEntryView.as_view(), name="delete_meal_plan_entry"),
     path('about/', AboutView.as_view(), name="about"),
 ]
@@ -0,0 +1,91 @@
+"""
+Compteurs d'utilisation dénormalisés : Recipe.ingredient_count,
+Ingredient.usage_count et Unit.usage_count (nombre de lignes
+RecipeIngredient qui les référencent).
+
+Les écritures de recettes les ajustent par incréments F() atomiques,
+regroupés en un UPDATE par modèle et par valeur d'incrément. Les chemins
+en masse (import) les recalculent avec recount(), qui sert aussi à la
+commande recount_usage pour corriger une éventuelle dérive.
+
+Les listes d'ingrédients et d'unités affichent ces compteurs : chaque
+ajustement purge leurs pages en cache (page_cache).
+"""
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from . import page_cache
+from .models import Ingredient, Recipe, RecipeIngredient, Unit
+
+# (modèle, compteur, colonne de RecipeIngredient, relation inverse)
+COUNTERS = (
+    (Recipe, 'ingredient_count', 'recipe_id', 'recipe_ingredients'),
+    (Ingredient, 'usage_count', 'ingredient_id', 'recipeingredient'),
+    (Unit, 'usage_count', 'unit_id', 'recipeingredient'),
+)
+
+
+def _increment(model, field, deltas):
+    by_delta = defaultdict(list)
+    for pk, delta in deltas.items():
+        if delta and pk is not None:
+            by_delta[delta].append(pk)
+    for delta, pks in by_delta.items():
+        value = F(field) + delta
+        if delta < 0:
+            value = Greatest(value, Value(0))  # Ne jamais violer la contrainte positive
+        model.objects.filter(pk__in=pks).update(**{field: value})
+
+
+def apply_changes(added=(), removed=()):
+    """
+    Ajuste les compteurs pour des lignes ajoutées et retirées, données
+    comme des tuples (recipe_id, ingredient_id, unit_id).
+    """
+    deltas = [Counter() for _counter in COUNTERS]
+    for sign, lines in ((1, added), (-1, removed)):
+        for line in lines:
+            for counter, pk in zip(deltas, line):
+                counter[pk] += sign
+    for (model, field, _column, _relation), counter in zip(COUNTERS, deltas):
+        _increment(model, field, counter)
+    _purge_pages(deltas[1], deltas[2])
+
+
+def _purge_pages(ingredient_deltas, unit_deltas):
+    tags = [f'ingredient:{pk}' for pk, delta in ingredient_deltas.items() if delta]
+    tags += [f'unit:{pk}' for pk, delta in unit_deltas.items() if delta]
+    if tags:
+        page_cache.purge_on_commit('ingredient-list', 'unit-list', *tags)
+
+
+def recount(recipe_ids=None, ingredient_ids=None, unit_ids=None):
+    """
+    Recalcule les compteurs depuis RecipeIngredient, un UPDATE par modèle
+    (sous-requête corrélée). None recalcule toutes les lignes du modèle.
+    """
+    for (model, field, column, _relation), pks in zip(COUNTERS, (recipe_ids, ingredient_ids, unit_ids)):
+        queryset = model.objects.all()
+        if pks is not None:
+            queryset = queryset.filter(pk__in=list(pks))
+        counts = (
+            RecipeIngredient.objects.filter(**{column: OuterRef('pk')})
+            .order_by().values(column).annotate(n=Count('pk')).values('n')
+        )
+        queryset.update(**{field: Coalesce(Subquery(counts), Value(0))})
+    page_cache.purge_on_commit('ingredient-list', 'unit-list')
+
+
+def drift():
+    """Lignes dont le compteur diffère du décompte réel : [(modèle, pk, stocké, réel)]."""
+    rows = []
+    for model, field, _column, relation in COUNTERS:
+        mismatched = (
+            model.objects.order_by().annotate(actual=Count(relation))
+            .exclude(**{field: F('actual')})
+            .values_list('pk', field, 'actual')
+        )
+        rows.extend((model, pk, stored, actual) for pk, stored, actual in mismatched)
+    return rows
@@ -2,3 +2,5 @@ from .default_views import *
 from .recipe_views import *
 from .unit_views import *
 from .ingredient_views import *
+from .api_views import *
+from .meal_plan_views import *
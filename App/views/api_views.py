@@ -0,0 +1,275 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import translation
+from django.views.generic.base import View
+
+from ..ingredient_index import cookable_recipes
+from ..models import Ingredient, MealPlan, Recipe, RecipeIngredient, Unit
+from ..pagination import CursorPaginator
+from ..search import search_recipes
+from ..shopping import meal_plan_shopping_list
+from ..translation import localized
+from ..typeahead import ingredient_prefix_index
+from .recipe_views import parse_ingredient_ids, parse_max_missing
+
+# Read #
+
+class WhatCanICookApiView(View):
+    max_results = 100
+
+    def get(self, request):
+        ingredient_ids = parse_ingredient_ids(request)
+        max_missing = parse_max_missing(request)
+        results = []
+        if ingredient_ids:
+            results = cookable_recipes(Recipe.objects.only('id', 'title'), ingredient_ids, max_missing, self.max_results)
+        return JsonResponse({
+            'ingredients': sorted(ingredient_ids),
+            'max_missing': max_missing,
+            'results': [
+                {
+                    'id': result['recipe'].pk,
+                    'title': result['recipe'].title,
+                    'missing': result['missing'],
+                    'found': result['found'],
+                    'total': result['total'],
+                    'missing_ingredients': result['missing_ids'],
+                }
+                for result in results
+            ],
+        })
+
+
+class IngredientTypeaheadApiView(View):
+    max_results = 10
+
+    def get(self, request):
+        query = request.GET.get('q', '')
+        return JsonResponse({'results': ingredient_prefix_index.search(query, limit=self.max_results)})
+
+
+class RecipeTypeaheadApiView(View):
+    """Suggestions de recettes (recherche plein texte) pour le sélecteur des menus."""
+    max_results = 10
+
+    def get(self, request):
+        query = request.GET.get('q', '')
+        recipes = search_recipes(Recipe.objects.only('id', 'title', 'servings'), query, limit=self.max_results)
+        return JsonResponse({
+            'results': [{'id': recipe.pk, 'title': recipe.title, 'servings': recipe.servings} for recipe in recipes],
+        })
+
+
+class MealPlanShoppingListApiView(View):
+    def get(self, request, pk):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': "Authentification requise."}, status=401)
+        meal_plan = MealPlan.objects.filter(pk=pk, user=request.user).first()
+        if meal_plan is None:
+            return JsonResponse({'error': "Menu introuvable."}, status=404)
+        return JsonResponse({
+            'meal_plan': {'id': meal_plan.pk, 'name': meal_plan.name},
+            'items': meal_plan_shopping_list(meal_plan),
+        })
+
+
+# API de lecture v1 #
+# Les lignes sont lues avec values() (pas d'instances de modèle) dans la
+# langue demandée, puis sérialisées au fil de l'eau.
+
+API_VERSION = 'v1'
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def api_language(request):
+    """Langue de ?lang=, sinon celle de l'URL (/fr-ca/, /en/)."""
+    requested = request.GET.get('lang') or translation.get_language()
+    for code, _name in settings.LANGUAGES:
+        if code.lower() == requested.lower():
+            return code
+    raise ApiError(f"Langue inconnue : {requested}")
+
+
+def image_url(name):
+    return Recipe._meta.get_field('image').storage.url(name) if name else None
+
+
+def recipe_ingredients(recipe_ids, language):
+    """Ingrédients des recettes données, en une seule requête : {recipe_id: [...]}"""
+    rows = RecipeIngredient.objects.filter(recipe_id__in=recipe_ids).order_by('recipe_id', 'pk').values(
+        'recipe_id', 'ingredient_id', 'quantity', 'unit_id',
+        ingredient_name=localized(Ingredient, 'name', language, 'ingredient__'),
+        unit_name=localized(Unit, 'unit', language, 'unit__'),
+    )
+    ingredients = {recipe_id: [] for recipe_id in recipe_ids}
+    for row in rows:
+        ingredients[row['recipe_id']].append({
+            'id': row['ingredient_id'],
+            'name': row['ingredient_name'],
+            'quantity': row['quantity'],
+            'unit': {'id': row['unit_id'], 'unit': row['unit_name']},
+        })
+    return ingredients
+
+
+class ReadApiView(View):
+    """
+    Liste paginée par curseur d'un modèle, en JSON.
+
+    Paramètres : ?cursor=, ?limit=, ?fields=id,title (sous-ensemble de
+    `fields`) et ?lang=. Les sous-classes décrivent le modèle, les champs
+    exposés (nom -> champ de values()) et l'ordre de pagination.
+    """
+    model = None
+    fields = {}
+    ordering = ('pk',)
+    default_limit = 20
+    max_limit = 100
+
+    def get_queryset(self):
+        return self.model.objects.all()
+
+    def selected_fields(self, request):
+        requested = request.GET.get('fields')
+        if not requested:
+            return list(self.fields)
+        selected = [name.strip() for name in requested.split(',') if name.strip()]
+        unknown = [name for name in selected if name not in self.fields]
+        if unknown:
+            raise ApiError(f"Champs inconnus : {', '.join(unknown)}")
+        return selected
+
+    def get_limit(self, request):
+        try:
+            return max(1, min(int(request.GET.get('limit', self.default_limit)), self.max_limit))
+        except ValueError:
+            raise ApiError("Le paramètre limit doit être un entier.")
+
+    def values(self, queryset, selected):
+        # Les clés de tri sont toujours lues : le curseur en a besoin
+        columns = {self.fields[name] for name in selected if self.fields[name]}
+        columns.update(field.lstrip('-') for field in self.ordering)
+        return queryset.values(*columns)
+
+    def serialize(self, rows, selected, language):
+        """Transforme les dicts de values() en objets de l'API (à surcharger)."""
+        for row in rows:
+            yield {name: row[self.fields[name]] for name in selected}
+
+    def get(self, request):
+        try:
+            language = api_language(request)
+            selected = self.selected_fields(request)
+            limit = self.get_limit(request)
+        except ApiError as error:
+            return JsonResponse({'error': error.message}, status=error.status)
+
+        # modeltranslation lit les champs traduits dans la langue active
+        with translation.override(language):
+            queryset = self.values(self.get_queryset(), selected)
+            paginator = CursorPaginator(queryset, limit, ordering=self.ordering, approximate_count=False)
+            page = paginator.page(request.GET.get('cursor'))
+
+        response = StreamingHttpResponse(
+            self.stream(page, selected, language),
+            content_type='application/json',
+        )
+        response['Content-Language'] = language
+        return response
+
+    def stream(self, page, selected, language):
+        encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+        yield f'{{"version":"{API_VERSION}","language":{encoder.encode(language)},"results":['
+        with translation.override(language):
+            for position, item in enumerate(self.serialize(page.object_list, selected, language)):
+                yield (',' if position else '') + encoder.encode(item)
+        yield '],"next":{},"previous":{}}}'.format(
+            encoder.encode(page.next_cursor),
+            encoder.encode(page.previous_cursor),
+        )
+
+
+class RecipeReadApiMixin:
+    model = Recipe
+    fields = {
+        'id': 'pk',
+        'title': 'title',
+        'description': 'description',
+        'instructions': 'instructions',
+        'image': 'image',
+        'author': 'user__username',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+        'ingredients': None,  # Intégrés en une seule requête supplémentaire
+    }
+    ordering = ('-created_at', '-pk')
+
+    def serialize(self, rows, selected, language):
+        rows = list(rows)
+        ingredients = {}
+        if 'ingredients' in selected:
+            ingredients = recipe_ingredients([row['pk'] for row in rows], language)
+        for row in rows:
+            item = {}
+            for name in selected:
+                if name == 'ingredients':
+                    item[name] = ingredients[row['pk']]
+                elif name == 'image':
+                    item[name] = image_url(row['image'])
+                else:
+                    item[name] = row[self.fields[name]]
+            yield item
+
+
+class RecipeListApiView(RecipeReadApiMixin, ReadApiView):
+    default_limit = 12
+
+
+class RecipeDetailApiView(RecipeReadApiMixin, ReadApiView):
+    def get(self, request, pk):
+        try:
+            language = api_language(request)
+            selected = self.selected_fields(request)
+        except ApiError as error:
+            return JsonResponse({'error': error.message}, status=error.status)
+        with translation.override(language):
+            rows = list(self.values(self.get_queryset().filter(pk=pk), selected))
+            if not rows:
+                return JsonResponse({'error': "Recette introuvable."}, status=404)
+            item = next(self.serialize(rows, selected, language))
+        response = JsonResponse({'version': API_VERSION, 'language': language, 'result': item},
+                                json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')})
+        response['Content-Language'] = language
+        return response
+
+
+class IngredientListApiView(ReadApiView):
+    model = Ingredient
+    fields = {
+        'id': 'pk',
+        'name': 'name',
+        'image': 'image',
+    }
+    ordering = ('name', 'pk')
+    default_limit = 50
+
+    def serialize(self, rows, selected, language):
+        for row in rows:
+            yield {name: image_url(row['image']) if name == 'image' else row[self.fields[name]] for name in selected}
+
+
+class UnitListApiView(ReadApiView):
+    model = Unit
+    fields = {
+        'id': 'pk',
+        'unit': 'unit',
+    }
+    ordering = ('unit', 'pk')
+    default_limit = 50
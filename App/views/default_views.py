@@ -1,5 +1,8 @@
 from django.views.generic.base import View
 from django.shortcuts import render
+from django.views import static
+
+from App.storage import is_hashed_name
 
 class HomeView(View):
     def get(self, request):
@@ -7,4 +10,19 @@ class HomeView(View):
     
 class AboutView(View):
     def get(self, request):
-        return render(request, 'App/about.html')
\ No newline at end of file
+        return render(request, 'App/about.html')
+
+
+# Une URL nommée d'après le contenu ne change jamais de fichier ; les anciens
+# noms choisis par l'utilisateur, eux, peuvent être réécrits et sont revalidés.
+# Cette vue ne sert qu'en DEBUG : voir MEDIA_URL dans settings pour la production.
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'public, max-age=0, must-revalidate'
+
+def serve_media(request, path, document_root=None, show_indexes=False):
+    response = static.serve(request, path, document_root=document_root, show_indexes=show_indexes)
+    if response.status_code == 200 and is_hashed_name(path):
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    else:
+        response['Cache-Control'] = REVALIDATE_CACHE_CONTROL
+    return response
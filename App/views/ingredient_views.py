@@ -1,28 +1,43 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from ..async_render import aload_user, arender
 from ..models import Ingredient
 from ..forms import IngredientForm
+from ..page_cache import AnonymousPageCacheMixin, add_tags
+from ..pagination import CursorPaginator
 from django.views import View
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.contrib import messages
 
 # Read # 
 
-class IngredientListView(View):
-    def get(self, request):
+class IngredientListView(AnonymousPageCacheMixin, View):
+    page_cache_params = ('cursor',)
+
+    def get_paginator(self):
         ingredients_list = Ingredient.objects.all()
-        paginator = Paginator(ingredients_list, 9)  # 9 ingrédients par page (3 lignes de 3)
-        
-        page = request.GET.get('page')
-        try:
-            ingredients = paginator.page(page)
-        except PageNotAnInteger:
-            ingredients = paginator.page(1)
-        except EmptyPage:
-            ingredients = paginator.page(paginator.num_pages)
+        return CursorPaginator(ingredients_list, 9, ordering=('name', 'pk'))  # 9 ingrédients par page (3 lignes de 3)
+
+    @staticmethod
+    def add_page_tags(request, ingredients):
+        add_tags(request, 'ingredient-list')
+        add_tags(request, *(f'image:{ingredient.image.name}' for ingredient in ingredients if ingredient.image))
+
+    def get(self, request):
+        ingredients = self.get_paginator().page(request.GET.get('cursor'))
+        self.add_page_tags(request, ingredients)
             
         return render(request, 'App/ingredient/ingredient_list.html', {'ingredients': ingredients})
 
 
+class AsyncIngredientListView(IngredientListView):
+    """Version asynchrone (ORM asynchrone), servie par Projet/asgi.py."""
+
+    async def get(self, request):
+        await aload_user(request)
+        ingredients = await self.get_paginator().apage(request.GET.get('cursor'))
+        self.add_page_tags(request, ingredients)
+        return await arender(request, 'App/ingredient/ingredient_list.html', {'ingredients': ingredients})
+
+
 # Create #
 
 class AddIngredientView(View):
@@ -0,0 +1,75 @@
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import get_object_or_404, redirect, render
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.generic.base import View
+
+from ..models import MealPlan, MealPlanRecipe, Recipe
+from ..shopping import meal_plan_shopping_list
+
+MAX_SERVINGS = 100
+
+def parse_servings(value, default):
+    try:
+        return max(1, min(int(value), MAX_SERVINGS))
+    except (TypeError, ValueError):
+        return default
+
+# Read #
+
+@method_decorator(login_required, name='dispatch')
+class MealPlanListView(View):
+    def get(self, request):
+        meal_plans = request.user.meal_plans.all()
+        return render(request, 'App/meal_plan/meal_plans.html', {'meal_plans': meal_plans})
+
+    def post(self, request):
+        name = request.POST.get('name', '').strip()
+        if not name:
+            messages.error(request, "Le nom du menu est obligatoire.")
+            return redirect('meal_plans')
+        meal_plan = MealPlan.objects.create(user=request.user, name=name)
+        messages.success(request, 'Menu créé avec succès!')
+        return redirect('meal_plan_detail', pk=meal_plan.pk)
+
+@method_decorator(login_required, name='dispatch')
+class MealPlanDetailView(View):
+    def get(self, request, pk):
+        meal_plan = get_object_or_404(MealPlan, pk=pk, user=request.user)
+        return render(request, 'App/meal_plan/meal_plan_detail.html', {
+            'meal_plan': meal_plan,
+            'entries': meal_plan.entries.select_related('recipe'),
+            'shopping_list': meal_plan_shopping_list(meal_plan),
+        })
+
+    def post(self, request, pk):
+        # Ajout d'une recette au menu
+        meal_plan = get_object_or_404(MealPlan, pk=pk, user=request.user)
+        recipe = Recipe.objects.filter(pk=request.POST.get('recipe') or 0).only('id', 'servings').first()
+        if recipe is None:
+            messages.error(request, "Choisissez une recette.")
+        else:
+            servings = parse_servings(request.POST.get('servings'), recipe.servings)
+            MealPlanRecipe.objects.create(meal_plan=meal_plan, recipe=recipe, servings=servings)
+            meal_plan.save(update_fields=['updated_at'])
+        return redirect('meal_plan_detail', pk=meal_plan.pk)
+
+# Delete #
+
+@method_decorator(login_required, name='dispatch')
+class DeleteMealPlanEntryView(View):
+    def post(self, request, pk, entry_pk):
+        entry = get_object_or_404(MealPlanRecipe, pk=entry_pk, meal_plan_id=pk, meal_plan__user=request.user)
+        entry.delete()
+        MealPlan.objects.filter(pk=pk).update(updated_at=timezone.now())
+        return redirect('meal_plan_detail', pk=pk)
+
+@method_decorator(login_required, name='dispatch')
+class DeleteMealPlanView(View):
+    def post(self, request, pk):
+        meal_plan = get_object_or_404(MealPlan, pk=pk, user=request.user)
+        meal_plan_name = meal_plan.name
+        meal_plan.delete()
+        messages.success(request, f'Menu "{meal_plan_name}" supprimé avec succès!')
+        return redirect('meal_plans')
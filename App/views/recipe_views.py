@@ -1,59 +1,185 @@
+from asgiref.sync import sync_to_async
 from django.views.generic.base import View
-from django.shortcuts import render, redirect, get_object_or_404
-from ..models import Recipe, Ingredient, Unit, RecipeIngredient
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
+from ..models import Recipe, RecipeIngredient
+from ..forms import RecipeIngredientRows
+from ..pagination import CursorPaginator
+from ..permissions import can_edit_recipe, can_delete_recipe
+from ..search import search_recipes
+from ..ingredient_index import cookable_recipes
+from ..async_render import aload_user, arender
+from ..conditional import aconditional_response, conditional_response, recipe_etag, recipe_page_etag
+from ..page_cache import AnonymousPageCacheMixin, add_tags
+from ..reference import reference_data
+from ..services import create_recipe, update_recipe
+from .meal_plan_views import MAX_SERVINGS
 from django.contrib import messages
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from django.core.exceptions import PermissionDenied
 
-# Fonctions utilitaires pour vérifier les permissions de recette
-def can_edit_recipe(user, recipe):
-    """Vérifie si l'utilisateur peut modifier cette recette"""
-    # Les gestionnaires peuvent tout faire
-    if user.groups.filter(name='Gestionnaire').exists():
-        return True
-    # Les cuisiniers ne peuvent agir que sur leurs propres recettes
-    if user.groups.filter(name='Cuisinier').exists():
-        return recipe.user == user
-    # Fallback: vérifier la permission générale
-    return user.has_perm('App.change_recipe')
-
-def can_delete_recipe(user, recipe):
-    """Vérifie si l'utilisateur peut supprimer cette recette"""
-    # Les gestionnaires peuvent tout faire
-    if user.groups.filter(name='Gestionnaire').exists():
-        return True
-    # Les cuisiniers ne peuvent agir que sur leurs propres recettes
-    if user.groups.filter(name='Cuisinier').exists():
-        return recipe.user == user
-    # Fallback: vérifier la permission générale
-    return user.has_perm('App.delete_recipe')
-
 # Read # 
 
-class RecipeListView(View):
-    def get(self, request):
+class RecipeListView(AnonymousPageCacheMixin, View):
+    page_cache_params = ('cursor',)
+
+    def get_paginator(self):
         recipes_list = Recipe.objects.select_related('user').all()
-        paginator = Paginator(recipes_list, 6)  # 6 recettes par page (2 lignes de 3)
-        
-        page = request.GET.get('page')
-        try:
-            recipes = paginator.page(page)
-        except PageNotAnInteger:
-            recipes = paginator.page(1)
-        except EmptyPage:
-            recipes = paginator.page(paginator.num_pages)
-
-        return render(request, 'App/recipe/recipes.html', {'recipes': recipes})
+        return CursorPaginator(recipes_list, 6, ordering=('-created_at', '-pk'))  # 6 recettes par page (2 lignes de 3)
+
+    @staticmethod
+    def add_page_tags(request, recipes):
+        add_tags(request, 'recipe-list', *(f'recipe:{recipe.pk}' for recipe in recipes))
+        add_tags(request, *(f'image:{recipe.image.name}' for recipe in recipes if recipe.image))
+
+    def get(self, request):
+        recipes = self.get_paginator().page(request.GET.get('cursor'))
+        self.add_page_tags(request, recipes)
+
+        # 304 si la page n'a pas changé depuis la dernière visite
+        return conditional_response(
+            request,
+            recipe_page_etag(request, recipes),
+            None,
+            lambda: render(request, 'App/recipe/recipes.html', {'recipes': recipes}),
+        )
+
+class AsyncRecipeListView(RecipeListView):
+    """Version asynchrone (ORM asynchrone), servie par Projet/asgi.py."""
+
+    async def get(self, request):
+        await aload_user(request)
+        recipes = await self.get_paginator().apage(request.GET.get('cursor'))
+        self.add_page_tags(request, recipes)
+        return await aconditional_response(
+            request,
+            await sync_to_async(recipe_page_etag)(request, recipes),
+            None,
+            lambda: arender(request, 'App/recipe/recipes.html', {'recipes': recipes}),
+        )
     
-class RecipeDetailView(View):
+class RecipeSearchView(View):
+    max_results = 48  # 16 lignes de 3 cartes
+
+    def get(self, request):
+        query = request.GET.get('q', '').strip()
+        recipes = []
+        if query:
+            recipes = search_recipes(Recipe.objects.select_related('user'), query, limit=self.max_results)
+        return render(request, 'App/recipe/search.html', {'query': query, 'recipes': recipes})
+
+def parse_ingredient_ids(request):
+    """Ids d'ingrédients passés en ?ingredients=1&ingredients=2 ou ?ingredients=1,2"""
+    ids = set()
+    for value in request.GET.getlist('ingredients'):
+        for part in value.split(','):
+            if part.strip().isdigit():
+                ids.add(int(part))
+    return ids
+
+def parse_max_missing(request, default=2, maximum=5):
+    try:
+        return max(0, min(int(request.GET.get('max_missing', default)), maximum))
+    except ValueError:
+        return default
+
+class WhatCanICookView(View):
+    max_results = 48
+
+    def get(self, request):
+        ingredient_ids = parse_ingredient_ids(request)
+        max_missing = parse_max_missing(request)
+        results = []
+        if ingredient_ids:
+            results = cookable_recipes(Recipe.objects.select_related('user'), ingredient_ids, max_missing, self.max_results)
+        # Seuls les ingrédients choisis sont rendus (sélecteur par autocomplétion)
+        names = reference_data.get().ingredient_names
+        return render(request, 'App/recipe/what_can_i_cook.html', {
+            'ingredient_rows': sorted(
+                ({'id': pk, 'name': names[pk]} for pk in ingredient_ids if pk in names), key=lambda row: row['name'],
+            ),
+            'row_template': {'id': '__id__', 'name': '__name__'},
+            'selected_ids': ingredient_ids,
+            'max_missing': max_missing,
+            'results': results,
+            'recipes': [result['recipe'] for result in results],  # Corps des cartes lus en un seul get_many
+        })
+
+class RecipeDetailView(AnonymousPageCacheMixin, View):
+    template_name = 'App/recipe/recipe_detail.html'
+
+    @staticmethod
+    def ingredients_queryset(recipe):
+        return RecipeIngredient.objects.filter(recipe=recipe).select_related('ingredient', 'unit')
+
+    @staticmethod
+    def add_recipe_tags(request, recipe):
+        add_tags(request, f'recipe:{recipe.pk}')
+        if recipe.image:
+            add_tags(request, f'image:{recipe.image.name}')
+
+    @staticmethod
+    def add_ingredient_tags(request, recipe_ingredients):
+        add_tags(request, *(f'ingredient:{ri.ingredient_id}' for ri in recipe_ingredients))
+        add_tags(request, *(f'unit:{ri.unit_id}' for ri in recipe_ingredients))
+
     def get(self, request, pk):
         recipe = get_object_or_404(Recipe.objects.select_related('user'), pk=pk)
-        recipe_ingredients = RecipeIngredient.objects.filter(recipe=recipe).select_related('ingredient', 'unit')
-        return render(request, 'App/recipe/recipe_detail.html', {
-            'recipe': recipe,
-            'recipe_ingredients': recipe_ingredients,        })
+        self.add_recipe_tags(request, recipe)
+
+        def render_detail():
+            # Les ingrédients ne sont chargés que si la page doit être rendue
+            recipe_ingredients = list(self.ingredients_queryset(recipe))
+            self.add_ingredient_tags(request, recipe_ingredients)
+            return render(request, self.template_name, {
+                'recipe': recipe,
+                'recipe_ingredients': recipe_ingredients,
+            })
+
+        return conditional_response(request, recipe_etag(request, recipe), recipe.updated_at, render_detail)
+
+class AsyncRecipeDetailView(RecipeDetailView):
+    """Version asynchrone (ORM asynchrone), servie par Projet/asgi.py."""
+
+    async def get(self, request, pk):
+        await aload_user(request)
+        recipe = await aget_object_or_404(Recipe.objects.select_related('user'), pk=pk)
+        self.add_recipe_tags(request, recipe)
+
+        async def render_detail():
+            recipe_ingredients = [ri async for ri in self.ingredients_queryset(recipe)]
+            self.add_ingredient_tags(request, recipe_ingredients)
+            return await arender(request, self.template_name, {
+                'recipe': recipe,
+                'recipe_ingredients': recipe_ingredients,
+            })
+
+        etag = await sync_to_async(recipe_etag)(request, recipe)
+        return await aconditional_response(request, etag, recipe.updated_at, render_detail)
+
+def parse_recipe_servings(value, default):
+    """Portions saisies dans le formulaire de recette : `default` si vide, None si invalide."""
+    value = (value or '').strip()
+    if not value:
+        return default
+    try:
+        servings = int(value)
+    except ValueError:
+        return None
+    return servings if 1 <= servings <= MAX_SERVINGS else None
+
+# Sélecteur d'ingrédients #
+
+def ingredient_picker_context(rows):
+    """
+    Contexte du sélecteur d'ingrédients : seules les lignes choisies sont
+    rendues, les unités viennent de l'instantané des données de référence.
+    """
+    return {
+        'units': reference_data.units(),
+        'ingredient_rows': rows,
+        'row_template': {'id': '__id__', 'name': '__name__'},
+    }
 
 # Create #
 
@@ -64,9 +190,10 @@ class AddRecipeView(View):
         if not request.user.has_perm('App.add_recipe'):
             raise PermissionDenied("Vous n'avez pas la permission d'ajouter des recettes.")
         
-        ingredients = Ingredient.objects.all()
-        units = Unit.objects.all()
-        return render(request, 'App/recipe/add_recipe.html', {'ingredients': ingredients, 'units': units})
+        return render(request, 'App/recipe/add_recipe.html', {
+            'has_ingredients': bool(reference_data.ingredients()),
+            **ingredient_picker_context([]),
+        })
 
     def post(self, request):
         # Vérifier si l'utilisateur peut ajouter des recettes
@@ -76,6 +203,7 @@ class AddRecipeView(View):
         title = request.POST.get('title', '').strip()
         description = request.POST.get('description', '').strip()
         instructions = request.POST.get('instructions', '').strip()
+        servings = parse_recipe_servings(request.POST.get('servings'), Recipe._meta.get_field('servings').default)
         image = request.FILES.get('image')
 
         # Validation des champs
@@ -86,51 +214,28 @@ class AddRecipeView(View):
             errors.append("La description est obligatoire.")
         if not instructions:
             errors.append("Les instructions sont obligatoires.")
-
-        ingredient_ids = request.POST.getlist('ingredient_ids')
-        if not ingredient_ids:
-            errors.append("Veuillez sélectionner au moins un ingrédient.")
+        if servings is None:
+            errors.append(f"Le nombre de portions doit être un entier entre 1 et {MAX_SERVINGS}.")
 
         # Vérification des ingrédients sélectionnés
-        ingredient_ids = request.POST.getlist('ingredient_ids')
-        ingredients_data = []
-        for ingredient_id in ingredient_ids:
-            quantity = request.POST.get(f'quantity_{ingredient_id}')
-            unit_id = request.POST.get(f'unit_{ingredient_id}')
-            if not quantity or float(quantity) <= 0:
-                ingredient = Ingredient.objects.filter(id=ingredient_id).first()
-                errors.append(f"Une quantité valide est requise pour l'ingrédient {ingredient.name}.")
-            if not unit_id:
-                errors.append(f"Une unité est requise pour l'ingrédient {ingredient.name}.")
-            ingredients_data.append((ingredient_id, quantity, unit_id))        # Si erreurs, recharger le formulaire avec les données existantes
+        ingredient_rows = RecipeIngredientRows(request.POST)
+        if not ingredient_rows.is_valid():
+            errors.extend(ingredient_rows.errors)
+
+        # Si erreurs, recharger le formulaire avec les données existantes
         if errors:
-            ingredients = Ingredient.objects.all()
-            units = Unit.objects.all()
             return render(request, 'App/recipe/add_recipe.html', {
                 'errors': errors,
-                'ingredients': ingredients,
-                'units': units,
+                'has_ingredients': True,
+                **ingredient_picker_context(ingredient_rows.rows),
                 'title': title,
                 'description': description,
                 'instructions': instructions,
+                'servings': request.POST.get('servings', ''),
             })
 
-        # Création de la recette avec l'utilisateur connecté
-        recipe = Recipe.objects.create(
-            title=title, 
-            description=description, 
-            instructions=instructions,
-            image=image,  # Ajouter l'image
-            user=request.user  # Assigner l'utilisateur connecté
-        )
-        # Création des liaisons avec quantités et unités
-        for ingredient_id, quantity, unit_id in ingredients_data:
-            RecipeIngredient.objects.create(
-                recipe=recipe,
-                ingredient_id=ingredient_id,
-                quantity=quantity,
-                unit_id=unit_id
-            )
+        # Création de la recette (avec l'utilisateur connecté) et de ses ingrédients en une transaction
+        create_recipe(request.user, title, description, instructions, image, ingredient_rows.cleaned_rows, servings)
 
         messages.success(request, 'Recette ajoutée avec succès!')
         return redirect('recipes')
@@ -146,15 +251,14 @@ class EditRecipeView(View):
         if not can_edit_recipe(request.user, recipe):
             raise PermissionDenied("Vous n'avez pas la permission de modifier cette recette.")
         
-        ingredients = Ingredient.objects.all()
-        units = Unit.objects.all()
-        recipe_ingredients = RecipeIngredient.objects.filter(recipe=recipe).select_related('ingredient', 'unit')
-        ri_dict = {ri.ingredient.id: ri for ri in recipe_ingredients}
+        recipe_ingredients = RecipeIngredient.objects.filter(recipe=recipe).select_related('ingredient')
+        rows = [
+            {'id': ri.ingredient_id, 'name': ri.ingredient.name, 'quantity': ri.quantity_str, 'unit_id': ri.unit_id}
+            for ri in recipe_ingredients
+        ]
         return render(request, 'App/recipe/edit_recipe.html', {
             'recipe': recipe,
-            'ingredients': ingredients,
-            'units': units,
-            'ri_dict': ri_dict,
+            **ingredient_picker_context(rows),
         })
 
     def post(self, request, pk):
@@ -167,8 +271,8 @@ class EditRecipeView(View):
         title = request.POST.get('title', '').strip()
         description = request.POST.get('description', '').strip()
         instructions = request.POST.get('instructions', '').strip()
+        servings = parse_recipe_servings(request.POST.get('servings'), recipe.servings)
         image = request.FILES.get('image')
-        ingredient_ids = request.POST.getlist('ingredient_ids')
 
         # Validation des champs
         errors = []
@@ -178,63 +282,28 @@ class EditRecipeView(View):
             errors.append("La description est obligatoire.")
         if not instructions:
             errors.append("Les instructions sont obligatoires.")
-        if not ingredient_ids:
-            errors.append("Veuillez sélectionner au moins un ingrédient.")
+        if servings is None:
+            errors.append(f"Le nombre de portions doit être un entier entre 1 et {MAX_SERVINGS}.")
 
         # Vérification des ingrédients sélectionnés
-        ingredients_data = []
-        for iid in ingredient_ids:
-            quantity = request.POST.get(f'quantity_{iid}')
-            unit_id = request.POST.get(f'unit_{iid}')
-            try:
-                quantity_val = float(quantity)
-                if quantity_val <= 0:
-                    ingredient = Ingredient.objects.filter(id=iid).first()
-                    errors.append(f"Quantité invalide pour l'ingrédient {ingredient.name}.")
-            except (TypeError, ValueError):
-                ingredient = Ingredient.objects.filter(id=iid).first()
-                errors.append(f"Quantité invalide pour l'ingrédient {ingredient.name}.")
-            if not unit_id:
-                ingredient = Ingredient.objects.filter(id=iid).first()
-                errors.append(f"Unité manquante pour l'ingrédient {ingredient.name}.")
-            ingredients_data.append((iid, quantity, unit_id))
+        ingredient_rows = RecipeIngredientRows(request.POST)
+        if not ingredient_rows.is_valid():
+            errors.extend(ingredient_rows.errors)
 
         # Si erreurs, recharger le formulaire avec les données existantes
         if errors:
-            ingredients = Ingredient.objects.all()
-            units = Unit.objects.all()
-            recipe_ingredients = RecipeIngredient.objects.filter(recipe=recipe).select_related('ingredient', 'unit')
-            ri_dict = {ri.ingredient.id: ri for ri in recipe_ingredients}
             return render(request, 'App/recipe/edit_recipe.html', {
                 'recipe': recipe,
-                'ingredients': ingredients,
-                'units': units,
-                'ri_dict': ri_dict,
+                **ingredient_picker_context(ingredient_rows.rows),
                 'errors': errors,
                 'title': title,
                 'description': description,
                 'instructions': instructions,
+                'servings': request.POST.get('servings', ''),
             })
 
-        # Mise à jour de la recette
-        recipe.title = title
-        recipe.description = description
-        recipe.instructions = instructions
-        if image:  # Seulement si une nouvelle image est fournie
-            recipe.image = image
-        recipe.save()
-
-        # Supprimer les anciennes liaisons ingrédients
-        RecipeIngredient.objects.filter(recipe=recipe).delete()
-
-        # Créer les nouvelles liaisons avec quantités et unités
-        for iid, quantity, unit_id in ingredients_data:
-            RecipeIngredient.objects.create(
-                recipe=recipe,
-                ingredient_id=iid,
-                quantity=quantity,
-                unit_id=unit_id
-            )
+        # Mise à jour de la recette et de ses ingrédients (diff) en une transaction
+        update_recipe(recipe, title, description, instructions, image, ingredient_rows.cleaned_rows, servings)
 
         messages.success(request, 'Recette modifiée avec succès!')
         return redirect('recipe_detail', pk=recipe.pk)
@@ -1,32 +1,44 @@
 from django.views.generic.base import View
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.utils.translation import gettext as _
+from ..async_render import aload_user, arender
 from ..models import Unit
 from ..forms import UnitForm
+from ..page_cache import AnonymousPageCacheMixin, add_tags
+from ..pagination import CursorPaginator
 
 # Read # 
 
-class UnitListView(View):
-    def get(self, request):
+class UnitListView(AnonymousPageCacheMixin, View):
+    page_cache_params = ('cursor',)
+
+    def get_paginator(self):
         units_list = Unit.objects.all()
-        paginator = Paginator(units_list, 8)  # 8 unités par page (2 lignes de 4)
-        
-        page = request.GET.get('page')
-        try:
-            units = paginator.page(page)
-        except PageNotAnInteger:
-            units = paginator.page(1)
-        except EmptyPage:
-            units = paginator.page(paginator.num_pages)
-            
-        context = {
+        return CursorPaginator(units_list, 8, ordering=('unit', 'pk'))  # 8 unités par page (2 lignes de 4)
+
+    @staticmethod
+    def get_context(units):
+        return {
             'units': units,
             'page_aria_label': _('Navigation des unités'),
             'item_name_plural': _('unités')
         }
-        return render(request, 'App/unit/unit_list.html', context)
+
+    def get(self, request):
+        units = self.get_paginator().page(request.GET.get('cursor'))
+        add_tags(request, 'unit-list')
+        return render(request, 'App/unit/unit_list.html', self.get_context(units))
+
+
+class AsyncUnitListView(UnitListView):
+    """Version asynchrone (ORM asynchrone), servie par Projet/asgi.py."""
+
+    async def get(self, request):
+        await aload_user(request)
+        units = await self.get_paginator().apage(request.GET.get('cursor'))
+        add_tags(request, 'unit-list')
+        return await arender(request, 'App/unit/unit_list.html', self.get_context(units))
 
 # Create #
 
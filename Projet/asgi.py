@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Projet.settings')
+# Pas de connexions persistantes : sous ASGI, chaque requête passe par un
+# thread de sync_to_async qui garderait la sienne ouverte
+os.environ.setdefault('DJANGO_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
@@ -0,0 +1,365 @@
+"""
+Backend de cache à deux niveaux.
+
+1. Un LRU en mémoire, propre au processus, borné en nombre d'entrées et en
+   durée (LOCAL_TIMEOUT) : une lecture fréquente ne quitte pas le processus.
+2. Un fichier SQLite (WAL) partagé par tous les workers de la machine : ce
+   qu'un worker calcule sert aux autres.
+
+Les lectures passent par le LRU puis par SQLite ; les écritures vont aux
+deux. Les opérations qui doivent être atomiques entre processus (add, incr,
+et donc les compteurs de génération et les verrous) se font dans SQLite,
+puis mettent à jour le LRU du processus.
+
+Une écriture faite par un autre worker n'est vue ici qu'à l'expiration de
+la copie locale : LOCAL_TIMEOUT borne donc le retard d'une invalidation
+entre processus (quelques secondes), jamais à l'intérieur d'un processus.
+
+Les clés sont versionnées comme pour tout backend Django (KEY_PREFIX,
+VERSION, incr_version). Les succès (LRU, SQLite) et les échecs sont
+comptés par processus et cumulés périodiquement dans le fichier partagé :
+voir stats() et la commande cache_stats.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+STATS = ('local_hits', 'shared_hits', 'misses')
+STATS_FLUSH_INTERVAL = 10  # Secondes entre deux cumuls des compteurs dans le fichier
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_expires_idx ON cache (expires);
+CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL) WITHOUT ROWID;
+"""
+
+
+class LocalTier:
+    """LRU du processus : clé -> (valeur sérialisée, expiration)."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.counts = dict.fromkeys(STATS, 0)
+        self.flushed_at = time.monotonic()
+
+    def get(self, key, now):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, expires):
+        with self.lock:
+            self.entries[key] = (value, expires)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def discard(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def count(self, stat, n=1):
+        with self.lock:
+            self.counts[stat] += n
+
+    def take_counts(self):
+        with self.lock:
+            counts = self.counts
+            self.counts = dict.fromkeys(STATS, 0)
+            self.flushed_at = time.monotonic()
+            return counts
+
+
+# Un LRU par fichier et par processus : Django crée une instance du backend
+# par thread, le LRU doit être partagé entre elles
+_local_tiers = {}
+_local_tiers_lock = threading.Lock()
+
+
+class TwoTierCache(BaseCache):
+    """
+    OPTIONS (en plus de MAX_ENTRIES et CULL_FREQUENCY pour le fichier) :
+    LOCAL_MAX_ENTRIES (1000) et LOCAL_TIMEOUT (2 secondes).
+    """
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+    cull_every = 100  # Écritures entre deux nettoyages du fichier
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.path = Path(location)
+        self.local_timeout = float(options.get('LOCAL_TIMEOUT', 2))
+        with _local_tiers_lock:
+            self.local = _local_tiers.setdefault(
+                str(self.path), LocalTier(int(options.get('LOCAL_MAX_ENTRIES', 1000)))
+            )
+        self._thread = threading.local()  # Une connexion SQLite par thread
+        self._writes = 0
+
+    # Fichier partagé #
+
+    @property
+    def _db(self):
+        db = getattr(self._thread, 'db', None)
+        # Une connexion héritée d'un fork n'est pas utilisable dans l'enfant
+        if db is None or self._thread.pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute('PRAGMA journal_mode = WAL')
+            db.execute('PRAGMA synchronous = NORMAL')
+            db.executescript(_SCHEMA)
+            self._thread.db = db
+            self._thread.pid = os.getpid()
+        return db
+
+    def _expiry(self, timeout):
+        """Expiration absolue (None = jamais) ; une durée <= 0 expire tout de suite."""
+        return self.get_backend_timeout(timeout)
+
+    def _cull(self, now):
+        self._writes += 1
+        if self._writes % self.cull_every:
+            return
+        db = self._db
+        db.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+        (count,) = db.execute('SELECT COUNT(*) FROM cache').fetchone()
+        if count > self._max_entries:
+            # Les entrées qui expirent le plus tôt d'abord, les permanentes en dernier
+            db.execute(
+                'DELETE FROM cache WHERE key IN ('
+                'SELECT key FROM cache ORDER BY expires IS NULL, expires LIMIT ?)',
+                (max(count // self._cull_frequency, count - self._max_entries),),
+            )
+
+    # LRU #
+
+    def _remember(self, key, value, expires, now):
+        local_expires = now + self.local_timeout
+        self.local.set(key, value, local_expires if expires is None else min(expires, local_expires))
+
+    def _count(self, stat, n=1):
+        self.local.count(stat, n)
+        if time.monotonic() - self.local.flushed_at > STATS_FLUSH_INTERVAL:
+            self.flush_stats()
+
+    # API de BaseCache #
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        value = self.local.get(key, now)
+        if value is not None:
+            self._count('local_hits')
+            return pickle.loads(value)
+        row = self._db.execute('SELECT value, expires FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= now):
+            self._count('misses')
+            return default
+        self._remember(key, row[0], row[1], now)
+        self._count('shared_hits')
+        return pickle.loads(row[0])
+
+    def get_many(self, keys, version=None):
+        keys_by_cache_key = {self.make_and_validate_key(key, version=version): key for key in keys}
+        now = time.time()
+        found = {}
+        missing = []
+        for cache_key, key in keys_by_cache_key.items():
+            value = self.local.get(cache_key, now)
+            if value is None:
+                missing.append(cache_key)
+            else:
+                found[key] = pickle.loads(value)
+        local_hits = len(found)
+        if missing:
+            rows = self._db.execute(
+                f'SELECT key, value, expires FROM cache WHERE key IN ({", ".join("?" * len(missing))})',
+                missing,
+            ).fetchall()
+            for cache_key, value, expires in rows:
+                if expires is None or expires > now:
+                    self._remember(cache_key, value, expires, now)
+                    found[keys_by_cache_key[cache_key]] = pickle.loads(value)
+        self._count('local_hits', local_hits)
+        self._count('shared_hits', len(found) - local_hits)
+        self._count('misses', len(keys_by_cache_key) - len(found))
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self._expiry(timeout)
+        now = time.time()
+        rows = [
+            (self.make_and_validate_key(key, version=version), pickle.dumps(value, self.pickle_protocol))
+            for key, value in data.items()
+        ]
+        db = self._db
+        if expires is not None and expires <= now:
+            db.executemany('DELETE FROM cache WHERE key = ?', [(key,) for key, _value in rows])
+            self.local.discard(*(key for key, _value in rows))
+            return []
+        with db:
+            db.execute('BEGIN IMMEDIATE')
+            db.executemany(
+                'INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+                [(key, value, expires) for key, value in rows],
+            )
+        for key, value in rows:
+            self._remember(key, value, expires, now)
+        self._cull(now)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        expires = self._expiry(timeout)
+        now = time.time()
+        if expires is not None and expires <= now:
+            return False
+        value = pickle.dumps(value, self.pickle_protocol)
+        # Atomique entre processus : n'écrase qu'une entrée expirée
+        cursor = self._db.execute(
+            'INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires '
+            'WHERE cache.expires IS NOT NULL AND cache.expires <= ?',
+            (key, value, expires, now),
+        )
+        if cursor.rowcount:
+            self._remember(key, value, expires, now)
+            self._cull(now)
+            return True
+        self.local.discard(key)  # Un autre processus a la valeur courante
+        return False
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        db = self._db
+        with db:
+            db.execute('BEGIN IMMEDIATE')
+            row = db.execute('SELECT value, expires FROM cache WHERE key = ?', (key,)).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                raise ValueError(f"Key '{key}' not found")
+            new_value = pickle.loads(row[0]) + delta
+            value = pickle.dumps(new_value, self.pickle_protocol)
+            db.execute('UPDATE cache SET value = ? WHERE key = ?', (value, key))
+        self._remember(key, value, row[1], now)
+        return new_value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self.local.discard(key)
+        cursor = self._db.execute(
+            'UPDATE cache SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self._expiry(timeout), key, time.time()),
+        )
+        return bool(cursor.rowcount)
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self.local.discard(key)
+        return bool(self._db.execute('DELETE FROM cache WHERE key = ?', (key,)).rowcount)
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        self.local.discard(*keys)
+        self._db.executemany('DELETE FROM cache WHERE key = ?', [(key,) for key in keys])
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        if self.local.get(key, now) is not None:
+            return True
+        return self._db.execute(
+            'SELECT 1 FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)', (key, now)
+        ).fetchone() is not None
+
+    def clear(self):
+        self.local.clear()
+        self._db.execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Appelé à la fin de chaque requête : la connexion SQLite est gardée
+        # ouverte, comme CONN_MAX_AGE pour la base
+        pass
+
+    # Statistiques #
+
+    def flush_stats(self):
+        """Cumule dans le fichier partagé les compteurs de ce processus."""
+        counts = [(name, n) for name, n in self.local.take_counts().items() if n]
+        if counts:
+            self._db.executemany(
+                'INSERT INTO stats (name, value) VALUES (?, ?) '
+                'ON CONFLICT (name) DO UPDATE SET value = value + excluded.value',
+                counts,
+            )
+
+    def stats(self):
+        """Compteurs cumulés de tous les processus, et taille des deux niveaux."""
+        self.flush_stats()
+        db = self._db
+        stats = dict.fromkeys(STATS, 0)
+        stats.update(db.execute('SELECT name, value FROM stats').fetchall())
+        lookups = sum(stats[name] for name in STATS)
+        stats['hit_rate'] = (stats['local_hits'] + stats['shared_hits']) / lookups if lookups else None
+        (stats['shared_entries'],) = db.execute(
+            'SELECT COUNT(*) FROM cache WHERE expires IS NULL OR expires > ?', (time.time(),)
+        ).fetchone()
+        stats['local_entries'] = len(self.local.entries)
+        return stats
+
+    def reset_stats(self):
+        self.local.take_counts()
+        self._db.execute('DELETE FROM stats')
+
+
+# Compteurs de génération #
+# Un processus garde une copie de données (index, tables) avec la génération
+# lue au chargement, et la recharge quand le compteur partagé change. Un
+# compteur évincé est recréé à partir de l'horloge plutôt qu'à 1 : la nouvelle
+# valeur dépasse toute génération déjà distribuée, et aucune copie ne peut
+# être prise pour à jour par coïncidence.
+
+def _seed():
+    return time.time_ns()
+
+
+def current_generation(key):
+    """Génération courante du compteur `key` (créé s'il n'existe pas)."""
+    from django.core.cache import cache
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, _seed(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(key, delta=1):
+    """Avance le compteur `key` de `delta` ; retourne la nouvelle génération."""
+    from django.core.cache import cache
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        cache.add(key, _seed(), None)
+        return cache.incr(key, delta)
@@ -0,0 +1,51 @@
+"""
+Moteur SQLite du projet : celui de Django, plus une reprise avec attente
+exponentielle quand la base est occupée (SQLITE_BUSY) au-delà du
+busy_timeout.
+
+Seules les instructions hors transaction sont reprises (autocommit, dont
+le BEGIN lui-même) : une instruction au milieu d'une transaction ne peut
+pas être rejouée seule. Avec transaction_mode IMMEDIATE, le verrou
+d'écriture est pris au BEGIN, c'est donc là que l'attente se produit.
+"""
+import random
+import time
+
+from django.db.backends.sqlite3 import base
+
+SQLITE_BUSY = 5
+
+
+def is_busy(error):
+    code = getattr(error, 'sqlite_errorcode', None)
+    if code is not None:
+        return code & 0xff == SQLITE_BUSY  # Codes étendus : SQLITE_BUSY_SNAPSHOT, etc.
+    return 'database is locked' in str(error)
+
+
+class BusyRetryCursorWrapper(base.SQLiteCursorWrapper):
+    busy_retries = 5
+    busy_backoff = 0.05  # Première attente (secondes), doublée à chaque reprise
+
+    def _retry(self, method, *args):
+        for attempt in range(self.busy_retries + 1):
+            try:
+                return method(*args)
+            except base.Database.OperationalError as error:
+                if attempt == self.busy_retries or self.connection.in_transaction or not is_busy(error):
+                    raise
+                delay = self.busy_backoff * 2 ** attempt
+                time.sleep(delay + random.uniform(0, delay))
+
+    def execute(self, query, params=None):
+        return self._retry(super().execute, query, params)
+
+    def executemany(self, query, param_list):
+        # Un itérateur serait consommé par la première tentative
+        param_list = list(param_list)
+        return self._retry(super().executemany, query, param_list)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def create_cursor(self, name=None):
+        return self.connection.cursor(factory=BusyRetryCursorWrapper)
@@ -0,0 +1,76 @@
+"""
+Middlewares de Django exécutés directement dans la boucle d'événements.
+
+Sous ASGI, MiddlewareMixin appelle process_request et process_response avec
+sync_to_async : un aller-retour vers le thread de la requête par méthode,
+soit deux par middleware et par requête. Les middlewares ci-dessous ne font
+que lire la requête et écrire des en-têtes (aucune entrée-sortie, aucune
+requête à la base) : leurs méthodes sont appelées telles quelles.
+
+Sessions et messages ne passent par le thread qu'au retour, et seulement
+quand la session doit être enregistrée (écriture en base).
+
+Ils ne remplacent ceux de Django qu'avec settings.ASYNC_VIEWS ; sous WSGI et
+par défaut, MIDDLEWARE garde les classes d'origine.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import middleware as auth
+from django.contrib.messages import middleware as messages
+from django.contrib.sessions import middleware as sessions
+from django.middleware import clickjacking, common, csrf, locale, security
+
+
+class InlineAsyncMixin:
+    def response_needs_thread(self, request, response):
+        return False
+
+    async def __acall__(self, request):
+        response = None
+        if hasattr(self, 'process_request'):
+            response = self.process_request(request)
+        response = response or await self.get_response(request)
+        if hasattr(self, 'process_response'):
+            if self.response_needs_thread(request, response):
+                response = await sync_to_async(self.process_response)(request, response)
+            else:
+                response = self.process_response(request, response)
+        return response
+
+
+class SecurityMiddleware(InlineAsyncMixin, security.SecurityMiddleware):
+    pass
+
+
+class SessionMiddleware(InlineAsyncMixin, sessions.SessionMiddleware):
+    # process_request ne crée qu'un objet paresseux
+    def response_needs_thread(self, request, response):
+        return request.session.modified or settings.SESSION_SAVE_EVERY_REQUEST
+
+
+class CommonMiddleware(InlineAsyncMixin, common.CommonMiddleware):
+    pass
+
+
+class LocaleMiddleware(InlineAsyncMixin, locale.LocaleMiddleware):
+    pass
+
+
+class CsrfViewMiddleware(InlineAsyncMixin, csrf.CsrfViewMiddleware):
+    pass
+
+
+class AuthenticationMiddleware(InlineAsyncMixin, auth.AuthenticationMiddleware):
+    # request.user reste paresseux : rien n'est lu avant l'accès
+    pass
+
+
+class MessageMiddleware(InlineAsyncMixin, messages.MessageMiddleware):
+    # Les messages lus ou ajoutés sont enregistrés dans le cookie ou la session
+    def response_needs_thread(self, request, response):
+        storage = getattr(request, '_messages', None)
+        return storage is not None and (storage.used or storage.added_new)
+
+
+class XFrameOptionsMiddleware(InlineAsyncMixin, clickjacking.XFrameOptionsMiddleware):
+    pass
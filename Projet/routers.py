@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.db import connections
+
+
+class ReadWriteRouter:
+    """
+    Lectures sur la connexion en lecture seule ('replica', le même fichier
+    SQLite en mode WAL), écritures sur l'unique connexion d'écriture.
+
+    Dans un bloc atomic() de la connexion d'écriture, les lectures y restent :
+    la transaction doit voir ses propres écritures non validées.
+    """
+    writer = 'default'
+    reader = 'replica'
+
+    def db_for_read(self, model, **hints):
+        if self.reader not in settings.DATABASES or connections[self.writer].in_atomic_block:
+            return self.writer
+        return self.reader
+
+    def db_for_write(self, model, **hints):
+        return self.writer
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Deux connexions sur le même fichier : les objets sont compatibles
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == self.writer
@@ -43,6 +43,11 @@ INSTALLED_APPS = [
     'member_app',
 ]
 
+# Audit pour ASGI : tous ces middlewares déclarent async_capable, la chaîne
+# reste donc asynchrone de bout en bout (vérifié par App.checks). Ce sont
+# ceux de Django, appelés dans la boucle plutôt qu'un aller-retour vers un
+# thread par méthode (Projet.middleware) ; sessions et messages passent
+# encore par le thread quand la session doit être enregistrée.
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -54,6 +59,15 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Pages de lecture (recettes, ingrédients, unités) servies par des vues
+# asynchrones, sur option (DJANGO_ASYNC_VIEWS=1, sous ASGI seulement) :
+# mesuré avec benchmark_views, le débit par processus reste inférieur à
+# celui de WSGI sur SQLite local. Seule cette option remplace les
+# middlewares par leurs variantes sans aller-retour de thread (Projet.middleware).
+ASYNC_VIEWS = os.environ.get('DJANGO_ASYNC_VIEWS') == '1'
+if ASYNC_VIEWS:
+    MIDDLEWARE = [f"Projet.middleware.{path.rsplit('.', 1)[1]}" for path in MIDDLEWARE]
+
 ROOT_URLCONF = 'Projet.urls'
 
 TEMPLATES = [
@@ -79,13 +93,85 @@ WSGI_APPLICATION = 'Projet.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Profil SQLite pour plusieurs workers : WAL (les lecteurs ne bloquent plus
+# l'écrivain), connexions persistantes, verrou d'écriture pris dès le BEGIN
+# et reprise sur SQLITE_BUSY (Projet.db). Les lectures passent par une
+# connexion en lecture seule sur le même fichier (Projet.routers).
+# Le mode WAL est enregistré dans le fichier : après la première commande
+# manage.py, db.sqlite3 reste en WAL et s'accompagne de db.sqlite3-wal et
+# db.sqlite3-shm (ignorés par git). Avant de copier ou de versionner la base,
+# « PRAGMA journal_mode = DELETE » y reporte le journal et la remet dans le
+# mode d'origine.
+# Sous ASGI, Projet/asgi.py met DJANGO_CONN_MAX_AGE à 0 par défaut : chaque
+# requête synchrone y tourne dans un thread différent, et une connexion
+# persistante par thread ne serait jamais réutilisée ni fermée (la documentation
+# de déploiement ASGI de Django recommande de les désactiver).
+# DJANGO_CONN_MAX_AGE permet de fixer une autre durée, sous WSGI comme sous ASGI.
+SQLITE_PATH = BASE_DIR / 'db.sqlite3'
+CONN_MAX_AGE = int(os.environ.get('DJANGO_CONN_MAX_AGE', 600))
+
+SQLITE_PRAGMAS = [
+    'PRAGMA synchronous = NORMAL',  # Suffisant en WAL : durable au checkpoint
+    'PRAGMA busy_timeout = 5000',
+    'PRAGMA mmap_size = 268435456',  # 256 Mo
+    'PRAGMA cache_size = -20000',  # 20 Mo par connexion
+    'PRAGMA temp_store = MEMORY',
+]
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'ENGINE': 'Projet.db',
+        'NAME': SQLITE_PATH,
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ';'.join(['PRAGMA journal_mode = WAL'] + SQLITE_PRAGMAS),
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 5,
+        },
+    },
+    'replica': {
+        'ENGINE': 'Projet.db',
+        'NAME': f'{SQLITE_PATH.as_uri()}?mode=ro',
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ';'.join(SQLITE_PRAGMAS + ['PRAGMA query_only = ON']),
+            'timeout': 5,
+        },
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
+}
+
+DATABASE_ROUTERS = ['Projet.routers.ReadWriteRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# Deux niveaux (Projet.cache) : un LRU en mémoire dans chaque processus,
+# devant un fichier SQLite partagé par les workers de la machine.
+# LOCAL_TIMEOUT borne le délai avant qu'un worker voie une invalidation
+# faite par un autre.
+CACHES = {
+    'default': {
+        'BACKEND': 'Projet.cache.TwoTierCache',
+        'LOCATION': BASE_DIR / 'cache.sqlite3',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 50000,
+            'CULL_FREQUENCY': 4,
+            'LOCAL_MAX_ENTRIES': 2000,
+            'LOCAL_TIMEOUT': 2,
+        },
+    },
 }
 
+# Les tests utilisent un fichier de cache temporaire (Projet.test_runner)
+TEST_RUNNER = 'Projet.test_runner.TestRunner'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -143,14 +229,34 @@ STATICFILES_DIRS = (
     os.path.join(BASE_DIR, 'static'),
 )
 
+# En production (DEBUG = False), les médias ne passent pas par serve_media : le
+# serveur web doit poser lui-même l'en-tête immuable, et seulement sur les noms
+# dérivés du contenu (App.storage.HASHED_NAME_RE). Exemple nginx :
+#
+#   location ~ "^/media/(.+/)?([0-9a-f]{2})/(derivatives/)?\2[0-9a-f]{62}" {
+#       root /chemin/vers/Projet;  # BASE_DIR : /media/... -> MEDIA_ROOT
+#       add_header Cache-Control "public, max-age=31536000, immutable";
+#   }
+#   location /media/ {
+#       root /chemin/vers/Projet;
+#       add_header Cache-Control "public, max-age=0, must-revalidate";
+#   }
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media/'
 
+# Nombre de threads qui génèrent les dérivés (miniature, carte, plein écran) des images
+IMAGE_DERIVATIVES_WORKERS = 2
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Durée (secondes) du cache entre requêtes des droits sur les recettes.
+# None = résolution une fois par requête seulement ; à activer uniquement
+# avec un backend de cache partagé entre les workers.
+RECIPE_PERMISSIONS_CACHE_TIMEOUT = None
+
 LOGIN_URL = '/members/login/'
 LOGIN_REDIRECT_URL = 'index'
 LOGOUT_REDIRECT_URL = 'index'
\ No newline at end of file
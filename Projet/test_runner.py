@@ -0,0 +1,31 @@
+"""
+Lanceur de tests : le cache partagé (Projet.cache) est un fichier qui
+survit au processus. Les tests utilisent un fichier temporaire, pour ne
+pas lire les entrées d'une autre exécution ni celles du serveur de
+développement.
+"""
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._cache_dir = tempfile.mkdtemp(prefix='projet-cache-')
+        caches = {
+            alias: {**config, 'LOCATION': Path(self._cache_dir) / f'{alias}.sqlite3'}
+            if config['BACKEND'] == 'Projet.cache.TwoTierCache' else config
+            for alias, config in settings.CACHES.items()
+        }
+        self._cache_settings = override_settings(CACHES=caches)
+        self._cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._cache_settings.disable()
+        shutil.rmtree(self._cache_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
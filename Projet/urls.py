@@ -20,6 +20,8 @@ from django.contrib import admin
 from django.urls import include, path
 from django.conf.urls.i18n import i18n_patterns
 
+from App.views import serve_media
+
 # URLs sans préfixe de langue (pour le changement de langue)
 urlpatterns = [
     path('i18n/', include('django.conf.urls.i18n')),
@@ -33,4 +35,4 @@ urlpatterns += i18n_patterns(
 )
 
 urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+urlpatterns += static(settings.MEDIA_URL, view=serve_media, document_root=settings.MEDIA_ROOT)